@@ -1,20 +1,38 @@
 import os
 import json
-import requests
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import random
 import urllib.parse
 import re
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, TimeoutError as FuturesTimeout
 import pandas as pd
 import numpy as np
 
+from bars import Bars, FIELDS, aligned_matrix
+from bar_store import bar_store, MarketDataUnavailable, NoBarsInRange
+from indicator_engine import indicator_engine, compute_indicators, warmup_bars, COLUMNS as INDICATOR_COLUMNS
+from indicator_cache import indicator_cache, source_watermark
+from http_transport import transport, HTTP_CONNECT_TIMEOUT
+from endpoint_memo import endpoint_memo
+from circuit_breaker import breaker_states, get_breaker
+from single_flight import SingleFlight
+from synthetic_market import synthetic_market
+import screener
+from correlation import PricePanel, panel_cache, correlation, rolling_correlation
+from signal_board import SignalBoard
+from summary_snapshots import SummarySnapshots
+from price_stream import PriceHub, ReplayFeed, AlpacaFeed, PRICE_STREAM_HEARTBEAT, PRICE_STREAM_MAX_SYMBOLS, PRICE_REPLAY_DAYS
+from timeframe_planner import TimeframePlanner, lookback_start, bars_since, MINUTE_BASE, DAILY_BASE
+from wire_formats import negotiate, table_response, UnsupportedFormat, RECORDS
+from conditional import strong_etag, is_fresh, not_modified, with_etag, parse_bar_cursor
+
 # Import Alpaca API libraries
 try:
     from alpaca.data.historical import StockHistoricalDataClient
-    from alpaca.data.requests import StockBarsRequest
     from alpaca.data.timeframe import TimeFrame
 except ImportError:
     print("Warning: Alpaca API libraries not installed. Stock data will be mocked.")
@@ -22,10 +40,9 @@ except ImportError:
     class StockHistoricalDataClient:
         def __init__(self, *args, **kwargs):
             pass
-    class StockBarsRequest:
-        def __init__(self, *args, **kwargs):
-            pass
     class TimeFrame:
+        Minute = "1Min"
+        Hour = "1Hour"
         Day = "1D"
 
 # Load environment variables
@@ -41,61 +58,104 @@ SEARCH_MODEL_NAME = os.getenv("SEARCH_MODEL_NAME")
 ALPACA_API_KEY = os.getenv("ALPACA_API_KEY")
 ALPACA_SECRET_KEY = os.getenv("ALPACA_SECRET_KEY")
 ALPACA_BASE_URL = os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets/v2")
+ALPACA_DATA_URL = os.getenv("ALPACA_DATA_URL", "https://data.alpaca.markets")
+# Symbols per multi-symbol bars request, keeping the query string well under URL length limits
+ALPACA_SYMBOLS_PER_REQUEST = int(os.getenv("ALPACA_SYMBOLS_PER_REQUEST", "100"))
+
+# Chat completions can legitimately take much longer than market data calls
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+
+# Parts of a technical indicators response that can be requested with ?sections=
+INDICATOR_SECTIONS = ("indicators", "analysis")
+
+# Largest watchlist /api/technical-indicators/batch accepts in one request
+TECHNICAL_BATCH_MAX_SYMBOLS = int(os.getenv("TECHNICAL_BATCH_MAX_SYMBOLS", "100"))
+
+# Largest universe /api/screener evaluates in one request, and how many matches it returns by default
+SCREENER_MAX_SYMBOLS = int(os.getenv("SCREENER_MAX_SYMBOLS", "5000"))
+SCREENER_DEFAULT_LIMIT = 50
+
+# Largest symbol set /api/correlation accepts, and the fewest shared returns a pair needs
+CORRELATION_MAX_SYMBOLS = int(os.getenv("CORRELATION_MAX_SYMBOLS", "500"))
+CORRELATION_MIN_PERIODS = 10
+
+# Seconds each multi-timeframe trend waits for its bars before it is reported as unavailable,
+# and the threads shared by all requests for fetching those bars concurrently
+TREND_DEADLINES = {
+    name: float(os.getenv(f"TREND_DEADLINE_{name.upper()}", os.getenv("TREND_DEADLINE", "5")))
+    for name in ("5m", "15m", "1h", "1d", "1mo")
+}
+TREND_FETCH_WORKERS = int(os.getenv("TREND_FETCH_WORKERS", "8"))
+
+# Seconds a market summary build waits for its bars overall; tickers still pending are
+# carried over from the previous snapshot as stale, or listed as missing. Bars are
+# fetched SUMMARY_FETCH_CHUNK tickers per call on SUMMARY_FETCH_WORKERS threads.
+SUMMARY_DEADLINE = float(os.getenv("SUMMARY_DEADLINE", "10"))
+SUMMARY_FETCH_WORKERS = int(os.getenv("SUMMARY_FETCH_WORKERS", "8"))
+SUMMARY_FETCH_CHUNK = int(os.getenv("SUMMARY_FETCH_CHUNK", "8"))
+
+# Register a circuit breaker for each upstream provider so all of them show up in stats
+for upstream in ("stock_bars", "crypto_bars", "forex", "futures", "chat_completions"):
+    get_breaker(upstream)
+
+# Identical concurrent bar requests and chat prompts share one upstream call
+bars_flight = SingleFlight("bars")
+chat_flight = SingleFlight("chat_completions")
+
+# Bounded pool for the base bar fetches behind technical indicator requests
+trend_executor = ThreadPoolExecutor(max_workers=TREND_FETCH_WORKERS, thread_name_prefix="trend-fetch")
+
+# Bounded pool for the bar fetches behind market summary builds
+summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_FETCH_WORKERS, thread_name_prefix="summary-fetch")
+# Summary fetches not finished yet: (bar size key, ticker) -> (start, future)
+summary_in_flight = {}
+summary_in_flight_lock = threading.Lock()
 
 # Initialize Flask application
 app = Flask(__name__)
-CORS(app)
-
-# We'll initialize stock_client on demand
-stock_client = None
-
-# Mock data generation function as fallback when API fails
-def create_mock_data(ticker, start_date, end_date):
-    # Create a date range from start to end
-    date_range = pd.date_range(start=start_date, end=end_date, freq='B')
-    
-    # Set a seed based on ticker for consistent but different data
-    seed = sum(ord(c) for c in ticker)
-    np.random.seed(seed)
-    
-    # Generate random price data with a trend
-    n = len(date_range)
-    base_price = 100 + np.random.rand() * 900  # Random starting price 
-    
-    # Add a trend and some randomness
-    noise = np.random.normal(0, 1, n)
-    trend = np.linspace(0, 20 * (np.random.rand() - 0.5), n)  # Random trend direction
-    
-    # Calculate prices
-    close_prices = base_price + trend + noise * 5
-    
-    # Ensure no negative prices
-    close_prices = np.maximum(close_prices, 1.0)
-    
-    # Create high, low, open prices
-    high_prices = close_prices + np.random.rand(n) * (close_prices * 0.02)
-    low_prices = close_prices - np.random.rand(n) * (close_prices * 0.02)
-    low_prices = np.maximum(low_prices, 0.1)  # Ensure low prices are positive
-    open_prices = low_prices + np.random.rand(n) * (high_prices - low_prices)
-    
-    # Generate volume
-    volume = np.random.randint(100000, 10000000, n)
-    
-    # Create DataFrame
-    df = pd.DataFrame({
-        'date': date_range.strftime('%Y-%m-%d'),
-        'open': open_prices,
-        'high': high_prices,
-        'low': low_prices,
-        'close': close_prices,
-        'volume': volume
-    })
-    
-    return df.to_dict('records')
+CORS(app, expose_headers=["ETag"])
 
-# Get crypto data from Alpaca's v1beta3 API
-def get_crypto_data(symbol, start_date, end_date, timeframe=TimeFrame.Day):
-    print(f"Attempting to fetch Alpaca Crypto data for {symbol} from {start_date} to {end_date}")
+# Mock data generation function as fallback when API fails.
+# Bars come from the shared synthetic market at the requested bar size: deterministic
+# per ticker and safe to call from concurrent requests, unlike reseeding the global
+# np.random state.
+def create_mock_data(ticker, start_date, end_date, timeframe=TimeFrame.Day, asset_class="stock"):
+    return synthetic_market.bars(
+        ticker, start_date, end_date, alpaca_timeframe_str(timeframe), crypto=asset_class == "crypto"
+    )
+
+# Timeframe to fetch one of the planner's bases with. Bar sizes the planner
+# fetches as they are (warm-up history) go by their Alpaca name, e.g. 1Hour.
+def planner_timeframe(base):
+    if base == MINUTE_BASE:
+        return TimeFrame.Minute
+    if base == DAILY_BASE:
+        return TimeFrame.Day
+    return base
+
+# Convert an Alpaca TimeFrame to the string the REST endpoints expect
+def alpaca_timeframe_str(timeframe):
+    # TimeFrame instances don't compare equal to each other, so match on the string form
+    timeframe_str = str(timeframe)
+    if re.fullmatch(r'\d+(Min|Hour|Day|Week|Month)', timeframe_str):
+        return timeframe_str
+    return '1Day'
+
+# Return the HTTP status when an upstream error means the request was rejected (404,
+# 403, 400...), or None for transient failures such as timeouts, 429 or 5xx. Callers
+# decide whether that rejects the whole layout or just the symbol.
+def endpoint_rejection_status(error):
+    for err in (error, error.__cause__):
+        response = getattr(err, 'response', None)
+        if response is not None and 400 <= response.status_code < 500 and response.status_code != 429:
+            return response.status_code
+    return None
+
+# Get crypto data for several symbols at once from Alpaca's crypto bars endpoints.
+# Returns {symbol: Bars} for every symbol an endpoint answered for, with empty Bars
+# for symbols that have no bars in the range.
+def get_crypto_data_batch(symbols, start_date, end_date, timeframe=TimeFrame.Day):
+    print(f"Attempting to fetch Alpaca Crypto data for {len(symbols)} symbols from {start_date} to {end_date}")
     
     # Validate dates - ensure we don't use future dates
     now = datetime.now()
@@ -111,16 +171,7 @@ def get_crypto_data(symbol, start_date, end_date, timeframe=TimeFrame.Day):
     end_str = end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
     
     # Convert timeframe to appropriate string
-    if timeframe == TimeFrame.Minute:
-        timeframe_str = '1Min'
-    elif timeframe == TimeFrame.Hour:
-        timeframe_str = '1Hour'
-    elif timeframe == TimeFrame.Day:
-        timeframe_str = '1Day'
-    elif timeframe == TimeFrame.Week:
-        timeframe_str = '1Week'
-    else:
-        timeframe_str = '1Day'
+    timeframe_str = alpaca_timeframe_str(timeframe)
     
     # Try multiple API versions/formats to maximize chances of success
     headers = {
@@ -128,200 +179,157 @@ def get_crypto_data(symbol, start_date, end_date, timeframe=TimeFrame.Day):
         'APCA-API-SECRET-KEY': ALPACA_SECRET_KEY
     }
     
-    # Format the symbol correctly - some endpoints need BTC/USD, others need BTCUSD
-    crypto_symbol = symbol
-    formatted_symbol = symbol.replace('/', '')
-    
     # Use data.alpaca.markets for crypto data instead of paper-api.alpaca.markets
     # This is the correct base URL for market data
-    base_url = "https://data.alpaca.markets"
+    base_url = ALPACA_DATA_URL
     
-    # Try different API endpoints in sequence
+    # Try different API endpoints in sequence. Some endpoints need BTC/USD, others
+    # need BTCUSD, and only the "symbols" endpoints accept a comma-separated list.
     apis_to_try = [
         # First try v2 crypto endpoint
-        {
-            "url": f"{base_url}/v2/crypto/bars",
-            "params": {
-                'symbols': formatted_symbol,
-                'start': start_str,
-                'end': end_str,
-                'timeframe': timeframe_str,
-                'limit': 10000
-            }
-        },
+        {"name": "v2", "url": f"{base_url}/v2/crypto/bars", "symbol_param": "symbols", "strip_slash": True},
         # Then try the beta3 endpoint
-        {
-            "url": f"{base_url}/v1beta3/crypto/us/bars",
-            "params": {
-                'symbols': crypto_symbol,
-                'start': start_str,
-                'end': end_str,
-                'timeframe': timeframe_str,
-                'limit': 10000
+        {"name": "v1beta3", "url": f"{base_url}/v1beta3/crypto/us/bars", "symbol_param": "symbols", "strip_slash": False},
+        # Then try another common format (one symbol per request)
+        {"name": "v1beta1", "url": f"{base_url}/v1beta1/crypto/bars", "symbol_param": "symbol", "strip_slash": True}
+    ]
+    
+    # Start with the layout that last worked and skip ones known to be rejected
+    apis_to_try = endpoint_memo.order("crypto", apis_to_try, key=lambda api: api['name'])
+    
+    results = {}
+    for api in apis_to_try:
+        remaining = [s for s in symbols if s not in results and endpoint_memo.usable("crypto", api['name'], s)]
+        if not remaining:
+            break
+        
+        # Multi-symbol endpoints take the remaining symbols in chunks, others one at a time
+        if api['symbol_param'] == 'symbols':
+            batches = [remaining[i:i + ALPACA_SYMBOLS_PER_REQUEST] for i in range(0, len(remaining), ALPACA_SYMBOLS_PER_REQUEST)]
+        else:
+            batches = [[s] for s in remaining]
+        
+        for batch in batches:
+            # Stop using this layout as soon as it has been rejected
+            if not endpoint_memo.usable("crypto", api['name']):
+                break
+            
+            requested = {
+                (s.replace('/', '') if api['strip_slash'] else s): s
+                for s in batch
             }
-        },
-        # Then try another common format
-        {
-            "url": f"{base_url}/v1beta1/crypto/bars",
-            "params": {
-                'symbol': formatted_symbol,
+            params = {
+                api['symbol_param']: ','.join(requested),
                 'start': start_str,
                 'end': end_str,
                 'timeframe': timeframe_str,
                 'limit': 10000
             }
-        }
-    ]
-    
-    for api in apis_to_try:
-        try:
-            print(f"Making request to: {api['url']} with params: {api['params']}")
-            response = requests.get(api['url'], headers=headers, params=api['params'])
             
-            # If successful, process the response
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Handle different response formats
-                if 'bars' in data and crypto_symbol in data['bars'] and data['bars'][crypto_symbol]:
-                    # Format for v1beta3 endpoint
-                    bars = data['bars'][crypto_symbol]
-                    
-                    # Convert to DataFrame
-                    df = pd.DataFrame(bars)
-                    df['date'] = pd.to_datetime(df['t']).dt.strftime('%Y-%m-%d')
-                    df['open'] = df['o']
-                    df['high'] = df['h']
-                    df['low'] = df['l']
-                    df['close'] = df['c']
-                    df['volume'] = df['v']
-                    
-                    # Select only the columns we need
-                    df = df[['date', 'open', 'high', 'low', 'close', 'volume']]
-                    
-                    result = df.to_dict('records')
-                    print(f"SUCCESS: Got real Alpaca crypto data for {symbol} - {len(result)} bars")
-                    return result
+            try:
+                raw_bars = {}
+                answered = False
                 
-                elif 'bars' in data and formatted_symbol in data.get('bars', {}):
-                    # Format for v2 endpoint
-                    bars = data['bars'][formatted_symbol]
-                    
-                    # Convert to DataFrame
-                    df = pd.DataFrame(bars)
-                    df['date'] = pd.to_datetime(df['t']).dt.strftime('%Y-%m-%d')
-                    df['open'] = df['o']
-                    df['high'] = df['h']
-                    df['low'] = df['l']
-                    df['close'] = df['c']
-                    df['volume'] = df['v']
-                    
-                    # Select only the columns we need
-                    df = df[['date', 'open', 'high', 'low', 'close', 'volume']]
+                # Keep following next_page_token until every page has been read
+                while True:
+                    print(f"Making request to: {api['url']} with params: {params}")
+                    response = transport.get(api['url'], headers=headers, params=params, breaker="crypto_bars")
+                    if response.status_code != 200:
+                        # Drop any earlier pages so we never keep a partial range
+                        print(f"Crypto API endpoint {api['url']} returned {response.status_code}")
+                        if response.status_code == 404:
+                            # The route itself does not exist
+                            endpoint_memo.record_failure("crypto", api['name'], "HTTP 404")
+                        elif 400 <= response.status_code < 500 and response.status_code != 429:
+                            # Any other rejection may be down to one symbol, so only skip this batch's
+                            for symbol in batch:
+                                endpoint_memo.record_failure("crypto", api['name'], f"HTTP {response.status_code}", symbol)
+                        raw_bars = {}
+                        break
                     
-                    result = df.to_dict('records')
-                    print(f"SUCCESS: Got real Alpaca crypto data for {symbol} - {len(result)} bars")
-                    return result
-                
-                elif isinstance(data, list) and len(data) > 0:
-                    # Simple list format (some endpoints return a list of bars)
-                    bars = data
+                    data = response.json()
                     
-                    # Convert to DataFrame
-                    df = pd.DataFrame(bars)
+                    # Handle different response formats
+                    if isinstance(data, list):
+                        # Simple list format (some endpoints return a list of bars for one symbol)
+                        raw_bars.setdefault(batch[0], []).extend(data)
+                        endpoint_memo.record_success("crypto", api['name'])
+                        answered = True
+                        break
                     
-                    # Handle different column naming
-                    if 't' in df.columns:
-                        df['date'] = pd.to_datetime(df['t']).dt.strftime('%Y-%m-%d')
+                    bars = data.get('bars')
+                    if isinstance(bars, dict):
+                        # Bars keyed by symbol, as either BTC/USD or BTCUSD
+                        for key, symbol_bars in bars.items():
+                            symbol = requested.get(key) or requested.get(key.replace('/', ''))
+                            if symbol and symbol_bars:
+                                raw_bars.setdefault(symbol, []).extend(symbol_bars)
+                    elif isinstance(bars, list) and len(batch) == 1:
+                        raw_bars.setdefault(batch[0], []).extend(bars)
                     else:
-                        df['date'] = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d')
-                        
-                    # Map standard column names
-                    col_mappings = {
-                        'o': 'open', 'open': 'open',
-                        'h': 'high', 'high': 'high',
-                        'l': 'low', 'low': 'low',
-                        'c': 'close', 'close': 'close',
-                        'v': 'volume', 'volume': 'volume'
-                    }
-                    
-                    # Rename columns appropriately
-                    for orig_col, target_col in col_mappings.items():
-                        if orig_col in df.columns:
-                            df[target_col] = df[orig_col]
-                    
-                    # Ensure minimum required columns
-                    required_cols = ['date', 'open', 'high', 'low', 'close', 'volume']
-                    missing_cols = [col for col in required_cols if col not in df.columns]
-                    
-                    # Generate default values for missing columns
-                    for col in missing_cols:
-                        if col == 'volume':
-                            df[col] = 0
-                        elif col == 'date':
-                            df[col] = start_date.strftime('%Y-%m-%d')
-                        else:
-                            # For missing price columns, use the first available price column
-                            price_cols = [c for c in df.columns if c in ['open', 'high', 'low', 'close']]
-                            if price_cols:
-                                df[col] = df[price_cols[0]]
-                            else:
-                                # If no price columns, create fake data
-                                df[col] = 100.0
-                    
-                    # Select only the columns we need
-                    df = df[required_cols]
+                        print(f"Data returned from API but in unexpected format: {str(data)[:200]}")
+                        endpoint_memo.record_failure("crypto", api['name'], "unexpected response format")
+                        raw_bars = {}
+                        break
                     
-                    result = df.to_dict('records')
-                    print(f"SUCCESS: Got real Alpaca crypto data for {symbol} - {len(result)} bars")
-                    return result
+                    endpoint_memo.record_success("crypto", api['name'])
+                    if not data.get('next_page_token'):
+                        answered = True
+                        break
+                    params['page_token'] = data['next_page_token']
                 
-                else:
-                    print(f"Data returned from API but in unexpected format: {data}")
-                    continue  # Try next API endpoint
-        
-        except Exception as e:
-            print(f"Error trying crypto API endpoint {api['url']}: {e}")
-            continue  # Try next API endpoint
+                for symbol, symbol_bars in raw_bars.items():
+                    if symbol_bars:
+                        results[symbol] = Bars.from_alpaca(symbol_bars)
+                        print(f"SUCCESS: Got real Alpaca crypto data for {symbol} - {len(results[symbol])} bars")
+                
+                if answered:
+                    # Symbols the endpoint answered for without bars have none in the range
+                    for symbol in batch:
+                        results.setdefault(symbol, Bars.empty())
+            
+            except Exception as e:
+                print(f"Error trying crypto API endpoint {api['url']}: {e}")
+                continue  # Try next batch / API endpoint
+    
+    return results
+
+# Get crypto data for a single symbol
+def get_crypto_data(symbol, start_date, end_date, timeframe=TimeFrame.Day):
+    result = get_crypto_data_batch([symbol], start_date, end_date, timeframe).get(symbol)
     
-    # If all API attempts failed, fall back to mock data
-    print(f"All crypto API attempts failed for {symbol}, using mock data instead")
-    return create_mock_data(symbol, start_date, end_date)
+    # If all API attempts failed, let the caller fall back to mock data
+    if result is None:
+        raise MarketDataUnavailable(f"All crypto API attempts failed for {symbol}")
+    if not len(result):
+        raise NoBarsInRange(f"No crypto bars for {symbol} between {start_date} and {end_date}")
+    return result
 
 # Get forex data (this will attempt to use Alpaca's API if available)
 def get_forex_data(symbol, start_date, end_date, timeframe=TimeFrame.Day):
-    try:
-        print(f"Attempting to fetch Forex data for {symbol} from {start_date} to {end_date}")
-        
-        # For forex, we need to format the symbol properly - remove =X suffix
-        clean_symbol = symbol.replace('=X', '')
-        
-        # Format dates for the API
-        start_str = start_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-        end_str = end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-        
-        # Convert timeframe to appropriate string
-        if timeframe == TimeFrame.Minute:
-            timeframe_str = '1Min'
-        elif timeframe == TimeFrame.Hour:
-            timeframe_str = '1Hour'
-        elif timeframe == TimeFrame.Day:
-            timeframe_str = '1Day'
-        elif timeframe == TimeFrame.Week:
-            timeframe_str = '1Week'
-        else:
-            timeframe_str = '1Day'
-        
+    print(f"Attempting to fetch Forex data for {symbol} from {start_date} to {end_date}")
+    
+    # For forex, we need to format the symbol properly - remove =X suffix
+    clean_symbol = symbol.replace('=X', '')
+    
+    # Format dates for the API
+    start_str = start_date.strftime('%Y-%m-%dT%H:%M:%SZ')
+    end_str = end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
+    
+    # Convert timeframe to appropriate string
+    timeframe_str = alpaca_timeframe_str(timeframe)
+    
+    headers = {
+        'APCA-API-KEY-ID': ALPACA_API_KEY,
+        'APCA-API-SECRET-KEY': ALPACA_SECRET_KEY
+    }
+    
+    # Attempt to get forex data through Alpaca forex bars endpoint
+    def fetch_bars():
         # Format the symbol for URL - remove slashes
         formatted_symbol = clean_symbol.replace('/', '')
         
-        # Attempt to get forex data through Alpaca forex endpoint
-        headers = {
-            'APCA-API-KEY-ID': ALPACA_API_KEY,
-            'APCA-API-SECRET-KEY': ALPACA_SECRET_KEY
-        }
-        
-        url = f"{ALPACA_BASE_URL}/v1beta1/forex/{formatted_symbol}/bars"
+        url = f"{ALPACA_DATA_URL}/v1beta1/forex/{formatted_symbol}/bars"
         params = {
             'start': start_str,
             'end': end_str,
@@ -330,207 +338,203 @@ def get_forex_data(symbol, start_date, end_date, timeframe=TimeFrame.Day):
         }
         
         print(f"Making request to: {url}")
-        response = requests.get(url, headers=headers, params=params)
+        response = transport.get(url, headers=headers, params=params, breaker="forex")
         response.raise_for_status()
         
         # Process the response
         data = response.json()
-        if 'bars' in data and data['bars']:
-            bars = data['bars']
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(bars)
-            df['date'] = pd.to_datetime(df['t']).dt.strftime('%Y-%m-%d')
-            df['open'] = df['o']
-            df['high'] = df['h']
-            df['low'] = df['l']
-            df['close'] = df['c']
-            df['volume'] = df['v']
-            
-            # Select only the columns we need
-            df = df[['date', 'open', 'high', 'low', 'close', 'volume']]
-            
-            result = df.to_dict('records')
-            print(f"SUCCESS: Got real Alpaca forex data for {symbol} - {len(result)} bars")
-            return result
-        else:
+        if not ('bars' in data and data['bars']):
             raise Exception("No forex data returned in the response")
-            
-    except Exception as e:
-        print(f"Error fetching forex data from Alpaca for {symbol}: {e}")
+        
+        return Bars.from_alpaca(data['bars'])
+    
+    # Alternative historical rates endpoint
+    def fetch_rates():
+        # Format currency pair parts
+        if '/' in clean_symbol:
+            base, quote = clean_symbol.split('/')
+        else:
+            # For DXY or other special cases
+            raise Exception(f"Cannot process special forex symbol: {clean_symbol}")
+        
+        url = f"{ALPACA_DATA_URL}/v1beta1/forex/rates/{base}/{quote}/history"
+        params = {
+            'start': start_str,
+            'end': end_str,
+            'timeframe': timeframe_str
+        }
+        
+        print(f"Making request to: {url}")
+        response = transport.get(url, headers=headers, params=params, breaker="forex")
+        response.raise_for_status()
+        
+        data = response.json()
+        if not ('rates' in data and data['rates']):
+            raise Exception("No forex rates returned in the response")
+        
+        # Rates only carry one price, so estimate the bar around it
+        rates = data['rates']
+        rate = np.array([r['rate'] for r in rates], dtype=np.float64)
+        return Bars(
+            pd.to_datetime([r['timestamp'] for r in rates], utc=True).tz_localize(None).values,
+            rate,
+            rate * 1.0001,  # Estimate
+            rate * 0.9999,  # Estimate
+            rate,
+            np.zeros(len(rate))  # No volume for forex rates
+        ).sorted()
+    
+    # Try the layout that last worked first and skip ones known to be rejected
+    layouts = {"bars": fetch_bars, "rates": fetch_rates}
+    for layout in endpoint_memo.order("forex", list(layouts), symbol=symbol):
         try:
-            # Attempt to use alternative endpoint
-            print(f"Attempting to use historical rates endpoint for {clean_symbol}")
-            
-            # Format currency pair parts
-            if '/' in clean_symbol:
-                base, quote = clean_symbol.split('/')
-            else:
-                # For DXY or other special cases
-                raise Exception(f"Cannot process special forex symbol: {clean_symbol}")
-            
-            url = f"{ALPACA_BASE_URL}/v1beta1/forex/rates/{base}/{quote}/history"
-            params = {
-                'start': start_str,
-                'end': end_str,
-                'timeframe': timeframe_str
-            }
-            
-            print(f"Making request to: {url}")
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            if 'rates' in data and data['rates']:
-                rates = data['rates']
-                
-                # Convert to DataFrame
-                df = pd.DataFrame(rates)
-                df['date'] = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d')
-                df['open'] = df['rate']
-                df['high'] = df['rate'] * 1.0001  # Estimate
-                df['low'] = df['rate'] * 0.9999   # Estimate
-                df['close'] = df['rate']
-                df['volume'] = 0  # No volume for forex rates
-                
-                # Select only the columns we need
-                df = df[['date', 'open', 'high', 'low', 'close', 'volume']]
-                
-                result = df.to_dict('records')
-                print(f"SUCCESS: Got real Alpaca forex rates for {symbol} - {len(result)} bars")
-                return result
-            else:
-                raise Exception("No forex rates returned in the response")
-                
-        except Exception as alt_error:
-            print(f"Error with alternative forex approach for {symbol}: {alt_error}")
-            # Fallback to mock data if Alpaca forex API is not available
-            mock_data = create_mock_data(symbol, start_date, end_date)
-            print(f"FALLBACK: Using mock data for forex {symbol}")
-            return mock_data
+            result = layouts[layout]()
+        except Exception as e:
+            print(f"Error fetching forex data ({layout} endpoint) from Alpaca for {symbol}: {e}")
+            rejected_status = endpoint_rejection_status(e)
+            if rejected_status:
+                # The symbol is part of the URL, so the rejection only holds for this symbol
+                endpoint_memo.record_failure("forex", layout, f"HTTP {rejected_status}", symbol)
+            continue
+        
+        endpoint_memo.record_success("forex", layout, symbol)
+        print(f"SUCCESS: Got real Alpaca forex {layout} for {symbol} - {len(result)} bars")
+        return result
+    
+    # Let the caller fall back to mock data if Alpaca forex API is not available
+    raise MarketDataUnavailable(f"No forex data available for {symbol}")
 
 # Get commodity data using Alpaca API if available
 def get_commodity_data(symbol, start_date, end_date, timeframe=TimeFrame.Day):
-    try:
-        print(f"Attempting to fetch commodity data for {symbol} from {start_date} to {end_date}")
-        
-        # Clean up any special markers like =F
-        clean_symbol = symbol.replace('=F', '')
-        
-        # Format dates for the API
-        start_str = start_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-        end_str = end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-        
-        # Convert timeframe to appropriate string
-        if timeframe == TimeFrame.Minute:
-            timeframe_str = '1Min'
-        elif timeframe == TimeFrame.Hour:
-            timeframe_str = '1Hour'
-        elif timeframe == TimeFrame.Day:
-            timeframe_str = '1Day'
-        elif timeframe == TimeFrame.Week:
-            timeframe_str = '1Week'
-        else:
-            timeframe_str = '1Day'
+    print(f"Attempting to fetch commodity data for {symbol} from {start_date} to {end_date}")
+    
+    # Clean up any special markers like =F
+    clean_symbol = symbol.replace('=F', '')
+    
+    # Get data through Stock API (some commodities like GLD)
+    def fetch_stock():
+        return get_stock_data(clean_symbol, start_date, end_date, timeframe)
+    
+    # Attempt to use futures API if available
+    def fetch_futures():
+        headers = {
+            'APCA-API-KEY-ID': ALPACA_API_KEY,
+            'APCA-API-SECRET-KEY': ALPACA_SECRET_KEY
+        }
+        
+        url = f"{ALPACA_DATA_URL}/v1beta1/futures/{clean_symbol}/bars"
+        params = {
+            'start': start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'end': end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'timeframe': alpaca_timeframe_str(timeframe),
+            'limit': 10000
+        }
+        
+        print(f"Making request to: {url}")
+        response = transport.get(url, headers=headers, params=params, breaker="futures")
+        response.raise_for_status()
+        
+        # Process the response
+        data = response.json()
+        if not ('bars' in data and data['bars']):
+            raise Exception("No futures data returned in the response")
         
-        # Try to get data through Stock API first (some commodities like GLD)
+        return Bars.from_alpaca(data['bars'])
+    
+    # Try the layout that last worked first and skip ones known to be rejected
+    layouts = {"stock": fetch_stock, "futures": fetch_futures}
+    for layout in endpoint_memo.order("commodities", list(layouts), symbol=symbol):
         try:
-            print(f"Attempting to get {clean_symbol} as stock")
-            request_params = StockBarsRequest(
-                symbol_or_symbols=clean_symbol,
-                timeframe=timeframe,
-                start=start_date,
-                end=end_date,
-                feed='iex'  # Use IEX as data source
-            )
-            bars = stock_client.get_stock_bars(request_params)
-            
-            # Check if bars is None or empty
-            if bars is None or not hasattr(bars, 'df') or bars.df.empty:
-                raise Exception(f"No stock data returned for {clean_symbol}")
-                
-            df = bars.df.reset_index()
-            
-            # Process the DataFrame to match our expected format
-            df = df.rename(columns={
-                'timestamp': 'date',
-                'open': 'open',
-                'high': 'high',
-                'low': 'low',
-                'close': 'close',
-                'volume': 'volume'
-            })
-            
-            # Format date
-            df['date'] = df['date'].dt.strftime('%Y-%m-%d')
-            
-            # Drop level 0 of the multi-index if it exists
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.droplevel(0)
-            
-            # Handle symbol column if it exists
-            if 'symbol' in df.columns:
-                df = df.drop('symbol', axis=1)
-                
-            result = df.to_dict('records')
-            print(f"SUCCESS: Got real Alpaca stock data for commodity {symbol} - {len(result)} bars")
-            return result
-                
-        except Exception as stock_error:
-            print(f"Could not get {clean_symbol} as stock: {stock_error}")
-            
-            # Attempt to use futures API if available
-            headers = {
-                'APCA-API-KEY-ID': ALPACA_API_KEY,
-                'APCA-API-SECRET-KEY': ALPACA_SECRET_KEY
-            }
-            
-            url = f"{ALPACA_BASE_URL}/v1beta1/futures/{clean_symbol}/bars"
-            params = {
-                'start': start_str,
-                'end': end_str,
-                'timeframe': timeframe_str,
-                'limit': 10000
-            }
-            
-            print(f"Making request to: {url}")
-            response = requests.get(url, headers=headers, params=params)
+            result = layouts[layout]()
+        except Exception as e:
+            print(f"Could not get {clean_symbol} from the {layout} endpoint: {e}")
+            rejected_status = endpoint_rejection_status(e)
+            if rejected_status:
+                # A 4xx here is about this symbol (unknown ticker or contract), not the whole layout
+                endpoint_memo.record_failure("commodities", layout, f"HTTP {rejected_status}", symbol)
+            continue
+        
+        endpoint_memo.record_success("commodities", layout, symbol)
+        print(f"SUCCESS: Got real Alpaca {layout} data for commodity {symbol} - {len(result)} bars")
+        return result
+    
+    # Let the caller fall back to mock data if Alpaca API is not available
+    raise MarketDataUnavailable(f"No commodity data available for {symbol}")
+
+# Get stock and ETF bars for several tickers at once from Alpaca's v2 stock bars endpoint,
+# ALPACA_SYMBOLS_PER_REQUEST tickers per request. Returns {ticker: Bars} for every ticker
+# of a request that succeeded (empty Bars if the range has none); raises
+# MarketDataUnavailable only if every request failed.
+def get_stock_data_batch(tickers, start_date, end_date, timeframe=TimeFrame.Day):
+    tickers = list(tickers)
+    chunks = [tickers[i:i + ALPACA_SYMBOLS_PER_REQUEST] for i in range(0, len(tickers), ALPACA_SYMBOLS_PER_REQUEST)]
+    results, failures = {}, []
+    for chunk in chunks:
+        try:
+            results.update(get_stock_data_chunk(chunk, start_date, end_date, timeframe))
+        except MarketDataUnavailable as e:
+            failures.append(e)
+    if failures and len(failures) == len(chunks):
+        raise failures[0]
+    return results
+
+# One v2 stock bars request (with its pages) for a chunk of tickers
+def get_stock_data_chunk(tickers, start_date, end_date, timeframe):
+    headers = {
+        'APCA-API-KEY-ID': ALPACA_API_KEY,
+        'APCA-API-SECRET-KEY': ALPACA_SECRET_KEY
+    }
+    params = {
+        'symbols': ','.join(tickers),
+        'start': start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'end': end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'timeframe': alpaca_timeframe_str(timeframe),
+        'adjustment': 'raw',
+        'feed': 'iex',  # Add IEX feed for stocks
+        'limit': 10000
+    }
+    
+    raw_bars = {}
+    try:
+        # Keep following next_page_token until every page has been read
+        while True:
+            response = transport.get(f"{ALPACA_DATA_URL}/v2/stocks/bars", headers=headers, params=params, breaker="stock_bars")
             response.raise_for_status()
-            
-            # Process the response
             data = response.json()
-            if 'bars' in data and data['bars']:
-                bars = data['bars']
-                
-                # Convert to DataFrame
-                df = pd.DataFrame(bars)
-                df['date'] = pd.to_datetime(df['t']).dt.strftime('%Y-%m-%d')
-                df['open'] = df['o']
-                df['high'] = df['h']
-                df['low'] = df['l']
-                df['close'] = df['c']
-                df['volume'] = df['v']
-                
-                # Select only the columns we need
-                df = df[['date', 'open', 'high', 'low', 'close', 'volume']]
-                
-                result = df.to_dict('records')
-                print(f"SUCCESS: Got real Alpaca futures data for {symbol} - {len(result)} bars")
-                return result
-            else:
-                raise Exception("No futures data returned in the response")
-                
+            for ticker, bars in (data.get('bars') or {}).items():
+                raw_bars.setdefault(ticker, []).extend(bars or [])
+            
+            if not data.get('next_page_token'):
+                break
+            params['page_token'] = data['next_page_token']
     except Exception as e:
-        print(f"Error fetching commodity data from Alpaca for {symbol}: {e}")
-        # Fallback to mock data if Alpaca API is not available
-        mock_data = create_mock_data(symbol, start_date, end_date)
-        print(f"FALLBACK: Using mock data for commodity {symbol}")
-        return mock_data
-
-# Get actual market data from Alpaca
-def get_alpaca_data(ticker, start_date, end_date, timeframe=TimeFrame.Day, asset_class="stock"):
-    print(f"Attempting to fetch Alpaca data for {ticker} from {start_date} to {end_date}")
+        print(f"Error in Alpaca API call: {e}")
+        raise MarketDataUnavailable(f"Alpaca stock request failed for {', '.join(tickers)}") from e
     
+    # Tickers the response has no bars for get empty Bars: the range has none
+    results = {ticker: Bars.empty() for ticker in tickers}
+    for ticker, bars in raw_bars.items():
+        if not bars:
+            continue
+        
+        results[ticker] = Bars.from_alpaca(bars)
+        print(f"SUCCESS: Got real Alpaca data for {ticker} - {len(results[ticker])} bars")
+    
+    return results
+
+# Get stock and ETF bars for a single ticker
+def get_stock_data(ticker, start_date, end_date, timeframe=TimeFrame.Day):
+    result = get_stock_data_batch([ticker], start_date, end_date, timeframe).get(ticker)
+    if result is None:
+        raise MarketDataUnavailable(f"No data returned from Alpaca for {ticker}")
+    if not len(result):
+        raise NoBarsInRange(f"No Alpaca bars for {ticker} between {start_date} and {end_date}")
+    return result
+
+# Fetch bars straight from the upstream provider for the given asset class.
+# Raises MarketDataUnavailable instead of returning mock data, or NoBarsInRange
+# when upstream answered without any bars.
+def fetch_upstream_bars(ticker, start_date, end_date, timeframe=TimeFrame.Day, asset_class="stock"):
     if asset_class == "crypto":
         # Use the direct v1beta1 crypto endpoint
         return get_crypto_data(ticker, start_date, end_date, timeframe)
@@ -542,63 +546,108 @@ def get_alpaca_data(ticker, start_date, end_date, timeframe=TimeFrame.Day, asset
         return get_commodity_data(ticker, start_date, end_date, timeframe)
     else:
         # For stocks and ETFs, use the stock client
-        global stock_client
-        
-        # Initialize the stock client if it's not already initialized
-        if stock_client is None:
+        return get_stock_data(ticker, start_date, end_date, timeframe)
+
+# Batched version of fetch_upstream_bars: returns {ticker: Bars} for the tickers
+# upstream answered for (empty Bars if the range has none), using as few upstream
+# calls as the provider allows.
+def fetch_upstream_bars_batch(tickers, start_date, end_date, timeframe=TimeFrame.Day, asset_class="stock"):
+    if asset_class == "crypto":
+        return get_crypto_data_batch(tickers, start_date, end_date, timeframe)
+    elif asset_class in ("forex", "commodities"):
+        # These endpoints only take one symbol per request
+        results = {}
+        for ticker in tickers:
             try:
-                # Attempt to initialize with real API keys
-                stock_client = StockHistoricalDataClient(ALPACA_API_KEY, ALPACA_SECRET_KEY)
-                print("Initialized real Alpaca stock client")
-            except Exception as e:
-                print(f"Error initializing Alpaca stock client: {e}, using mock client")
-                # Use a mock client that just returns signature but no real data
-                stock_client = StockHistoricalDataClient("mock", "mock")
-        
-        # Create request for stock bars
-        request_params = StockBarsRequest(
-            symbol_or_symbols=[ticker],
-            timeframe=timeframe,
-            start=start_date,
-            end=end_date,
-            adjustment='raw',
-            feed='iex'  # Add IEX feed for stocks
+                results[ticker] = fetch_upstream_bars(ticker, start_date, end_date, timeframe, asset_class)
+            except MarketDataUnavailable as e:
+                print(f"{e}")
+        return results
+    else:
+        try:
+            return get_stock_data_batch(tickers, start_date, end_date, timeframe)
+        except MarketDataUnavailable as e:
+            print(f"{e}")
+            return {}
+
+# Normalise a bar request so concurrent requests for the same data map to one key.
+# Daily requests match on dates, intraday requests to the minute.
+def bar_request_key(tickers, start_date, end_date, timeframe, asset_class):
+    time_format = '%Y-%m-%d' if str(timeframe) == str(TimeFrame.Day) else '%Y-%m-%dT%H:%M'
+    return (
+        tuple(sorted(set(tickers))),
+        asset_class,
+        str(timeframe),
+        start_date.strftime(time_format),
+        end_date.strftime(time_format)
+    )
+
+# Get actual market data from Alpaca as columnar Bars
+def get_alpaca_bars(ticker, start_date, end_date, timeframe=TimeFrame.Day, asset_class="stock"):
+    print(f"Attempting to fetch Alpaca data for {ticker} from {start_date} to {end_date}")
+    
+    def load():
+        try:
+            if str(timeframe) == str(TimeFrame.Day):
+                # Daily bars come from the local bar store, which only fetches missing ranges
+                return bar_store.read_through(
+                    ticker, asset_class, timeframe, start_date, end_date,
+                    lambda start, end: fetch_upstream_bars(ticker, start, end, timeframe, asset_class)
+                )
+            return fetch_upstream_bars(ticker, start_date, end_date, timeframe, asset_class)
+        except MarketDataUnavailable as e:
+            # If we can't get real data, fall back to mock data
+            print(f"{e}, falling back to mock data")
+            return create_mock_data(ticker, start_date, end_date, timeframe, asset_class)
+    
+    # Identical requests already in flight share that call's result. Bars are
+    # read-only, so a shared result can be handed out without copying.
+    bars, _ = bars_flight.do(bar_request_key([ticker], start_date, end_date, timeframe, asset_class), load)
+    return bars
+
+# Get market data for several tickers of one asset class at once.
+# Returns {ticker: Bars}, with mock data for tickers that could not be fetched.
+def get_alpaca_data_batch(tickers, start_date, end_date, timeframe=TimeFrame.Day, asset_class="stock"):
+    tickers = list(dict.fromkeys(tickers))  # Drop duplicates, keep order
+    print(f"Attempting to fetch Alpaca data for {len(tickers)} {asset_class} tickers from {start_date} to {end_date}")
+    
+    # Identical batches already in flight share that call's result
+    results, shared = bars_flight.do(
+        ("batch",) + bar_request_key(tickers, start_date, end_date, timeframe, asset_class),
+        lambda: load_alpaca_data_batch(tickers, start_date, end_date, timeframe, asset_class)
+    )
+    # The Bars are read-only, only the dict around them needs copying
+    return dict(results) if shared else results
+
+# Load a batch of tickers from the bar store / upstream, with mock data for failures
+def load_alpaca_data_batch(tickers, start_date, end_date, timeframe, asset_class):
+    results = {}
+    if str(timeframe) == str(TimeFrame.Day):
+        # Fetch the date ranges missing from the local bar store; tickers missing
+        # the same range are fetched together in one call
+        bar_store.fill_missing(
+            tickers, asset_class, timeframe, start_date, end_date,
+            lambda gap_tickers, gap_start, gap_end: fetch_upstream_bars_batch(
+                gap_tickers, gap_start, gap_end, timeframe, asset_class
+            )
         )
         
-        try:
-            bars = stock_client.get_stock_bars(request_params)
-            
-            # Check if bars is None or empty
-            if bars is None or not hasattr(bars, 'df') or bars.df.empty:
-                print(f"No data returned from Alpaca for {ticker}, falling back to mock data")
-                return create_mock_data(ticker, start_date, end_date)
-                
-            # Convert to a simple list of dictionaries for consistency
-            df = bars.df.reset_index()
-            
-            # Format dates correctly
-            df['date'] = df['timestamp'].dt.strftime('%Y-%m-%d')
-            
-            # Keep only the columns we care about
-            result_df = df[['date', 'open', 'high', 'low', 'close', 'volume']]
-            
-            # Convert to list of dictionaries (records)
-            result = result_df.to_dict('records')
-            
-            # Sort by date if needed
-            result = sorted(result, key=lambda x: x['date'])
-            
-            # If we got an empty result, fall back to mock data
-            if not result:
-                print(f"Empty result from Alpaca for {ticker}, falling back to mock data")
-                return create_mock_data(ticker, start_date, end_date)
-                
-            print(f"SUCCESS: Got real Alpaca data for {ticker} - {len(result)} bars")
-            return result
-        except Exception as e:
-            print(f"Error in Alpaca API call: {e}, falling back to mock data")
-            # If we get an error, fall back to mock data
-            return create_mock_data(ticker, start_date, end_date)
+        for ticker in tickers:
+            try:
+                results[ticker] = bar_store.read(ticker, asset_class, timeframe, start_date, end_date)
+            except MarketDataUnavailable as e:
+                print(f"{e}, falling back to mock data")
+                results[ticker] = create_mock_data(ticker, start_date, end_date, timeframe, asset_class)
+    else:
+        fetched = fetch_upstream_bars_batch(tickers, start_date, end_date, timeframe, asset_class)
+        for ticker in tickers:
+            if ticker in fetched and len(fetched[ticker]):
+                results[ticker] = fetched[ticker]
+            else:
+                print(f"No data for {ticker}, falling back to mock data")
+                results[ticker] = create_mock_data(ticker, start_date, end_date, timeframe, asset_class)
+    
+    return results
 
 # Dictionary of all market data
 markets = {
@@ -664,6 +713,65 @@ def get_tickers(category):
             "message": f"Category {category} not found"
         }), 404
 
+# Connection pool utilisation and retry counters for the shared HTTP transport
+@app.route('/api/stats/transport', methods=['GET'])
+def get_transport_stats():
+    return jsonify({
+        "status": "success",
+        "data": transport.stats()
+    })
+
+# Preferred and negatively cached endpoint layouts per asset class
+@app.route('/api/stats/endpoints', methods=['GET'])
+def get_endpoint_stats():
+    return jsonify({
+        "status": "success",
+        "data": endpoint_memo.stats()
+    })
+
+# State of the circuit breaker in front of each upstream provider
+@app.route('/api/stats/circuit-breakers', methods=['GET'])
+def get_circuit_breaker_stats():
+    return jsonify({
+        "status": "success",
+        "data": breaker_states()
+    })
+
+# How many identical bar and chat requests were coalesced into one upstream call
+@app.route('/api/stats/single-flight', methods=['GET'])
+def get_single_flight_stats():
+    return jsonify({
+        "status": "success",
+        "data": {
+            "bars": bars_flight.stats(),
+            "chat_completions": chat_flight.stats()
+        }
+    })
+
+# Streaming indicator series held in memory and how often they were rebuilt vs extended
+@app.route('/api/stats/indicator-engine', methods=['GET'])
+def get_indicator_engine_stats():
+    return jsonify({
+        "status": "success",
+        "data": indicator_engine.stats()
+    })
+
+# Hit/miss/eviction counters and memory use of the technical indicator result cache
+@app.route('/api/stats/indicator-cache', methods=['GET'])
+def get_indicator_cache_stats():
+    return jsonify({
+        "status": "success",
+        "data": indicator_cache.stats()
+    })
+
+# Hit/miss counters and size of the cached correlation price panels
+@app.route('/api/stats/correlation-panels', methods=['GET'])
+def get_correlation_panel_stats():
+    return jsonify({
+        "status": "success",
+        "data": panel_cache.stats()
+    })
+
 # Calculate appropriate date ranges accounting for market holidays and weekends
 def get_market_date_range(time_range):
     """
@@ -720,65 +828,54 @@ def get_market_date_range(time_range):
     print(f"Date range for {time_range}: {start} to {end}")
     return start, end, timeframe
 
-# Filter the data to get the right time range, accounting for holidays and weekends
-def filter_data_to_timeframe(data, time_range):
-    """Filter data to match the requested time range, handling edge cases for recent data"""
-    if not data or len(data) < 2:
-        return data
-        
-    # Sort data by timestamp to ensure proper ordering
-    if isinstance(data[0].get('timestamp', None), (str, datetime)):
-        # Convert timestamps to datetime objects if they're strings
-        for item in data:
-            if isinstance(item.get('timestamp'), str):
-                item['timestamp'] = datetime.fromisoformat(item['timestamp'].replace('Z', '+00:00'))
-        
-        # Sort by timestamp
-        data = sorted(data, key=lambda x: x.get('timestamp'))
+# Filter the bars to the right time range, accounting for holidays and weekends
+def filter_bars_to_timeframe(bars, time_range):
+    """Trim Bars to the requested time range, keeping at least a few recent bars"""
+    if len(bars) < 2:
+        return bars
     
-    # For 1d timeframe, return just the most recent day's data
+    # For 1d timeframe, return just the most recent day's data (up to 24 hours)
     if time_range == '1d':
-        # Get the most recent day's data (up to 24 hours)
-        latest_timestamp = data[-1].get('timestamp')
-        if latest_timestamp:
-            cutoff = latest_timestamp - timedelta(hours=24)
-            # Skip items with None timestamps
-            filtered_data = [item for item in data if item.get('timestamp') and item.get('timestamp') >= cutoff]
-            # Make sure we have at least some data
-            return filtered_data if filtered_data else [data[-1]]
-    
-    # For other timeframes, match the period more precisely
-    current_date = datetime.now()
+        filtered = bars.since(bars.timestamp[-1] - np.timedelta64(24, 'h'))
+        return filtered if len(filtered) else bars.take(slice(-1, None))
     
-    if time_range == '5d':
-        cutoff = current_date - timedelta(days=5)
-    elif time_range == '1mo':
-        cutoff = current_date - timedelta(days=30)
-    elif time_range == '3mo':
-        cutoff = current_date - timedelta(days=90)
-    elif time_range == '6mo':
-        cutoff = current_date - timedelta(days=180)
-    elif time_range == 'ytd':
-        cutoff = datetime(current_date.year, 1, 1)
-    elif time_range == '1y':
-        cutoff = current_date - timedelta(days=365)
-    elif time_range == '5y':
-        cutoff = current_date - timedelta(days=365*5)
-    else:
+    current_date = datetime.now()
+    cutoffs = {
+        '5d': current_date - timedelta(days=5),
+        '1mo': current_date - timedelta(days=30),
+        '3mo': current_date - timedelta(days=90),
+        '6mo': current_date - timedelta(days=180),
+        'ytd': datetime(current_date.year, 1, 1),
+        '1y': current_date - timedelta(days=365),
+        '5y': current_date - timedelta(days=365*5)
+    }
+    if time_range not in cutoffs:
         # Default to full dataset
-        return data
-    
-    # Filter to the appropriate timeframe, skipping items with None timestamps
-    filtered_data = [item for item in data if item.get('timestamp') and item.get('timestamp') >= cutoff]
+        return bars
     
     # Ensure we have at least some data
-    return filtered_data if filtered_data else data[-10:]
+    filtered = bars.since(cutoffs[time_range])
+    return filtered if len(filtered) else bars.take(slice(-10, None))
 
 @app.route('/api/market-data/<ticker>', methods=['GET'])
 def get_market_data(ticker):
     # Get time range from query params, default to 3mo
     time_range = request.args.get('period', '3mo')
     
+    # Pick records, columnar JSON or a binary format before doing any work
+    try:
+        wire_format = negotiate(request)
+    except UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+    
+    # ?since=<version> (a bar's epoch ms, or an ISO time) returns only the bars from then on
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = parse_bar_cursor(since)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+    
     # Determine asset class based on ticker
     asset_class = "stock"  # Default
     for category, tickers in markets.items():
@@ -802,106 +899,425 @@ def get_market_data(ticker):
     
     # Get data from Alpaca
     try:
-        data = get_alpaca_data(ticker, start, end, timeframe, asset_class)
+        bars = get_alpaca_bars(ticker, start, end, timeframe, asset_class)
         
         # Filter the data to match the requested time range
-        filtered_data = filter_data_to_timeframe(data, time_range)
-        
-        return jsonify({
+        filtered_bars = filter_bars_to_timeframe(bars, time_range)
+        
+        # The version is the last bar's time: the cursor for the next ?since=, which
+        # resends that bar in case it was still forming
+        version = int(filtered_bars.timestamp[-1].astype(np.int64)) if len(filtered_bars) else None
+        meta = {"ticker": ticker, "period": time_range, "version": version}
+        # Stored bars whose tail could not be fetched are served flagged as stale
+        stored_through = bar_store.stale_tail(ticker, asset_class, timeframe)
+        if stored_through is not None:
+            meta.update({"stale": True, "storedThrough": stored_through})
+        if since is not None:
+            filtered_bars = filtered_bars.since(since)
+            meta["since"] = int(since.astype(np.int64))
+        
+        # Validated against the content of the served bars before anything is encoded
+        etag = strong_etag(ticker, time_range, wire_format, meta.get("since"), stored_through, filtered_bars.digest())
+        if is_fresh(request, etag):
+            return not_modified(etag)
+        
+        if wire_format != RECORDS:
+            return with_etag(table_response(wire_format, meta, "prices", filtered_bars.columns()), etag)
+        
+        return with_etag(jsonify({
             "status": "success",
             "data": {
-                "ticker": ticker,
-                "period": time_range,
-                "prices": filtered_data
+                **meta,
+                "prices": filtered_bars.to_records()
             }
-        })
+        }), etag)
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": f"Failed to fetch data: {str(e)}"
         }), 500
 
+# Start the bar fetches behind market summaries of several periods (period -> date range).
+# Periods with the same bar size share one fetch over the widest range. Tickers are
+# fetched per category, SUMMARY_FETCH_CHUNK at a time on summary_executor, so each
+# category's bars can arrive on their own. A ticker whose fetch from an earlier build
+# is still running over the same bars joins that fetch instead of queueing another.
+# Returns ({future: bar size key}, {(bar size key, ticker): future fetching it}).
+def submit_summary_fetches(ranges):
+    windows = {}
+    for period, (start, end, timeframe) in ranges.items():
+        key = str(timeframe)
+        earliest = windows.get(key, (start, end, timeframe))
+        windows[key] = (min(start, earliest[0]), max(end, earliest[1]), timeframe)
+    
+    futures, fetched_by = {}, {}
+    with summary_in_flight_lock:
+        for in_flight_key, (_, future) in list(summary_in_flight.items()):
+            if future.done():
+                del summary_in_flight[in_flight_key]
+        
+        for key, (start, end, timeframe) in windows.items():
+            for category, tickers in markets.items():
+                asset_class = "crypto" if category == 'crypto' else "stock"
+                # Skip tickers an earlier category already fetches
+                tickers = [ticker for ticker in dict.fromkeys(tickers.values()) if (key, ticker) not in fetched_by]
+                
+                # Join fetches still running from an earlier build that reach back far enough
+                queued = []
+                for ticker in tickers:
+                    in_flight_start, future = summary_in_flight.get((key, ticker), (None, None))
+                    if future is not None and in_flight_start <= start:
+                        futures[future] = key
+                        fetched_by[(key, ticker)] = future
+                    else:
+                        queued.append(ticker)
+                
+                for offset in range(0, len(queued), SUMMARY_FETCH_CHUNK):
+                    chunk = queued[offset:offset + SUMMARY_FETCH_CHUNK]
+                    future = summary_executor.submit(get_alpaca_data_batch, chunk, start, end, timeframe, asset_class)
+                    futures[future] = key
+                    for ticker in chunk:
+                        fetched_by[(key, ticker)] = future
+                        summary_in_flight[(key, ticker)] = (start, future)
+    return futures, fetched_by
+
+# Drop the summary fetches that never started before the deadline, so they do not
+# pile up on summary_executor behind the slow ones; running fetches cannot be stopped
+# and are joined by the next build instead.
+def cancel_summary_fetches(pending):
+    cancelled = sum(1 for future in pending if future.cancel())
+    if cancelled:
+        print(f"Market summary: cancelled {cancelled} queued fetches")
+
+# Summary entries of one category's tickers ({name: ticker}) from the bars fetched so far.
+# Tickers without bars keep their entry in earlier ({(ticker, name): entry}) marked
+# stale, or are missing; tickers served from stored bars whose tail could not be
+# fetched are marked stale as well. Returns (entries, stale tickers, missing
+# tickers), each ticker listed once.
+def summarize_category(tickers, bars_by_ticker, start, earlier, asset_class, timeframe):
+    category_data, stale, missing = [], [], []
+    for name, ticker in tickers.items():
+        try:
+            bars = bars_by_ticker.get(ticker)
+            if bars is None:
+                # Bars not back in time: last known entry, marked stale
+                if (ticker, name) in earlier:
+                    category_data.append({**earlier[(ticker, name)], "stale": True})
+                    stale.append(ticker)
+                else:
+                    missing.append(ticker)
+                continue
+            bars = bars.since(start)
+            
+            # Calculate metrics from the data
+            if len(bars) >= 2:
+                current_price = float(bars.close[-1])
+                previous_price = float(bars.close[0])
+                change = current_price - previous_price
+                change_pct = (change / previous_price) * 100 if previous_price != 0 else 0
+                
+                category_data.append({
+                    "name": name,
+                    "ticker": ticker,
+                    "price": round(current_price, 2),
+                    "change": round(change, 2),
+                    "changePct": round(change_pct, 2),
+                    "volume": float(bars.volume[-1])
+                })
+                if bar_store.stale_tail(ticker, asset_class, timeframe) is not None:
+                    category_data[-1]["stale"] = True
+                    stale.append(ticker)
+        except Exception as e:
+            print(f"Error processing {ticker}: {e}")
+            # Skip tickers that have errors instead of adding them with null values
+            continue
+    return category_data, list(dict.fromkeys(stale)), list(dict.fromkeys(missing))
+
+# Every entry of a summary by (ticker, name), as a ticker can be listed under two names
+def summary_entries(summary):
+    return {
+        (entry["ticker"], entry["name"]): entry
+        for category_data in (summary or {}).values() for entry in category_data
+    }
+
+# Market summaries (latest price and change over the period per ticker and category)
+# for several periods, waiting at most deadline seconds for all of their bars.
+# Tickers whose bars miss it keep their entry from previous(period) marked stale, or
+# are listed as missing.
+# Returns {period: {"data": {category: [...]}, "stale": [...], "missing": [...]}}.
+def build_market_summaries(periods, previous=lambda period: None, deadline=SUMMARY_DEADLINE):
+    ranges = {period: get_market_date_range(period) for period in periods}
+    print(f"Building market summaries for {', '.join(periods)}")
+    
+    futures, _ = submit_summary_fetches(ranges)
+    done, pending = wait(futures, timeout=deadline)
+    if pending:
+        print(f"Market summary: {len(pending)} of {len(futures)} fetches still pending after {deadline}s")
+        cancel_summary_fetches(pending)
+    bars_by_timeframe = {key: {} for key in futures.values()}
+    for future in done:
+        try:
+            bars_by_timeframe[futures[future]].update(future.result())
+        except Exception as e:
+            print(f"Market summary: fetch failed: {e}")
+    
+    summaries = {}
+    for period, (start, end, timeframe) in ranges.items():
+        earlier = summary_entries(previous(period))
+        summary, stale, missing = {}, [], []
+        for category, tickers in markets.items():
+            category_data, category_stale, category_missing = summarize_category(
+                tickers, bars_by_timeframe[str(timeframe)], start, earlier,
+                "crypto" if category == 'crypto' else "stock", timeframe
+            )
+            stale += category_stale
+            missing += category_missing
+            # Only add the category if it has data
+            if category_data:
+                summary[category] = category_data
+        summaries[period] = {
+            "data": summary,
+            "stale": list(dict.fromkeys(stale)),
+            "missing": list(dict.fromkeys(missing))
+        }
+    return summaries
+
+# Market summary of one period, yielded category by category as soon as all of a
+# category's bars are in, as (category, entries, stale, missing). Categories still
+# waiting at the deadline are yielded last from whatever arrived.
+def stream_market_summary(period, previous=None, deadline=SUMMARY_DEADLINE):
+    start, end, timeframe = get_market_date_range(period)
+    key = str(timeframe)
+    futures, fetched_by = submit_summary_fetches({period: (start, end, timeframe)})
+    earlier = summary_entries(previous)
+    waiting = {category: {fetched_by[(key, ticker)] for ticker in tickers.values()} for category, tickers in markets.items()}
+    bars_by_ticker = {}
+    
+    def ready(final=False):
+        for category in list(waiting):
+            if final or all(future.done() for future in waiting[category]):
+                del waiting[category]
+                yield (category,) + summarize_category(
+                    markets[category], bars_by_ticker, start, earlier,
+                    "crypto" if category == 'crypto' else "stock", timeframe
+                )
+    
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            try:
+                bars_by_ticker.update(future.result())
+            except Exception as e:
+                print(f"Market summary: fetch failed: {e}")
+            yield from ready()
+    except FuturesTimeout:
+        print(f"Market summary stream: {', '.join(waiting)} still pending after {deadline}s")
+        cancel_summary_fetches([future for future in futures if not future.done()])
+    yield from ready(final=True)
+
+# Market summaries for every supported period, rebuilt in the background
+summary_snapshots = SummarySnapshots(build_market_summaries)
+
 @app.route('/api/market-summary', methods=['GET'])
 def get_market_summary():
-    # Generate data for each category
-    summary = {}
+    summary_snapshots.start()  # No-op once running; covers servers that never run __main__
     
     # Get time range from query params, default to 1d
     time_range = request.args.get('period', '1d')
     
-    # Make sure we get today's date, with explicit UTC to prevent timezone issues
-    end = datetime.now().replace(microsecond=0)
-    print(f"Current datetime being used for market summary: {end}")
+    # Periods without a snapshot are built for this request only
+    if time_range not in summary_snapshots.periods:
+        try:
+            result = build_market_summaries([time_range])[time_range]
+        except Exception as e:
+            return jsonify({"status": "error", "message": f"Failed to build market summary: {str(e)}"}), 500
+        body = json.dumps({"status": "success", **result})
+        etag = strong_etag(body.encode())
+        if is_fresh(request, etag):
+            return not_modified(etag)
+        return with_etag(app.response_class(body, mimetype='application/json'), etag)
     
-    # Use the helper function that properly handles weekends and holidays
-    start, end, timeframe = get_market_date_range(time_range)
+    # ?since=<version> returns only the entries changed after that version
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"status": "error", "message": f"Invalid since version '{since}', expected the version of an earlier response"}), 400
     
-    print(f"Fetching market summary with timeframe {time_range}: {start} to {end}")
+    # Served from the latest snapshot; only the very first request for a period waits for a build
+    snapshot = summary_snapshots.ensure(time_range)
+    if snapshot is None:
+        return jsonify({"status": "error", "message": "Market summary is not available yet, try again shortly"}), 503
+    if since is None:
+        body, etag = snapshot.body, snapshot.etag
+    else:
+        body = summary_snapshots.delta(snapshot, since)
+        etag = strong_etag(body.encode())
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    return with_etag(app.response_class(body, mimetype='application/json'), etag)
+
+# Streaming market summary: one event per category as soon as it is ready, then a
+# "done" event listing stale and missing tickers. Server-Sent Events when asked for
+# (format=sse or an Accept: text/event-stream header), newline-delimited JSON otherwise.
+# A period with a snapshot streams the snapshot at once.
+@app.route('/api/market-summary/stream', methods=['GET'])
+def stream_market_summary_route():
+    summary_snapshots.start()
     
-    for category, tickers in markets.items():
-        category_data = []
-        
-        for name, ticker in tickers.items():
-            try:
-                # Handle special cases for different markets
-                if category == 'crypto':
-                    # Use the crypto-specific function
-                    data = get_alpaca_data(ticker, start, end, timeframe, "crypto")
+    time_range = request.args.get('period', '1d')
+    wire = request.args.get('format')
+    if wire is None:
+        wire = "sse" if "text/event-stream" in request.headers.get('Accept', '') else "ndjson"
+    if wire not in ("sse", "ndjson"):
+        return jsonify({"status": "error", "message": "format must be one of sse, ndjson"}), 400
+    
+    snapshot = summary_snapshots.get(time_range)
+    
+    def events():
+        if snapshot is not None:
+            for category, category_data in snapshot.result["data"].items():
+                yield "category", {"category": category, "data": category_data}
+            yield "done", {"period": time_range, "asOf": snapshot.as_of,
+                           "stale": snapshot.result["stale"], "missing": snapshot.result["missing"]}
+            return
+        
+        stale, missing = [], []
+        for category, category_data, category_stale, category_missing in stream_market_summary(time_range):
+            stale += category_stale
+            missing += category_missing
+            if category_data:
+                yield "category", {"category": category, "data": category_data}
+        yield "done", {"period": time_range, "asOf": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                       "stale": list(dict.fromkeys(stale)), "missing": list(dict.fromkeys(missing))}
+    
+    def encode():
+        try:
+            for event, payload in events():
+                if wire == "sse":
+                    yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
                 else:
-                    # Get actual data for stocks
-                    data = get_alpaca_data(ticker, start, end, timeframe)
-                
-                # Calculate metrics from the data
-                if data and len(data) >= 2:
-                    current_price = data[-1]['close']
-                    previous_price = data[0]['close']
-                    change = current_price - previous_price
-                    change_pct = (change / previous_price) * 100 if previous_price != 0 else 0
-                    
-                    category_data.append({
-                        "name": name,
-                        "ticker": ticker,
-                        "price": round(current_price, 2),
-                        "change": round(change, 2),
-                        "changePct": round(change_pct, 2),
-                        "volume": data[-1]['volume']
-                    })
-            except Exception as e:
-                print(f"Error processing {ticker}: {e}")
-                # Skip tickers that have errors instead of adding them with null values
-                continue
-        
-        # Only add the category if it has data
-        if category_data:
-            summary[category] = category_data
+                    yield json.dumps({"event": event, **payload}) + "\n"
+        except Exception as e:
+            print(f"Market summary stream failed: {e}")
+            error = {"message": f"Failed to build market summary: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n" if wire == "sse" else json.dumps({"event": "error", **error}) + "\n"
+    
+    return app.response_class(
+        encode(),
+        mimetype="text/event-stream" if wire == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Snapshot times, schedule and counters of the background market summary refresher
+@app.route('/api/stats/market-summary', methods=['GET'])
+def get_market_summary_stats():
+    return jsonify({
+        "status": "success",
+        "data": summary_snapshots.stats()
+    })
+
+# Trading signals for every symbol in markets, recomputed after each daily bar close
+signal_board = SignalBoard(
+    universe=lambda: {
+        ticker: (category, name, "crypto" if category == "crypto" else "stock")
+        for category, tickers in markets.items() for name, ticker in tickers.items()
+    },
+    fetch=lambda tickers, asset_class, start, end: get_alpaca_data_batch(tickers, start, end, TimeFrame.Day, asset_class)
+)
+
+# Precomputed trading-signal board (MA crossover, RSI, MACD, Bollinger, ADX and the
+# overall call) for the markets universe. ?symbol= or ?category= narrow it down.
+@app.route('/api/signals', methods=['GET'])
+def get_signals():
+    signal_board.start()  # No-op once running; covers servers that never run __main__
+    
+    encoded = signal_board.encoded()
+    if encoded is None:
+        return jsonify({"status": "error", "message": "Signals are still being computed, try again shortly"}), 503
+    
+    symbol = request.args.get('symbol')
+    category = request.args.get('category')
+    if symbol:
+        entry = signal_board.get(symbol)
+        if entry is None:
+            return jsonify({"status": "error", "message": f"No signals for {symbol}"}), 404
+        return jsonify({"status": "success", "data": entry})
+    if category:
+        return jsonify({"status": "success", "data": {"signals": signal_board.by_category(category)}})
+    
+    return app.response_class('{"data": ' + encoded + ', "status": "success"}', mimetype='application/json')
+
+# Recorded 1-minute bars the replay price feed plays back, by asset class
+def load_replay_bars(symbols):
+    end = datetime.now()
+    start = end - timedelta(days=PRICE_REPLAY_DAYS)
+    by_class = {}
+    for symbol in symbols:
+        by_class.setdefault(detect_asset_class(symbol), []).append(symbol)
+    recorded = {}
+    for asset_class, tickers in by_class.items():
+        recorded.update(get_alpaca_data_batch(tickers, start, end, TimeFrame.Minute, asset_class))
+    return recorded
+
+# Live prices come from Alpaca's websockets when credentials are set, otherwise (or with
+# PRICE_FEED=replay) from recorded bars replayed at PRICE_REPLAY_SPEED times real time
+PRICE_FEED = os.getenv("PRICE_FEED", "alpaca" if ALPACA_API_KEY and ALPACA_SECRET_KEY else "replay")
+if PRICE_FEED == "alpaca":
+    price_feed = AlpacaFeed(ALPACA_API_KEY, ALPACA_SECRET_KEY, lambda symbol: detect_asset_class(symbol) == "crypto")
+else:
+    price_feed = ReplayFeed(load_replay_bars)
+price_hub = PriceHub(price_feed)
+
+# Live price push over Server-Sent Events: "price" and "bar" events for ?symbols=,
+# starting with the latest known ones. Every client shares one upstream
+# subscription per symbol; a client that falls behind gets the latest events only.
+@app.route('/api/stream/prices', methods=['GET'])
+def stream_prices():
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in request.args.get('symbols', '').split(',') if symbol.strip()))
+    if not symbols:
+        return jsonify({"status": "error", "message": "Pass the symbols to stream, e.g. ?symbols=AAPL,BTC/USD"}), 400
+    if len(symbols) > PRICE_STREAM_MAX_SYMBOLS:
+        return jsonify({"status": "error", "message": f"At most {PRICE_STREAM_MAX_SYMBOLS} symbols per stream"}), 400
+    
+    def events():
+        # Subscribed only once the response starts streaming, so a response closed
+        # before its first chunk never holds a subscription
+        subscriber = price_hub.subscribe(symbols)
+        try:
+            yield f"retry: 3000\nevent: subscribed\ndata: {json.dumps({'symbols': symbols, 'feed': price_feed.name})}\n\n"
+            while True:
+                chunk = subscriber.drain(PRICE_STREAM_HEARTBEAT)
+                # A comment keeps idle connections (and proxies) from timing out
+                yield chunk if chunk is not None else ": keep-alive\n\n"
+        finally:
+            # Runs when the client disconnects and the server closes the generator
+            price_hub.unsubscribe(subscriber)
     
+    return app.response_class(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Clients, upstream symbols and delivery counters of the live price stream
+@app.route('/api/stats/price-stream', methods=['GET'])
+def get_price_stream_stats():
     return jsonify({
         "status": "success",
-        "data": summary
+        "data": price_hub.stats()
     })
 
-@app.route('/api/technical-indicators', methods=['GET'])
-def get_technical_indicators_query():
-    # Get ticker from query parameter
-    ticker = request.args.get('symbol')
-    if not ticker:
-        return jsonify({
-            "status": "error",
-            "message": "Symbol parameter is required"
-        }), 400
-    
-    # Process the same way as the path parameter version
-    return get_technical_indicators(ticker)
+# Refresh times and counters of the trading-signal board
+@app.route('/api/stats/signal-board', methods=['GET'])
+def get_signal_board_stats():
+    return jsonify({
+        "status": "success",
+        "data": signal_board.stats()
+    })
 
-@app.route('/api/technical-indicators/<ticker>', methods=['GET'])
-def get_technical_indicators(ticker):
-    # URL decode the ticker to handle encoded special characters like BTC%2FUSD
-    ticker = urllib.parse.unquote(ticker)
-    
-    # Get time range from query params, default to 3mo
-    time_range = request.args.get('period', '3mo')
-    
-    # Determine asset class based on ticker
+# Determine the asset class of a ticker from the markets universe
+def detect_asset_class(ticker):
     asset_class = "stock"  # Default
     for category, tickers in markets.items():
         # For crypto currencies, special handling for BTC/USD format
@@ -916,7 +1332,10 @@ def get_technical_indicators(ticker):
             # For other asset classes, use the standard matching
             if any(ticker == t for t in tickers.values()):
                 break
-    
+    return asset_class
+
+# Date range and bar size the technical indicators are computed over for a period
+def indicator_date_range(time_range):
     # Make sure we get today's date, with explicit UTC to prevent timezone issues
     end = datetime.now().replace(microsecond=0)
     print(f"Current datetime being used: {end}")
@@ -949,368 +1368,844 @@ def get_technical_indicators(ticker):
         start = end - timedelta(days=90)  # Default to 3 months
         timeframe = TimeFrame.Day
     
-    print(f"Fetching technical indicators for {ticker} with date range: {start} to {end} (period: {time_range})")
+    return start, end, timeframe
+
+# Which indicator columns, response sections and trailing rows a technical
+# indicators request asks for. Raises ValueError for anything unknown.
+def indicator_projection(args):
+    def listed(value):
+        if isinstance(value, str):
+            value = value.split(',')
+        return [item.strip() for item in value if item and item.strip()]
     
-    # Get data from Alpaca
-    try:
-        data = get_alpaca_data(ticker, start, end, timeframe, asset_class)
-        
-        # Convert to DataFrame for calculations
-        df = pd.DataFrame(data)
-        
-        # Calculate SMA
-        df['sma20'] = df['close'].rolling(window=20).mean()
-        df['sma50'] = df['close'].rolling(window=50).mean()
-        df['sma200'] = df['close'].rolling(window=200).mean()
-        
-        # Calculate Bollinger Bands
-        df['upper_band'] = df['sma20'] + (df['close'].rolling(window=20).std() * 2)
-        df['lower_band'] = df['sma20'] - (df['close'].rolling(window=20).std() * 2)
-        
-        # Calculate RSI
-        delta = df['close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-        loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        # Calculate MACD
-        df['ema12'] = df['close'].ewm(span=12, adjust=False).mean()
-        df['ema26'] = df['close'].ewm(span=26, adjust=False).mean()
-        df['macd'] = df['ema12'] - df['ema26']
-        df['signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-        df['histogram'] = df['macd'] - df['signal']
-        
-        # Calculate pivot points based on the most recent complete period
-        if len(df) > 0:
-            # Get the most recent data
-            latest = df.iloc[-1]
-            high = float(latest['high'])
-            low = float(latest['low'])
-            close = float(latest['close'])
-            
-            # Calculate pivot point
-            pivot = (high + low + close) / 3
-            
-            # Calculate support and resistance levels
-            s1 = 2 * pivot - high
-            s2 = pivot - (high - low)
-            s3 = low - 2 * (high - pivot)
-            
-            r1 = 2 * pivot - low
-            r2 = pivot + (high - low)
-            r3 = high + 2 * (pivot - low)
-            
-            # Store pivot points
-            pivot_points = {
-                "pivot": round(pivot, 2),
-                "r1": round(r1, 2),
-                "r2": round(r2, 2),
-                "r3": round(r3, 2),
-                "s1": round(s1, 2),
-                "s2": round(s2, 2),
-                "s3": round(s3, 2)
-            }
-        else:
-            # Default values
-            pivot_points = {
-                "pivot": 0,
-                "r1": 0,
-                "r2": 0,
-                "r3": 0,
-                "s1": 0,
-                "s2": 0,
-                "s3": 0
-            }
-            
-        # Get data for different timeframes to calculate timeframe analysis
-        timeframe_trends = {}
-        
-        # Function to determine trend and strength
-        def get_trend_info(df):
-            if len(df) < 5:
-                print(f"Not enough data points ({len(df)}) for trend calculation")
-                return {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-            
-            try:
-                # Sort by date to ensure proper order
-                if 'date' in df.columns:
-                    df['date'] = pd.to_datetime(df['date'])
-                    df = df.sort_values('date')
-                
-                # Get recent close prices - force to numeric to ensure proper comparison
-                recent_close = pd.to_numeric(df['close'].iloc[-1])
-                prev_close = pd.to_numeric(df['close'].iloc[-5])  # 5 periods ago
-                
-                # Print actual values for debugging with clear formatting
-                print(f"TREND CALCULATION - Recent close: {recent_close:.2f}, Previous close: {prev_close:.2f}")
-                
-                # Determine direction based on simple price comparison
-                if recent_close > prev_close:
-                    direction = "Bullish"
-                    print(f"BULLISH: {recent_close:.2f} > {prev_close:.2f}")
-                else:
-                    direction = "Bearish"
-                    print(f"BEARISH: {recent_close:.2f} <= {prev_close:.2f}")
-                
-                # Calculate percentage change for strength
-                pct_change = abs((recent_close - prev_close) / prev_close * 100)
-                print(f"Percent change: {pct_change:.2f}%")
-                
-                # Determine strength based on percentage change
-                if pct_change > 5:
-                    strength = "Strong"
-                elif pct_change > 2:
-                    strength = "Moderate"
-                else:
-                    strength = "Weak"
-                    
-                # Determine volume trend
-                volume_trend = "Steady"
-                if 'volume' in df.columns and len(df) > 5:
-                    try:
-                        recent_vol = pd.to_numeric(df['volume'].iloc[-5:].mean())
-                        prev_vol = pd.to_numeric(df['volume'].iloc[-10:-5].mean() if len(df) > 10 else df['volume'].iloc[:5].mean())
-                        
-                        vol_change_pct = (recent_vol - prev_vol) / prev_vol * 100 if prev_vol > 0 else 0
-                        print(f"Volume: recent={recent_vol:.2f}, prev={prev_vol:.2f}, change={vol_change_pct:.2f}%")
-                        
-                        if abs(vol_change_pct) > 20:
-                            volume_trend = "Increasing" if vol_change_pct > 0 else "Decreasing"
-                    except Exception as vol_err:
-                        print(f"Volume calculation error: {vol_err}")
-                
-                # Determine if price is above/below SMA20
-                is_above_sma20 = False
-                if 'sma20' in df.columns and not pd.isna(df['sma20'].iloc[-1]):
-                    sma20 = pd.to_numeric(df['sma20'].iloc[-1])
-                    is_above_sma20 = bool(recent_close > sma20)
-                
-                print(f"Final trend: {direction} ({strength}) with {volume_trend} volume")
-                return {
-                    "direction": direction, 
-                    "strength": strength, 
-                    "volume": volume_trend,
-                    "is_above_sma20": is_above_sma20
-                }
-            except Exception as e:
-                print(f"Error in trend calculation: {e}")
-                return {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-        
-        # Try to get 5-minute data for very short term
+    columns = INDICATOR_COLUMNS
+    if args.get('indicators') is not None:
+        requested = listed(args.get('indicators'))
+        unknown = [name for name in requested if name not in INDICATOR_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown indicators: {', '.join(unknown)}. Choose from: {', '.join(INDICATOR_COLUMNS)}")
+        columns = tuple(name for name in INDICATOR_COLUMNS if name in requested)
+    
+    sections = INDICATOR_SECTIONS
+    if args.get('sections') is not None:
+        requested = listed(args.get('sections'))
+        unknown = [name for name in requested if name not in INDICATOR_SECTIONS]
+        if unknown or not requested:
+            raise ValueError(f"sections must be one or more of: {', '.join(INDICATOR_SECTIONS)}")
+        sections = tuple(name for name in INDICATOR_SECTIONS if name in requested)
+    
+    tail = args.get('tail')
+    if tail is not None:
         try:
-            print(f"Fetching 5-minute data for {ticker}")
-            end_5m = end
-            start_5m = end_5m - timedelta(days=1)  # Last day of 5-minute data
-            data_5m = get_alpaca_data(ticker, start_5m, end_5m, TimeFrame.Minute, asset_class)
-            if data_5m and len(data_5m) >= 5:
-                df_5m = pd.DataFrame(data_5m)
-                # Only keep every 5th row to get 5-minute intervals approximately
-                df_5m = df_5m.iloc[::5].copy()
-                print(f"5m data shape: {df_5m.shape}")
-                timeframe_trends["5m"] = get_trend_info(df_5m)
-                print(f"5m trend: {timeframe_trends['5m']['direction']} ({timeframe_trends['5m']['strength']})")
-            else:
-                print(f"Not enough 5-minute data points for {ticker}: {len(data_5m) if data_5m else 0}")
-                timeframe_trends["5m"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-        except Exception as e:
-            print(f"Error getting 5-minute data for {ticker}: {e}")
-            timeframe_trends["5m"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+            tail = int(tail)
+        except (TypeError, ValueError):
+            tail = 0
+        if tail < 1:
+            raise ValueError("tail must be a positive number of rows")
+    
+    return columns, sections, tail
+
+# Rows in the legacy technical indicators layout (date, OHLCV, indicators, "null" for NaN)
+def indicator_records(bars, indicators):
+    columns = {"date": bars.dates, **{field: getattr(bars, field).tolist() for field in FIELDS}}
+    for name, values in indicators.items():
+        columns[name] = ["null" if value != value else value for value in values.tolist()]
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+# Compute the requested parts of a technical indicators response from the planned
+# bar series. Returns (bars, {column: values}, timeframe_analysis), with bars and
+# indicators cut to the last `rows` rows; the bars before them only warm up the
+# indicators. Only what was asked for is computed.
+def technical_indicator_result(ticker, asset_class, timeframe, series, columns, sections, rows, unavailable=()):
+    bars = series["main"]
+    indicators = {}
+    if "indicators" in sections and columns:
+        # SMA, Bollinger Bands, RSI and MACD from the streaming engine: refreshes of
+        # the same series only fold the bars that are new or changed since last time.
+        # Series with a different warm-up start elsewhere, so they get their own state.
+        key = (ticker, asset_class, alpaca_timeframe_str(timeframe), warmup_bars(columns))
+        indicators = indicator_engine.compute(key, bars, columns, rows)
+    bars = bars.take(slice(len(bars) - rows, None))
+    
+    timeframe_analysis = analyze_timeframes(ticker, series, unavailable) if "analysis" in sections else None
+    return bars, indicators, timeframe_analysis
+
+# Pivot points and the multi-timeframe trend analysis for one ticker from its planned bar series.
+# Timeframes listed in unavailable (their bars missed the deadline) are reported as Neutral.
+def analyze_timeframes(ticker, series, unavailable=()):
+    bars = series["main"]
+    
+    # Calculate pivot points based on the most recent complete period
+    if len(bars) > 0:
+        # Get the most recent data
+        high = float(bars.high[-1])
+        low = float(bars.low[-1])
+        close = float(bars.close[-1])
+        
+        # Calculate pivot point
+        pivot = (high + low + close) / 3
+        
+        # Calculate support and resistance levels
+        s1 = 2 * pivot - high
+        s2 = pivot - (high - low)
+        s3 = low - 2 * (high - pivot)
+        
+        r1 = 2 * pivot - low
+        r2 = pivot + (high - low)
+        r3 = high + 2 * (pivot - low)
+        
+        # Store pivot points
+        pivot_points = {
+            "pivot": round(pivot, 2),
+            "r1": round(r1, 2),
+            "r2": round(r2, 2),
+            "r3": round(r3, 2),
+            "s1": round(s1, 2),
+            "s2": round(s2, 2),
+            "s3": round(s3, 2)
+        }
+    else:
+        # Default values
+        pivot_points = {
+            "pivot": 0,
+            "r1": 0,
+            "r2": 0,
+            "r3": 0,
+            "s1": 0,
+            "s2": 0,
+            "s3": 0
+        }
         
-        # Get 15-minute data
-        try:
-            print(f"Fetching 15-minute data for {ticker}")
-            end_15m = end
-            start_15m = end_15m - timedelta(days=1)
-            data_15m = get_alpaca_data(ticker, start_15m, end_15m, TimeFrame.Minute, asset_class)
-            if data_15m and len(data_15m) >= 15:
-                df_15m = pd.DataFrame(data_15m)
-                # Only keep every 15th row to get 15-minute intervals approximately
-                df_15m = df_15m.iloc[::15].copy()
-                print(f"15m data shape: {df_15m.shape}")
-                timeframe_trends["15m"] = get_trend_info(df_15m)
-                print(f"15m trend: {timeframe_trends['15m']['direction']} ({timeframe_trends['15m']['strength']})")
-            else:
-                print(f"Not enough 15-minute data points for {ticker}: {len(data_15m) if data_15m else 0}")
-                timeframe_trends["15m"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-        except Exception as e:
-            print(f"Error getting 15-minute data for {ticker}: {e}")
-            timeframe_trends["15m"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    # Get data for different timeframes to calculate timeframe analysis
+    timeframe_trends = {}
+    
+    # Function to determine trend and strength
+    def get_trend_info(df):
+        if len(df) < 5:
+            print(f"Not enough data points ({len(df)}) for trend calculation")
+            return {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
         
-        # Get 1-hour data
         try:
-            print(f"Fetching 1-hour data for {ticker}")
-            end_1h = end
-            start_1h = end_1h - timedelta(days=5)  # Last 5 days of hourly data
-            data_1h = get_alpaca_data(ticker, start_1h, end_1h, TimeFrame.Hour, asset_class)
-            if data_1h and len(data_1h) >= 5:
-                df_1h = pd.DataFrame(data_1h)
-                print(f"1h data shape: {df_1h.shape}")
-                timeframe_trends["1h"] = get_trend_info(df_1h)
-                print(f"1h trend: {timeframe_trends['1h']['direction']} ({timeframe_trends['1h']['strength']})")
+            # Sort by date to ensure proper order
+            if 'date' in df.columns:
+                df['date'] = pd.to_datetime(df['date'])
+                df = df.sort_values('date')
+            
+            # Get recent close prices - force to numeric to ensure proper comparison
+            recent_close = pd.to_numeric(df['close'].iloc[-1])
+            prev_close = pd.to_numeric(df['close'].iloc[-5])  # 5 periods ago
+            
+            # Print actual values for debugging with clear formatting
+            print(f"TREND CALCULATION - Recent close: {recent_close:.2f}, Previous close: {prev_close:.2f}")
+            
+            # Determine direction based on simple price comparison
+            if recent_close > prev_close:
+                direction = "Bullish"
+                print(f"BULLISH: {recent_close:.2f} > {prev_close:.2f}")
             else:
-                print(f"Not enough 1-hour data points for {ticker}: {len(data_1h) if data_1h else 0}")
-                timeframe_trends["1h"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-        except Exception as e:
-            print(f"Error getting 1-hour data for {ticker}: {e}")
-            timeframe_trends["1h"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-        
-        # Get 1-day data
-        try:
-            print(f"Fetching 1-day data for {ticker}")
-            end_1d = end
-            start_1d = end_1d - timedelta(days=30)  # Last 30 days
-            data_1d = get_alpaca_data(ticker, start_1d, end_1d, TimeFrame.Day, asset_class)
-            if data_1d and len(data_1d) >= 5:
-                df_1d = pd.DataFrame(data_1d)
-                print(f"1d data shape: {df_1d.shape}")
-                timeframe_trends["1d"] = get_trend_info(df_1d)
-                print(f"1d trend: {timeframe_trends['1d']['direction']} ({timeframe_trends['1d']['strength']})")
+                direction = "Bearish"
+                print(f"BEARISH: {recent_close:.2f} <= {prev_close:.2f}")
+            
+            # Calculate percentage change for strength
+            pct_change = abs((recent_close - prev_close) / prev_close * 100)
+            print(f"Percent change: {pct_change:.2f}%")
+            
+            # Determine strength based on percentage change
+            if pct_change > 5:
+                strength = "Strong"
+            elif pct_change > 2:
+                strength = "Moderate"
             else:
-                print(f"Not enough 1-day data points for {ticker}: {len(data_1d) if data_1d else 0}")
-                timeframe_trends["1d"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+                strength = "Weak"
+                
+            # Determine volume trend
+            volume_trend = "Steady"
+            if 'volume' in df.columns and len(df) > 5:
+                try:
+                    recent_vol = pd.to_numeric(df['volume'].iloc[-5:].mean())
+                    prev_vol = pd.to_numeric(df['volume'].iloc[-10:-5].mean() if len(df) > 10 else df['volume'].iloc[:5].mean())
+                    
+                    vol_change_pct = (recent_vol - prev_vol) / prev_vol * 100 if prev_vol > 0 else 0
+                    print(f"Volume: recent={recent_vol:.2f}, prev={prev_vol:.2f}, change={vol_change_pct:.2f}%")
+                    
+                    if abs(vol_change_pct) > 20:
+                        volume_trend = "Increasing" if vol_change_pct > 0 else "Decreasing"
+                except Exception as vol_err:
+                    print(f"Volume calculation error: {vol_err}")
+            
+            # Determine if price is above/below SMA20
+            is_above_sma20 = False
+            if 'sma20' in df.columns and not pd.isna(df['sma20'].iloc[-1]):
+                sma20 = pd.to_numeric(df['sma20'].iloc[-1])
+                is_above_sma20 = bool(recent_close > sma20)
+            
+            print(f"Final trend: {direction} ({strength}) with {volume_trend} volume")
+            return {
+                "direction": direction, 
+                "strength": strength, 
+                "volume": volume_trend,
+                "is_above_sma20": is_above_sma20
+            }
         except Exception as e:
-            print(f"Error getting 1-day data for {ticker}: {e}")
+            print(f"Error in trend calculation: {e}")
+            return {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    
+    # 5-minute bars for very short term, resampled from the 1-minute bars
+    try:
+        data_5m = series["5m"]
+        if len(data_5m) >= 5:
+            df_5m = data_5m.to_frame()
+            print(f"5m data shape: {df_5m.shape}")
+            timeframe_trends["5m"] = get_trend_info(df_5m)
+            print(f"5m trend: {timeframe_trends['5m']['direction']} ({timeframe_trends['5m']['strength']})")
+        else:
+            print(f"Not enough 5-minute data points for {ticker}: {len(data_5m)}")
+            timeframe_trends["5m"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    except Exception as e:
+        print(f"Error getting 5-minute data for {ticker}: {e}")
+        timeframe_trends["5m"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    
+    # 15-minute bars
+    try:
+        data_15m = series["15m"]
+        if len(data_15m) >= 5:
+            df_15m = data_15m.to_frame()
+            print(f"15m data shape: {df_15m.shape}")
+            timeframe_trends["15m"] = get_trend_info(df_15m)
+            print(f"15m trend: {timeframe_trends['15m']['direction']} ({timeframe_trends['15m']['strength']})")
+        else:
+            print(f"Not enough 15-minute data points for {ticker}: {len(data_15m)}")
+            timeframe_trends["15m"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    except Exception as e:
+        print(f"Error getting 15-minute data for {ticker}: {e}")
+        timeframe_trends["15m"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    
+    # 1-hour bars
+    try:
+        data_1h = series["1h"]
+        if len(data_1h) >= 5:
+            df_1h = data_1h.to_frame()
+            print(f"1h data shape: {df_1h.shape}")
+            timeframe_trends["1h"] = get_trend_info(df_1h)
+            print(f"1h trend: {timeframe_trends['1h']['direction']} ({timeframe_trends['1h']['strength']})")
+        else:
+            print(f"Not enough 1-hour data points for {ticker}: {len(data_1h)}")
+            timeframe_trends["1h"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    except Exception as e:
+        print(f"Error getting 1-hour data for {ticker}: {e}")
+        timeframe_trends["1h"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    
+    # 1-day bars
+    try:
+        data_1d = series["1d"]
+        if len(data_1d) >= 5:
+            df_1d = data_1d.to_frame()
+            print(f"1d data shape: {df_1d.shape}")
+            timeframe_trends["1d"] = get_trend_info(df_1d)
+            print(f"1d trend: {timeframe_trends['1d']['direction']} ({timeframe_trends['1d']['strength']})")
+        else:
+            print(f"Not enough 1-day data points for {ticker}: {len(data_1d)}")
             timeframe_trends["1d"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    except Exception as e:
+        print(f"Error getting 1-day data for {ticker}: {e}")
+        timeframe_trends["1d"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    
+    # Calculate 1-month trend
+    try:
+        print(f"Calculating 1-month trend for {ticker}")
         
-        # Calculate 1-month trend
         try:
-            print(f"Calculating 1-month trend for {ticker}")
-            # Get specific monthly data to ensure accuracy
-            end_1mo = end
-            start_1mo = end_1mo - timedelta(days=365)  # Get more data for monthly analysis
-            
-            try:
-                # Get fresh daily data for monthly calculation
-                monthly_data = get_alpaca_data(ticker, start_1mo, end_1mo, TimeFrame.Day, asset_class)
-                if monthly_data and len(monthly_data) >= 30:  # Need at least a month of data
-                    df_daily = pd.DataFrame(monthly_data)
-                    print(f"Monthly source data: {len(df_daily)} days")
+            # A year of daily bars for the monthly calculation
+            monthly_data = series["1mo"]
+            if len(monthly_data) >= 30:  # Need at least a month of data
+                print(f"Monthly source data: {len(monthly_data)} days")
+                
+                # Group by calendar month and calculate OHLC
+                df_monthly = monthly_data.resample(1, 'M').to_frame(index=True)
+                
+                if len(df_monthly) >= 2:  # Need at least 2 months for trend
+                    print(f"Monthly data shape: {df_monthly.shape}")
+                    # Debug the values we're comparing
+                    current_month = df_monthly.iloc[-1]
+                    previous_month = df_monthly.iloc[-2]
+                    current_close = pd.to_numeric(current_month['close'])
+                    previous_close = pd.to_numeric(previous_month['close'])
                     
-                    # Ensure data is sorted
-                    if 'date' in df_daily.columns:
-                        df_daily['date'] = pd.to_datetime(df_daily['date'])
-                        df_daily = df_daily.sort_values('date')
-                        df_daily.set_index('date', inplace=True)
+                    print(f"MONTHLY COMPARISON: Current={current_close:.2f}, Previous={previous_close:.2f}")
                     
-                    # Group by month and calculate OHLC
-                    df_monthly = df_daily.resample('M').agg({
-                        'open': 'first',
-                        'high': 'max',
-                        'low': 'min',
-                        'close': 'last',
-                        'volume': 'sum'
-                    }).dropna()
+                    # Explicitly check direction with clear logic
+                    if current_close > previous_close:
+                        direction_1mo = "Bullish"
+                        print(f"MONTHLY BULLISH: {current_close:.2f} > {previous_close:.2f}")
+                    else:
+                        direction_1mo = "Bearish"
+                        print(f"MONTHLY BEARISH: {current_close:.2f} <= {previous_close:.2f}")
                     
-                    if len(df_monthly) >= 2:  # Need at least 2 months for trend
-                        print(f"Monthly data shape: {df_monthly.shape}")
-                        # Debug the values we're comparing
-                        current_month = df_monthly.iloc[-1]
-                        previous_month = df_monthly.iloc[-2]
-                        current_close = pd.to_numeric(current_month['close'])
-                        previous_close = pd.to_numeric(previous_month['close'])
-                        
-                        print(f"MONTHLY COMPARISON: Current={current_close:.2f}, Previous={previous_close:.2f}")
-                        
-                        # Explicitly check direction with clear logic
-                        if current_close > previous_close:
-                            direction_1mo = "Bullish"
-                            print(f"MONTHLY BULLISH: {current_close:.2f} > {previous_close:.2f}")
-                        else:
-                            direction_1mo = "Bearish"
-                            print(f"MONTHLY BEARISH: {current_close:.2f} <= {previous_close:.2f}")
-                        
-                        # Calculate percentage change
-                        pct_change = abs((current_close - previous_close) / previous_close * 100)
-                        print(f"Monthly percent change: {pct_change:.2f}%")
+                    # Calculate percentage change
+                    pct_change = abs((current_close - previous_close) / previous_close * 100)
+                    print(f"Monthly percent change: {pct_change:.2f}%")
+                    
+                    # Determine strength
+                    if pct_change > 5:
+                        strength = "Strong"
+                    elif pct_change > 2:
+                        strength = "Moderate"
+                    else:
+                        strength = "Weak"
                         
-                        # Determine strength
-                        if pct_change > 5:
-                            strength = "Strong"
-                        elif pct_change > 2:
-                            strength = "Moderate"
-                        else:
-                            strength = "Weak"
+                    # Volume trend - fixed indentation so it's always defined
+                    volume_trend = "Steady"
+                    if 'volume' in df_monthly.columns:
+                        try:
+                            recent_vol = pd.to_numeric(current_month['volume'])
+                            prev_vol = pd.to_numeric(previous_month['volume'])
+                            vol_change_pct = (recent_vol - prev_vol) / prev_vol * 100 if prev_vol > 0 else 0
+                            print(f"Monthly volume change: {vol_change_pct:.2f}%")
                             
-                        # Volume trend - fixed indentation so it's always defined
-                            volume_trend = "Steady"
-                            if 'volume' in df_monthly.columns:
-                                try:
-                                    recent_vol = pd.to_numeric(current_month['volume'])
-                                    prev_vol = pd.to_numeric(previous_month['volume'])
-                                    vol_change_pct = (recent_vol - prev_vol) / prev_vol * 100 if prev_vol > 0 else 0
-                                    print(f"Monthly volume change: {vol_change_pct:.2f}%")
-                                    
-                                    if abs(vol_change_pct) > 20:
-                                        volume_trend = "Increasing" if vol_change_pct > 0 else "Decreasing"
-                                except Exception as vol_err:
-                                    print(f"Monthly volume calculation error: {vol_err}")
-                        
-                        timeframe_trends["1mo"] = {
-                            "direction": direction_1mo,
-                            "strength": strength,
-                            "volume": volume_trend
-                        }
-                        print(f"Final 1mo trend: {direction_1mo} ({strength}) with {volume_trend} volume")
-                    else:
-                        print(f"Not enough monthly periods ({len(df_monthly)})")
-                        timeframe_trends["1mo"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+                            if abs(vol_change_pct) > 20:
+                                volume_trend = "Increasing" if vol_change_pct > 0 else "Decreasing"
+                        except Exception as vol_err:
+                            print(f"Monthly volume calculation error: {vol_err}")
+                    
+                    timeframe_trends["1mo"] = {
+                        "direction": direction_1mo,
+                        "strength": strength,
+                        "volume": volume_trend
+                    }
+                    print(f"Final 1mo trend: {direction_1mo} ({strength}) with {volume_trend} volume")
                 else:
-                    print(f"Not enough daily data for monthly calculation: {len(monthly_data) if monthly_data else 0}")
+                    print(f"Not enough monthly periods ({len(df_monthly)})")
                     timeframe_trends["1mo"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-            except Exception as month_err:
-                print(f"Error in monthly data processing: {month_err}")
+            else:
+                print(f"Not enough daily data for monthly calculation: {len(monthly_data)}")
                 timeframe_trends["1mo"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-        except Exception as e:
-            print(f"Error calculating monthly trend for {ticker}: {e}")
+        except Exception as month_err:
+            print(f"Error in monthly data processing: {month_err}")
             timeframe_trends["1mo"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
-        
-        # Generate AI timeframe strategies
-        ai_strategies = {
-            "weekly": f"Bullish bias above ${pivot_points['s1']}; a close above ${pivot_points['r1']} could trigger a run toward ${pivot_points['r2']}.",
-            "monthly": f"Sustained closes above ${pivot_points['r2']} open the door for a test of ${pivot_points['r3']}; below ${pivot_points['s2']}, momentum could sharply reverse.",
-            "intraday": f"With mixed signals across timeframes, consider a balanced approach: Longs favored on bounces above ${pivot_points['pivot']} with targets at ${pivot_points['r1']} and ${pivot_points['r2']}; shorts triggered on breakdowns below ${pivot_points['pivot']}, eyeing ${pivot_points['s1']} as first support. Watch for whipsaws around key news events—tight stops recommended."
-        }
-        
-        # Key levels to watch
-        key_levels = {
-            "strong_support": [
-                pivot_points['pivot'],
-                pivot_points['s1'],
-                pivot_points['s2']
-            ],
-            "key_resistance": [
-                pivot_points['r1'],
-                pivot_points['r2'],
-                pivot_points['r3']
-            ]
-        }
-        
-        # Convert back to dict for JSON response
-        df = df.fillna("null")  # Replace NaN with null for JSON
-        result = df.to_dict('records')
+    except Exception as e:
+        print(f"Error calculating monthly trend for {ticker}: {e}")
+        timeframe_trends["1mo"] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady"}
+    
+    for name in unavailable:
+        timeframe_trends[name] = {"direction": "Neutral", "strength": "Weak", "volume": "Steady", "status": "unavailable"}
+    
+    # Generate AI timeframe strategies
+    ai_strategies = {
+        "weekly": f"Bullish bias above ${pivot_points['s1']}; a close above ${pivot_points['r1']} could trigger a run toward ${pivot_points['r2']}.",
+        "monthly": f"Sustained closes above ${pivot_points['r2']} open the door for a test of ${pivot_points['r3']}; below ${pivot_points['s2']}, momentum could sharply reverse.",
+        "intraday": f"With mixed signals across timeframes, consider a balanced approach: Longs favored on bounces above ${pivot_points['pivot']} with targets at ${pivot_points['r1']} and ${pivot_points['r2']}; shorts triggered on breakdowns below ${pivot_points['pivot']}, eyeing ${pivot_points['s1']} as first support. Watch for whipsaws around key news events—tight stops recommended."
+    }
+    
+    # Key levels to watch
+    key_levels = {
+        "strong_support": [
+            pivot_points['pivot'],
+            pivot_points['s1'],
+            pivot_points['s2']
+        ],
+        "key_resistance": [
+            pivot_points['r1'],
+            pivot_points['r2'],
+            pivot_points['r3']
+        ]
+    }
+    
+    timeframe_analysis = {
+        "trends": timeframe_trends,
+        "strategies": ai_strategies,
+        "key_levels": key_levels,
+        "pivot_points": pivot_points
+    }
+    
+    return timeframe_analysis
+
+# Approximate memory held by a technical_indicator_result, for the cache budget
+def indicator_result_size(bars, indicators, timeframe_analysis):
+    bar_bytes = sum(getattr(bars, field).nbytes for field in ("timestamp",) + FIELDS)
+    indicator_bytes = sum(values.nbytes for values in indicators.values())
+    return bar_bytes + indicator_bytes + len(json.dumps(timeframe_analysis, default=str))
+
+@app.route('/api/technical-indicators', methods=['GET'])
+def get_technical_indicators_query():
+    # Get ticker from query parameter
+    ticker = request.args.get('symbol')
+    if not ticker:
+        return jsonify({
+            "status": "error",
+            "message": "Symbol parameter is required"
+        }), 400
+    
+    # Process the same way as the path parameter version
+    return get_technical_indicators(ticker)
+
+@app.route('/api/technical-indicators/<ticker>', methods=['GET'])
+def get_technical_indicators(ticker):
+    # URL decode the ticker to handle encoded special characters like BTC%2FUSD
+    ticker = urllib.parse.unquote(ticker)
+    
+    # Get time range from query params, default to 3mo
+    time_range = request.args.get('period', '3mo')
+    
+    # Pick records, columnar JSON or a binary format before doing any work
+    try:
+        wire_format = negotiate(request)
+    except UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+    
+    # Optional projection: ?indicators=rsi,macd, ?tail=N rows, ?sections=indicators|analysis.
+    # Whatever is left out is not fetched or computed at all.
+    try:
+        columns, sections, tail = indicator_projection(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    asset_class = detect_asset_class(ticker)
+    start, end, timeframe = indicator_date_range(time_range)
+    bar_size = alpaca_timeframe_str(timeframe)
+    
+    # Fetch enough history before the period for the requested indicators to be
+    # defined from its first bar on; the extra bars are trimmed from the response
+    warmup = warmup_bars(columns) if "indicators" in sections else 0
+    fetch_start = lookback_start(start, bar_size, warmup, continuous=asset_class == 'crypto')
+    
+    print(f"Fetching technical indicators for {ticker} with date range: {start} to {end} (period: {time_range}, warm-up from {fetch_start})")
+    
+    # Declare every series this request needs. The planner fetches 1-minute bars
+    # for the intraday ones and daily bars for the rest, once per overlapping
+    # window, and resamples each series from those: at most two upstream calls,
+    # made concurrently. The exception is an hourly main series, which gets its
+    # warm-up as hourly bars rather than weeks of minutes, so period=5d with the
+    # trends makes three. Trend series that miss their deadline come back empty.
+    planner = TimeframePlanner()
+    planner.need("main", start, end, bar_size, history_start=fetch_start)  # Also the source of the pivot points
+    if "analysis" in sections:
+        planner.need("5m", end - timedelta(days=1), end, "5Min", TREND_DEADLINES["5m"])     # Last day of 5-minute bars
+        planner.need("15m", end - timedelta(days=1), end, "15Min", TREND_DEADLINES["15m"])
+        planner.need("1h", end - timedelta(days=5), end, "1Hour", TREND_DEADLINES["1h"])    # Last 5 days of hourly bars
+        planner.need("1d", end - timedelta(days=30), end, "1Day", TREND_DEADLINES["1d"])    # Last 30 days
+        planner.need("1mo", end - timedelta(days=365), end, "1Day", TREND_DEADLINES["1mo"])  # A year of daily bars for the monthly trend
+    
+    # Results are cached per (ticker, period, indicator set, source watermark).
+    # While the watermark last seen for this source is fresh, a repeat view skips
+    # the bar fetch too; otherwise the bars are fetched and only compared.
+    source = (ticker, asset_class, time_range, sections, warmup)
+    result_key = lambda watermark: (ticker, time_range, (columns, sections, tail), watermark)
+    
+    # Get data from Alpaca
+    try:
+        result = indicator_cache.get_fresh(source, result_key)
+        if result is None:
+            series = planner.resolve(lambda base, fetch_start, fetch_end: get_alpaca_bars(
+                ticker, fetch_start, fetch_end, planner_timeframe(base), asset_class
+            ), executor=trend_executor)
+            rows = bars_since(series["main"], start, bar_size)
+            rows = min(rows, tail) if tail else rows
+            
+            if planner.late:
+                # Partial results are served but never cached or used as a watermark
+                print(f"Trend timeframes unavailable for {ticker}: {', '.join(planner.late)}")
+                result = technical_indicator_result(
+                    ticker, asset_class, timeframe, series, columns, sections, rows, planner.late
+                )
+            else:
+                watermark = source_watermark(series)
+                indicator_cache.observe(source, watermark)
+                
+                result = indicator_cache.get(result_key(watermark))
+                if result is None:
+                    result = technical_indicator_result(ticker, asset_class, timeframe, series, columns, sections, rows)
+                    indicator_cache.put(result_key(watermark), result, indicator_result_size(*result))
+        
+        # Cached results are shared, so they are only read from here on
+        bars, indicators, timeframe_analysis = result
+        
+        data = {"ticker": ticker, "period": time_range}
+        if "analysis" in sections:
+            data["timeframe_analysis"] = timeframe_analysis
+        if "indicators" not in sections:
+            return jsonify({"status": "success", "data": data})
+        
+        # Columnar and binary formats send the float columns as they are, with epoch-ms timestamps
+        if wire_format != RECORDS:
+            table = {"timestamp": bars.timestamp, **{field: getattr(bars, field) for field in FIELDS}, **indicators}
+            return table_response(wire_format, data, "indicators", table)
+        
+        data["indicators"] = indicator_records(bars, indicators)
+        return jsonify({
+            "status": "success",
+            "data": data
+        })
+    except Exception as e:
+        print(f"Error calculating technical indicators for {ticker}: {e}")
+        return jsonify({
+            "status": "error",
+            "message": f"Unable to calculate indicators: {str(e)}"
+        }), 500
+
+# Technical indicators for a whole watchlist over one period.
+#
+# Symbols are fetched with one batched call per asset class, their closes are
+# aligned on the last bar into a (bars x symbols) matrix, and SMA/EMA/RSI/MACD/
+# Bollinger are computed column-wise in one vectorized pass. Each symbol's
+# values match what /api/technical-indicators/<ticker> returns for it. The
+# multi-timeframe trend analysis stays on the single-symbol endpoint.
+@app.route('/api/technical-indicators/batch', methods=['GET', 'POST'])
+def get_technical_indicators_batch():
+    if request.method == 'POST':
+        params = request.json or {}
+        symbols = params.get('symbols') or []
+    else:
+        params = request.args
+        symbols = params.get('symbols', '').split(',')
+    time_range = params.get('period', '3mo')
+    symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    
+    if not symbols:
+        return jsonify({
+            "status": "error",
+            "message": "symbols parameter is required"
+        }), 400
+    if len(symbols) > TECHNICAL_BATCH_MAX_SYMBOLS:
+        return jsonify({
+            "status": "error",
+            "message": f"At most {TECHNICAL_BATCH_MAX_SYMBOLS} symbols per batch"
+        }), 400
+    
+    # Pick records, columnar JSON or a binary format before doing any work
+    try:
+        wire_format = negotiate(request)
+    except UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+    
+    # Same ?indicators= and ?tail= projection as the single-symbol endpoint
+    try:
+        columns, _, tail = indicator_projection(params)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    start, end, timeframe = indicator_date_range(time_range)
+    bar_size = alpaca_timeframe_str(timeframe)
+    warmup = warmup_bars(columns)
+    print(f"Fetching technical indicators for {len(symbols)} symbols from {start} to {end} (period: {time_range})")
+    
+    try:
+        asset_classes = {symbol: detect_asset_class(symbol) for symbol in symbols}
+        by_class = {}
+        for symbol, asset_class in asset_classes.items():
+            by_class.setdefault(asset_class, []).append(symbol)
+        
+        # One batched fetch per asset class and planned window, including the indicators'
+        # warm-up history (at the bar size itself for intraday bar sizes), then
+        # slice/resample to the period's bar size
+        bars_by_symbol = {}
+        for asset_class, tickers in by_class.items():
+            fetch_start = lookback_start(start, bar_size, warmup, continuous=asset_class == 'crypto')
+            planner = TimeframePlanner()
+            planner.need("main", start, end, bar_size, history_start=fetch_start)
+            fetched = {
+                (base, fetch_from, fetch_to): get_alpaca_data_batch(
+                    tickers, fetch_from, fetch_to, planner_timeframe(base), asset_class
+                )
+                for base, fetch_from, fetch_to in planner.fetches()
+            }
+            for ticker in tickers:
+                bars_by_symbol[ticker] = planner.resolve(lambda *window: fetched[window][ticker])["main"]
+        
+        close = aligned_matrix([bars_by_symbol[symbol] for symbol in symbols], "close")
+        length = len(close)
+        matrix = compute_indicators(close, columns)
+        
+        # Keep only the period (or its last `tail` rows); the warm-up bars are not shown
+        for symbol, bars in bars_by_symbol.items():
+            rows = bars_since(bars, start, bar_size)
+            rows = min(rows, tail) if tail else rows
+            bars_by_symbol[symbol] = bars.take(slice(len(bars) - rows, None))
+        
+        def symbol_indicators(column, symbol):
+            n = len(bars_by_symbol[symbol])
+            return {name: values[length - n:, column] for name, values in matrix.items()}
+        
+        meta = {"period": time_range, "symbols": symbols, "asset_classes": asset_classes}
+        
+        # Columnar and binary formats get one long table with a symbol column
+        if wire_format != RECORDS:
+            parts = [(symbol, bars_by_symbol[symbol], symbol_indicators(column, symbol))
+                     for column, symbol in enumerate(symbols)]
+            table = {
+                "symbol": np.concatenate([np.full(len(bars), symbol, dtype=object) for symbol, bars, _ in parts]),
+                "timestamp": np.concatenate([bars.timestamp for _, bars, _ in parts])
+            }
+            for field in FIELDS:
+                table[field] = np.concatenate([getattr(bars, field) for _, bars, _ in parts])
+            for name in columns:
+                table[name] = np.concatenate([indicators[name] for _, _, indicators in parts])
+            return table_response(wire_format, meta, "indicators", table)
         
         return jsonify({
             "status": "success",
             "data": {
-                "ticker": ticker,
-                "period": time_range,
-                "indicators": result,
-                "timeframe_analysis": {
-                    "trends": timeframe_trends,
-                    "strategies": ai_strategies,
-                    "key_levels": key_levels,
-                    "pivot_points": pivot_points
+                **meta,
+                "indicators": {
+                    symbol: indicator_records(bars_by_symbol[symbol], symbol_indicators(column, symbol))
+                    for column, symbol in enumerate(symbols)
                 }
             }
         })
     except Exception as e:
-        print(f"Error calculating technical indicators for {ticker}: {e}")
+        print(f"Error calculating batch technical indicators: {e}")
         return jsonify({
             "status": "error",
             "message": f"Unable to calculate indicators: {str(e)}"
         }), 500
 
+# Screen a universe for symbols matching filter expressions on their latest values.
+#
+# ?filters=rsi<30,volume_ratio>2 (every filter must match; see screener.py for the
+# syntax), over ?universe=stocks|crypto|indices|all (default all) or an explicit
+# ?symbols= list, ranked by ?sort=<field> and ?order=desc|asc, top ?limit=N.
+# Bars come from the bar store with one batched call per asset class, and the
+# screenable fields are computed for the whole universe as one matrix. That
+# snapshot is cached per source watermark, so screening the same universe again
+# with other filters only re-evaluates the filters.
+@app.route('/api/screener', methods=['GET', 'POST'])
+def get_screener():
+    if request.method == 'POST':
+        params = request.json or {}
+        filter_texts = params.get('filters') or []
+        symbols = params.get('symbols') or []
+    else:
+        params = request.args
+        filter_texts = params.get('filters', '').split(',')
+        symbols = params.get('symbols', '').split(',')
+    time_range = params.get('period', '3mo')
+    universe = params.get('universe', 'all')
+    sort = params.get('sort', 'change_pct')
+    order = params.get('order', 'desc')
+    filter_texts = [text.strip() for text in filter_texts if text and text.strip()]
+    symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    
+    try:
+        filters = [screener.parse_filter(text) for text in filter_texts]
+        if sort not in screener.FIELDS:
+            raise ValueError(f"Unknown sort field '{sort}'. Choose from: {', '.join(screener.FIELDS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be asc or desc")
+        try:
+            limit = int(params.get('limit', SCREENER_DEFAULT_LIMIT))
+        except (TypeError, ValueError):
+            limit = 0
+        if limit < 1:
+            raise ValueError("limit must be a positive number of matches")
+        
+        if not symbols:
+            if universe == 'all':
+                symbols = list(dict.fromkeys(t for tickers in markets.values() for t in tickers.values()))
+            elif universe in markets:
+                symbols = list(dict.fromkeys(markets[universe].values()))
+            else:
+                raise ValueError(f"universe must be 'all' or one of: {', '.join(markets)}")
+        else:
+            universe = "symbols"
+        if len(symbols) > SCREENER_MAX_SYMBOLS:
+            raise ValueError(f"At most {SCREENER_MAX_SYMBOLS} symbols per screen")
+        
+        start, end, timeframe = indicator_date_range(time_range)
+        if str(timeframe) != str(TimeFrame.Day):
+            raise ValueError("The screener works on daily bars; use a period of 1mo or longer")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    # Only the indicators the filters and sort refer to are computed, with their warm-up history
+    fields = screener.referenced_fields(filters, sort)
+    columns = tuple(name for name in INDICATOR_COLUMNS if name in fields)
+    warmup = max(warmup_bars(columns), screener.VOLUME_AVERAGE_WINDOW if "volume_ratio" in fields else 0)
+    print(f"Screening {len(symbols)} symbols ({universe}, period {time_range}) with {len(filters)} filters")
+    
+    try:
+        source = ("screener", tuple(symbols), time_range, columns, warmup)
+        snapshot_key = lambda watermark: source + (watermark,)
+        values = indicator_cache.get_fresh(source, snapshot_key)
+        if values is None:
+            asset_classes = {symbol: detect_asset_class(symbol) for symbol in symbols}
+            bars_by_symbol = {}
+            for asset_class in dict.fromkeys(asset_classes.values()):
+                tickers = [symbol for symbol in symbols if asset_classes[symbol] == asset_class]
+                fetch_start = lookback_start(start, "1Day", warmup, continuous=asset_class == 'crypto')
+                bars_by_symbol.update(get_alpaca_data_batch(tickers, fetch_start, end, TimeFrame.Day, asset_class))
+            
+            watermark = source_watermark(bars_by_symbol)
+            indicator_cache.observe(source, watermark)
+            values = indicator_cache.get(snapshot_key(watermark))
+            if values is None:
+                bars_list = [bars_by_symbol[symbol] for symbol in symbols]
+                close = aligned_matrix(bars_list, "close")
+                # First row of each symbol inside the period, the base of change_pct
+                first_rows = np.array([len(close) - bars_since(bars, start, "1Day") for bars in bars_list], dtype=int)
+                values = screener.snapshot(close, aligned_matrix(bars_list, "volume"), first_rows, columns)
+                indicator_cache.put(snapshot_key(watermark), values, sum(v.nbytes for v in values.values()))
+        
+        matches = screener.evaluate(values, filters)
+        ranked = screener.rank(values, matches, sort, descending=order == "desc", limit=limit)
+        
+        names = {ticker: (category, name) for category, tickers in markets.items() for name, ticker in tickers.items()}
+        shown = [name for name in screener.FIELDS if name in fields or name in ("close", "change_pct")]
+        
+        def value(name, column):
+            number = float(values[name][1][column])
+            return None if number != number else round(number, 4)
+        
+        results = []
+        for column in ranked.tolist():
+            category, name = names.get(symbols[column], (None, None))
+            results.append({
+                "symbol": symbols[column],
+                "name": name,
+                "category": category,
+                **{field: value(field, column) for field in shown}
+            })
+        
+        return jsonify({
+            "status": "success",
+            "data": {
+                "period": time_range,
+                "universe": universe,
+                "screened": len(symbols),
+                "filters": filter_texts,
+                "sort": sort,
+                "order": order,
+                "count": int(matches.sum()),
+                "matches": results
+            }
+        })
+    except Exception as e:
+        print(f"Error running screener: {e}")
+        return jsonify({
+            "status": "error",
+            "message": f"Unable to run screener: {str(e)}"
+        }), 500
+
+# Correlation matrix of daily returns for a symbol set.
+#
+# ?symbols=AAPL,MSFT,BTC/USD (or ?universe=stocks|crypto|indices|all, default all),
+# ?period=1y. With ?window=N the rolling N-day correlation is added: the latest
+# rolling matrix, the average pairwise correlation per day and, for
+# ?pairs=AAPL:MSFT,BTC/USD:ETH/USD, each pair's rolling series.
+# Closes are kept in a cached price panel per period, so another window or a
+# subset of the symbols is answered without fetching bars again.
+@app.route('/api/correlation', methods=['GET', 'POST'])
+def get_correlation():
+    if request.method == 'POST':
+        params = request.json or {}
+        symbols = params.get('symbols') or []
+        pairs = params.get('pairs') or []
+    else:
+        params = request.args
+        symbols = params.get('symbols', '').split(',')
+        pairs = params.get('pairs', '').split(',')
+    time_range = params.get('period', '1y')
+    universe = params.get('universe', 'all')
+    symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    
+    try:
+        if not symbols:
+            if universe == 'all':
+                symbols = list(dict.fromkeys(t for tickers in markets.values() for t in tickers.values()))
+            elif universe in markets:
+                symbols = list(dict.fromkeys(markets[universe].values()))
+            else:
+                raise ValueError(f"universe must be 'all' or one of: {', '.join(markets)}")
+        if len(symbols) < 2:
+            raise ValueError("At least two symbols are needed for a correlation matrix")
+        if len(symbols) > CORRELATION_MAX_SYMBOLS:
+            raise ValueError(f"At most {CORRELATION_MAX_SYMBOLS} symbols per correlation matrix")
+        
+        window = params.get('window')
+        if window is not None:
+            try:
+                window = int(window)
+            except (TypeError, ValueError):
+                window = 0
+            if window < 5:
+                raise ValueError("window must be at least 5 returns")
+        
+        pairs = [pair.split(':') if isinstance(pair, str) else list(pair) for pair in pairs if pair]
+        for pair in pairs:
+            if len(pair) != 2 or any(symbol not in symbols for symbol in pair):
+                raise ValueError(f"pairs must be SYMBOL:SYMBOL for symbols in the set, got {':'.join(map(str, pair))}")
+        
+        start, end, timeframe = indicator_date_range(time_range)
+        if str(timeframe) != str(TimeFrame.Day):
+            raise ValueError("Correlations are computed from daily bars; use a period of 1mo or longer")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    try:
+        panel, missing = panel_cache.lookup(time_range, symbols)
+        if missing:
+            print(f"Correlation: fetching {len(missing)} of {len(symbols)} symbols for {time_range}")
+            asset_classes = {symbol: detect_asset_class(symbol) for symbol in missing}
+            bars_by_symbol = {}
+            for asset_class in dict.fromkeys(asset_classes.values()):
+                tickers = [symbol for symbol in missing if asset_classes[symbol] == asset_class]
+                bars_by_symbol.update(get_alpaca_data_batch(tickers, start, end, TimeFrame.Day, asset_class))
+            fetched = PricePanel.from_bars(
+                bars_by_symbol, {symbol: asset_class == 'crypto' for symbol, asset_class in asset_classes.items()}
+            )
+            panel = panel_cache.add(time_range, fetched, len(missing))
+        
+        selected = panel.select(symbols)
+        dates, returns = selected.returns()
+        
+        def cleaned(values):
+            return [None if value != value else round(value, 4) for value in values]
+        
+        def rounded(matrix):
+            return [cleaned(row) for row in matrix.tolist()]
+        
+        data = {
+            "period": time_range,
+            "symbols": symbols,
+            "calendar": "continuous" if selected.continuous.all() else "trading",
+            "observations": len(returns),
+            "start": str(dates[0]) if len(dates) else None,
+            "end": str(dates[-1]) if len(dates) else None,
+            "matrix": rounded(correlation(returns, CORRELATION_MIN_PERIODS))
+        }
+        
+        if window:
+            index = {symbol: column for column, symbol in enumerate(symbols)}
+            upper = np.triu_indices(len(symbols), k=1)
+            average, pair_series, latest = [], {f"{a}:{b}": [] for a, b in pairs}, None
+            for _, matrices in rolling_correlation(returns, window):
+                with np.errstate(invalid='ignore'):
+                    pair_values = matrices[:, upper[0], upper[1]]
+                    counts = (~np.isnan(pair_values)).sum(axis=1)
+                    means = np.where(counts > 0, np.nansum(pair_values, axis=1) / np.maximum(counts, 1), np.nan)
+                average.extend(means.tolist())
+                for a, b in pairs:
+                    pair_series[f"{a}:{b}"].extend(matrices[:, index[a], index[b]].tolist())
+                latest = matrices[-1]
+            
+            data["rolling"] = {
+                "window": window,
+                "dates": [str(date) for date in dates[window - 1:]],
+                "average": cleaned(average),
+                "latest": rounded(latest) if latest is not None else None,
+                "pairs": {name: cleaned(values) for name, values in pair_series.items()}
+            }
+        
+        return jsonify({
+            "status": "success",
+            "data": data
+        })
+    except Exception as e:
+        print(f"Error calculating correlations: {e}")
+        return jsonify({
+            "status": "error",
+            "message": f"Unable to calculate correlations: {str(e)}"
+        }), 500
+
 @app.route('/api/economic-calendar', methods=['GET'])
 def get_economic_calendar():
     # Generate mock economic calendar data
@@ -1419,7 +2314,13 @@ def get_openai_analysis():
         chat_completion_url = f"{base_url}/chat/completions"
         print(f"Making request to OpenAI API at: {chat_completion_url}")
         
-        response = requests.post(chat_completion_url, headers=headers, json=payload)
+        response = transport.post(
+            chat_completion_url,
+            headers=headers,
+            json=payload,
+            timeout=(HTTP_CONNECT_TIMEOUT, OPENAI_READ_TIMEOUT),
+            breaker="chat_completions"
+        )
         
         # Log response status
         print(f"OpenAI API response status: {response.status_code}")
@@ -1532,9 +2433,6 @@ def get_fundamental_catalysts():
 def get_fundamental_catalyst_summary():
     """Generate a comprehensive fundamental catalyst summary for a stock."""
     try:
-        # Declare global variables first
-        global stock_client
-        
         # Get request data
         data = request.json
         if not data:
@@ -1585,33 +2483,20 @@ def get_fundamental_catalyst_summary():
             # This approach matches the get_market_data function used in Market Summary tab
             start, end, timeframe = get_market_date_range(time_range)
             
-            # Get data from Alpaca directly using get_alpaca_data, just like the Market Summary tab
-            data = get_alpaca_data(symbol, start, end, timeframe, asset_class)
-            
-            # Ensure all data points have timestamps
-            if data:
-                for i, item in enumerate(data):
-                    if not item.get('timestamp'):
-                        # If timestamp is missing, create one based on position (newest at end)
-                        # Use the start date plus i days as an approximation
-                        item['timestamp'] = start + timedelta(days=i)
-                        print(f"Added missing timestamp for data point {i}")
+            # Get bars from Alpaca directly using get_alpaca_bars, just like the Market Summary tab
+            bars = get_alpaca_bars(symbol, start, end, timeframe, asset_class)
             
             # Filter the data to match the requested time range - also matches Market Summary approach
-            price_data = filter_data_to_timeframe(data, time_range)
+            price_bars = filter_bars_to_timeframe(bars, time_range)
             
-            if not price_data or len(price_data) < 2:
+            if len(price_bars) < 2:
                 print(f"Insufficient price data for {symbol}, falling back to mock data")
                 raise Exception("Insufficient price data available")
-                
-            # Get the most recent price info
-            latest_data = price_data[-1]
-            previous_day = price_data[-2] if len(price_data) >= 2 else price_data[0]
             
-            # Extract price info from data
-            current_price = round(float(latest_data['close']), 2)
-            previous_price = round(float(previous_day['close']), 2)
-            opening_price = round(float(latest_data['open']), 2)
+            # Extract price info from the two most recent bars
+            current_price = round(float(price_bars.close[-1]), 2)
+            previous_price = round(float(price_bars.close[-2]), 2)
+            opening_price = round(float(price_bars.open[-1]), 2)
             
             price_change = round(current_price - previous_price, 2)
             price_change_pct = round((price_change / previous_price) * 100, 2)
@@ -2002,9 +2887,9 @@ def process_copilot_query():
                 if '/' in symbol:
                     # Handle BTC/USD format for crypto
                     symbol_encoded = urllib.parse.quote(symbol)
-                    tech_url = f"/api/technical-indicators/{symbol_encoded}?period={period}"
+                    tech_url = f"/api/technical-indicators/{symbol_encoded}?period={period}&sections=analysis"
                 else:
-                    tech_url = f"/api/technical-indicators/{symbol}?period={period}"
+                    tech_url = f"/api/technical-indicators/{symbol}?period={period}&sections=analysis"
                 
                 # Make internal request to the technical indicators endpoint
                 tech_response = app.test_client().get(tech_url)
@@ -2159,6 +3044,15 @@ def process_copilot_query():
 # Helper function to query OpenAI models
 def query_openai(prompt, temperature=0.7, max_tokens=1000, is_json=False):
     """Make a request to OpenAI API for text generation"""
+    # Identical prompts already in flight share that completion
+    result, _ = chat_flight.do(
+        (OPENAI_MODEL_NAME, prompt, temperature, max_tokens, is_json),
+        lambda: request_chat_completion(prompt, temperature, max_tokens, is_json)
+    )
+    return result
+
+# Send one chat completion request
+def request_chat_completion(prompt, temperature, max_tokens, is_json):
     try:
         headers = {
             "Content-Type": "application/json",
@@ -2180,10 +3074,12 @@ def query_openai(prompt, temperature=0.7, max_tokens=1000, is_json=False):
             payload["response_format"] = {"type": "json_object"}
         
         # Make the API request
-        response = requests.post(
+        response = transport.post(
             f"{API_BASE_URL}/chat/completions",
             headers=headers,
-            json=payload
+            json=payload,
+            timeout=(HTTP_CONNECT_TIMEOUT, OPENAI_READ_TIMEOUT),
+            breaker="chat_completions"
         )
         
         # Check for successful response
@@ -2386,4 +3282,8 @@ def get_alpaca_client():
     return None
 
 if __name__ == '__main__':
+    # Precompute signals and summaries in the serving process only, not in the debug reloader's watcher
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        signal_board.start()
+        summary_snapshots.start()
     app.run(debug=True, port=5004, host='0.0.0.0') 
\ No newline at end of file
@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
@@ -11,6 +10,11 @@ from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 import requests
 
+from bars import Bars
+from bar_store import bar_store, MarketDataUnavailable
+from synthetic_market import synthetic_market
+import indicator_kernels as kernels
+
 # Page configuration - MUST be the first Streamlit command
 st.set_page_config(
     page_title="Market Command Center",
@@ -187,94 +191,49 @@ def get_market_data(_tickers, period="3mo"):
     else:
         start = end - timedelta(days=90)  # Default to 3 months
     
-    # Get data for each ticker
-    try:
-        # Request bars for all tickers at once
-        request_params = StockBarsRequest(
-            symbol_or_symbols=list(_tickers),
-            timeframe=timeframe_map.get(period, TimeFrame.Day),
-            start=start,
-            end=end,
-            feed="iex"  # Use IEX feed instead of SIP
-        )
-        
+    tickers = list(_tickers)
+    timeframe = timeframe_map.get(period, TimeFrame.Day)
+    
+    # Request bars for all tickers missing the same range at once
+    def fetch_gap(gap_tickers, gap_start, gap_end):
         try:
+            request_params = StockBarsRequest(
+                symbol_or_symbols=gap_tickers,
+                timeframe=timeframe,
+                start=gap_start,
+                end=gap_end,
+                feed="iex"  # Use IEX feed instead of SIP
+            )
             bars = stock_client.get_stock_bars(request_params)
-            
-            # Process the response for each ticker
-            for ticker in _tickers:
-                if ticker in bars.data and bars.data[ticker]:
-                    # Convert to DataFrame
-                    ticker_data = []
-                    for bar in bars.data[ticker]:
-                        ticker_data.append(bar.__dict__)
-                    
-                    df = pd.DataFrame(ticker_data)
-                    # Check if timestamp exists in the data
-                    if not df.empty:
-                        if 'timestamp' in df.columns:
-                            df.set_index('timestamp', inplace=True)
-                        data[ticker] = df
-                    else:
-                        # Create mock data for demo purposes
-                        data[ticker] = create_mock_data(ticker, start, end)
-                else:
-                    # Create mock data for demo purposes
-                    data[ticker] = create_mock_data(ticker, start, end)
         except Exception as e:
-            # Create mock data for all tickers
-            for ticker in _tickers:
-                data[ticker] = create_mock_data(ticker, start, end)
-                
-    except Exception as e:
-        # Create mock data for all tickers
-        for ticker in _tickers:
-            data[ticker] = create_mock_data(ticker, start, end)
+            # Tickers without stored bars fall back to mock data below
+            raise MarketDataUnavailable(f"Alpaca stock request failed for {', '.join(gap_tickers)}") from e
+        
+        # Tickers the response has no bars for get empty Bars: the range has none
+        return {
+            ticker: Bars.from_sdk(bars.data[ticker]) if bars.data.get(ticker) else Bars.empty()
+            for ticker in gap_tickers
+        }
+    
+    # Fetch only the date ranges missing from the local bar store. Ranges without
+    # bars are stored as covered, and a failed tail marks the stored bars stale.
+    bar_store.fill_missing(tickers, "stock", timeframe, start, end, fetch_gap)
+    
+    # Build each ticker's DataFrame from the store
+    for ticker in tickers:
+        try:
+            data[ticker] = bar_store.read(ticker, "stock", timeframe, start, end).to_frame(index=True)
+        except MarketDataUnavailable:
+            # Create mock data for demo purposes
+            data[ticker] = create_mock_data(ticker, start, end, timeframe)
     
     return data
 
 # Function to create mock data for demo purposes
-def create_mock_data(ticker, start_date, end_date):
-    # Create a date range from start to end
-    date_range = pd.date_range(start=start_date, end=end_date, freq='B')
-    
-    # Set a seed based on ticker for consistent but different data
-    seed = sum(ord(c) for c in ticker)
-    np.random.seed(seed)
-    
-    # Generate random price data with a trend
-    n = len(date_range)
-    base_price = 100 + np.random.rand() * 900  # Random starting price 
-    
-    # Add a trend and some randomness
-    noise = np.random.normal(0, 1, n)
-    trend = np.linspace(0, 20 * (np.random.rand() - 0.5), n)  # Random trend direction
-    
-    # Calculate prices
-    close_prices = base_price + trend + noise * 5
-    
-    # Ensure no negative prices
-    close_prices = np.maximum(close_prices, 1.0)
-    
-    # Create high, low, open prices
-    high_prices = close_prices + np.random.rand(n) * (close_prices * 0.02)
-    low_prices = close_prices - np.random.rand(n) * (close_prices * 0.02)
-    low_prices = np.maximum(low_prices, 0.1)  # Ensure low prices are positive
-    open_prices = low_prices + np.random.rand(n) * (high_prices - low_prices)
-    
-    # Generate volume
-    volume = np.random.randint(100000, 10000000, n)
-    
-    # Create DataFrame
-    df = pd.DataFrame({
-        'open': open_prices,
-        'high': high_prices,
-        'low': low_prices,
-        'close': close_prices,
-        'volume': volume
-    }, index=date_range)
-    
-    return df
+def create_mock_data(ticker, start_date, end_date, timeframe=TimeFrame.Day):
+    # Deterministic per ticker and thread-safe: no reseeding of the global np.random state.
+    # Generated at the requested bar size, so intraday periods get intraday bars
+    return synthetic_market.bars(ticker, start_date, end_date, str(timeframe)).to_frame(index=True)
 
 # Dictionary of all market data
 markets = {
@@ -1145,11 +1104,8 @@ elif page == "Technical Analysis":
                 
                 with col4:
                     # Calculate RSI
-                    delta = df[price_cols['close']].diff()
-                    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-                    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
-                    rs = gain / loss
-                    rsi = 100 - (100 / (1 + rs))
+                    close = df[price_cols['close']].to_numpy(dtype=float)
+                    rsi = pd.Series(kernels.rsi(close, 14), index=df.index)
                     
                     current_rsi = rsi.iloc[-1]
                     
@@ -1171,13 +1127,12 @@ elif page == "Technical Analysis":
                 
                 with chart_tabs[0]:
                     # Calculate indicators
-                    df['SMA20'] = df[price_cols['close']].rolling(window=20).mean()
-                    df['SMA50'] = df[price_cols['close']].rolling(window=50).mean()
-                    df['SMA200'] = df[price_cols['close']].rolling(window=200).mean()
+                    df['SMA20'] = kernels.sma(close, 20)
+                    df['SMA50'] = kernels.sma(close, 50)
+                    df['SMA200'] = kernels.sma(close, 200)
                     
                     # Bollinger Bands
-                    df['UpperBand'] = df['SMA20'] + (df[price_cols['close']].rolling(window=20).std() * 2)
-                    df['LowerBand'] = df['SMA20'] - (df[price_cols['close']].rolling(window=20).std() * 2)
+                    _, df['UpperBand'], df['LowerBand'] = kernels.bollinger(close, 20, 2)
                     
                     # Create Candlestick chart
                     fig = go.Figure()
@@ -1347,11 +1302,7 @@ elif page == "Technical Analysis":
                     
                     with col2:
                         # MACD
-                        df['EMA12'] = df[price_cols['close']].ewm(span=12, adjust=False).mean()
-                        df['EMA26'] = df[price_cols['close']].ewm(span=26, adjust=False).mean()
-                        df['MACD'] = df['EMA12'] - df['EMA26']
-                        df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-                        df['Histogram'] = df['MACD'] - df['Signal']
+                        df['EMA12'], df['EMA26'], df['MACD'], df['Signal'], df['Histogram'] = kernels.macd(close, 12, 26, 9)
                         
                         fig = go.Figure()
                         
@@ -1407,7 +1358,8 @@ elif page == "Technical Analysis":
                         ))
                         
                         # Add 20-day average volume
-                        df['AvgVol20'] = df[price_cols['volume']].rolling(window=20).mean()
+                        volume = df[price_cols['volume']].to_numpy(dtype=float)
+                        df['AvgVol20'] = kernels.sma(volume, 20)
                         
                         fig.add_trace(go.Scatter(
                             x=df.index,
@@ -1427,14 +1379,7 @@ elif page == "Technical Analysis":
                         st.plotly_chart(fig, use_container_width=True)
                         
                         # Calculate OBV (On-Balance Volume)
-                        df['OBV'] = 0
-                        for i in range(1, len(df)):
-                            if df[price_cols['close']].iloc[i] > df[price_cols['close']].iloc[i-1]:
-                                df['OBV'].iloc[i] = df['OBV'].iloc[i-1] + df[price_cols['volume']].iloc[i]
-                            elif df[price_cols['close']].iloc[i] < df[price_cols['close']].iloc[i-1]:
-                                df['OBV'].iloc[i] = df['OBV'].iloc[i-1] - df[price_cols['volume']].iloc[i]
-                            else:
-                                df['OBV'].iloc[i] = df['OBV'].iloc[i-1]
+                        df['OBV'] = kernels.obv(close, volume)
                         
                         # OBV Chart
                         fig = go.Figure()
@@ -1508,42 +1453,11 @@ elif page == "Technical Analysis":
                     
                     with col2:
                         # ADX (Average Directional Index)
-                        # Calculate +DI and -DI
-                        df['TR'] = np.maximum(
-                            np.maximum(
-                                df[price_cols['high']] - df[price_cols['low']],
-                                abs(df[price_cols['high']] - df[price_cols['close']].shift(1))
-                            ),
-                            abs(df[price_cols['low']] - df[price_cols['close']].shift(1))
-                        )
-                        
-                        df['DM+'] = np.where(
-                            (df[price_cols['high']] - df[price_cols['high']].shift(1) > 0) & 
-                            (df[price_cols['high']] - df[price_cols['high']].shift(1) > df[price_cols['low']].shift(1) - df[price_cols['low']]),
-                            df[price_cols['high']] - df[price_cols['high']].shift(1),
-                            0
-                        )
-                        
-                        df['DM-'] = np.where(
-                            (df[price_cols['low']].shift(1) - df[price_cols['low']] > 0) & 
-                            (df[price_cols['low']].shift(1) - df[price_cols['low']] > df[price_cols['high']] - df[price_cols['high']].shift(1)),
-                            df[price_cols['low']].shift(1) - df[price_cols['low']],
-                            0
-                        )
-                        
-                        # Calculate smoothed values
-                        window = 14
-                        df['TR14'] = df['TR'].rolling(window=window).sum()
-                        df['DM+14'] = df['DM+'].rolling(window=window).sum()
-                        df['DM-14'] = df['DM-'].rolling(window=window).sum()
-                        
-                        # Calculate +DI and -DI
-                        df['+DI'] = 100 * df['DM+14'] / df['TR14']
-                        df['-DI'] = 100 * df['DM-14'] / df['TR14']
-                        
-                        # Calculate DX and ADX
-                        df['DX'] = 100 * abs(df['+DI'] - df['-DI']) / (df['+DI'] + df['-DI'])
-                        df['ADX'] = df['DX'].rolling(window=window).mean()
+                        # +DI, -DI and ADX with Wilder's smoothing
+                        high = df[price_cols['high']].to_numpy(dtype=float)
+                        low = df[price_cols['low']].to_numpy(dtype=float)
+                        df['TR'] = kernels.true_range(high, low, close)
+                        df['+DI'], df['-DI'], df['ADX'] = kernels.adx(high, low, close, 14)
                         
                         # ADX Chart
                         fig = go.Figure()
@@ -1632,7 +1546,7 @@ elif page == "Technical Analysis":
                     
                     with col2:
                         # ATR (Average True Range)
-                        df['ATR'] = df['TR'].rolling(window=14).mean()
+                        df['ATR'] = kernels.atr(high, low, close, 14)
                         
                         # Calculate ATR percentage
                         df['ATR%'] = (df['ATR'] / df[price_cols['close']]) * 100
@@ -0,0 +1,224 @@
+import os
+import threading
+import urllib.parse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from bars import Bars, FIELDS
+
+
+class MarketDataUnavailable(Exception):
+    """Raised by the upstream fetchers when no real bars could be retrieved."""
+
+
+class NoBarsInRange(MarketDataUnavailable):
+    """Raised when upstream answered but had no bars in the range (weekend, holiday, before listing)."""
+
+
+# Persistent on-disk store of daily OHLCV bars, keyed by asset class, timeframe and symbol.
+#
+# Each key is one .npz file holding the bars as columns plus the date range
+# that has already been requested from upstream. Reads are served
+# from the store and only the missing head and/or tail of the range is fetched.
+# Bars before today are treated as final; today's bar is always re-fetched.
+# A range upstream has no bars for is covered all the same, and a key whose
+# tail could not be fetched is reported as stale until a later fetch succeeds.
+class BarStore:
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self._entries = {}  # In-memory copy of every key loaded so far
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._stale = {}  # key -> last covered day, for keys whose tail fetch failed
+
+    def _key_lock(self, key):
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _path(self, key):
+        asset_class, timeframe, symbol = key
+        return os.path.join(
+            self.root_dir,
+            asset_class,
+            timeframe,
+            urllib.parse.quote(symbol, safe='') + '.npz'
+        )
+
+    def _load(self, key):
+        if key in self._entries:
+            return self._entries[key]
+
+        entry = None
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    entry = {
+                        "covered_start": str(data['covered_start']),
+                        "covered_end": str(data['covered_end']),
+                        "bars": Bars(data['timestamp'].astype('datetime64[ms]'), *(data[f] for f in FIELDS))
+                    }
+            except Exception as e:
+                print(f"Bar store: could not read {path}: {e}, ignoring stored bars")
+                entry = None
+
+        self._entries[key] = entry
+        return entry
+
+    def _save(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file first so a crash never leaves a truncated store file
+        tmp_path = path + '.tmp'
+        bars = entry['bars']
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                covered_start=np.array(entry['covered_start']),
+                covered_end=np.array(entry['covered_end']),
+                timestamp=bars.timestamp.astype(np.int64),
+                **{field: getattr(bars, field) for field in FIELDS}
+            )
+        os.replace(tmp_path, path)
+
+        self._entries[key] = entry
+
+    def missing_ranges(self, symbol, asset_class, timeframe, start_date, end_date):
+        """Return the (start, end) ranges that must be fetched upstream to serve the request."""
+        # Coverage is tracked in whole days, so fetch the first day from its start
+        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        entry = self._load((asset_class, str(timeframe), symbol))
+        if entry is None:
+            return [(start_date, end_date)]
+
+        start_day = start_date.strftime('%Y-%m-%d')
+        end_day = end_date.strftime('%Y-%m-%d')
+        ranges = []
+
+        # Missing head: history older than anything requested so far
+        if start_day < entry['covered_start']:
+            head_end = datetime.strptime(entry['covered_start'], '%Y-%m-%d') - timedelta(seconds=1)
+            ranges.append((start_date, head_end))
+
+        # Missing tail: everything after the last final day we have stored.
+        # Always fetched from covered_end so the stored range stays contiguous.
+        if end_day > entry['covered_end']:
+            tail_start = datetime.strptime(entry['covered_end'], '%Y-%m-%d') + timedelta(days=1)
+            ranges.append((tail_start, end_date))
+
+        # With both ends missing, one request for the whole range is cheaper than two
+        # round trips; re-fetching the stored middle costs little for daily bars
+        if len(ranges) == 2:
+            return [(start_date, end_date)]
+        return ranges
+
+    def store(self, symbol, asset_class, timeframe, start_date, end_date, bars):
+        """Merge bars fetched for [start_date, end_date] and extend the covered range."""
+        key = (asset_class, str(timeframe), symbol)
+        start_day = start_date.strftime('%Y-%m-%d')
+
+        # Bars up to yesterday are final; today's bar may still change
+        last_final_day = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        end_day = min(end_date.strftime('%Y-%m-%d'), last_final_day)
+
+        with self._key_lock(key):
+            entry = self._load(key)
+            if entry is None:
+                entry = {"covered_start": start_day, "covered_end": end_day, "bars": bars.sorted()}
+            else:
+                # New entry rather than in-place update, so concurrent readers see old or new
+                entry = {
+                    "covered_start": min(entry['covered_start'], start_day),
+                    "covered_end": max(entry['covered_end'], end_day),
+                    "bars": entry['bars'].merge(bars)
+                }
+            self._save(key, entry)
+
+            # A fetch reaching past the stale tail brings the key up to date again
+            stale_through = self._stale.get(key)
+            if stale_through is not None and end_date.strftime('%Y-%m-%d') > stale_through:
+                del self._stale[key]
+
+    def fetch_failed(self, symbol, asset_class, timeframe, start_date, end_date):
+        """Record that fetching [start_date, end_date] failed; if that was the tail, the stored bars are stale."""
+        key = (asset_class, str(timeframe), symbol)
+        with self._key_lock(key):
+            entry = self._load(key)
+            if entry is not None and end_date.strftime('%Y-%m-%d') > entry['covered_end']:
+                self._stale[key] = entry['covered_end']
+
+    def stale_tail(self, symbol, asset_class, timeframe):
+        """The last covered day if the bars after it could not be fetched last time, else None."""
+        return self._stale.get((asset_class, str(timeframe), symbol))
+
+    def read(self, symbol, asset_class, timeframe, start_date, end_date):
+        """Return the stored bars for [start_date, end_date] as Bars."""
+        entry = self._load((asset_class, str(timeframe), symbol))
+        start_day = start_date.strftime('%Y-%m-%d')
+        end_day = end_date.strftime('%Y-%m-%d')
+
+        result = entry['bars'].between_days(start_day, end_day) if entry else Bars.empty()
+        if not len(result):
+            raise MarketDataUnavailable(f"No stored bars for {symbol} between {start_day} and {end_day}")
+        return result
+
+    def read_through(self, symbol, asset_class, timeframe, start_date, end_date, fetch):
+        """
+        Return bars for [start_date, end_date], calling fetch(start, end) only for
+        the parts of the range that are not stored yet. If the tail could not be
+        fetched, the stored bars are served and stale_tail() reports it.
+        """
+        for gap_start, gap_end in self.missing_ranges(symbol, asset_class, timeframe, start_date, end_date):
+            print(f"Bar store: fetching {symbol} ({asset_class}, {timeframe}) from {gap_start} to {gap_end}")
+            try:
+                bars = fetch(gap_start, gap_end)
+            except NoBarsInRange as e:
+                # Nothing traded in the gap; store it as covered so it is not asked for again
+                print(f"Bar store: {e}, marking the range as covered")
+                bars = Bars.empty()
+            except MarketDataUnavailable as e:
+                # Serve whatever is already stored; read() raises if that is nothing
+                print(f"Bar store: gap fetch failed for {symbol}: {e}, serving stored bars")
+                self.fetch_failed(symbol, asset_class, timeframe, gap_start, gap_end)
+                continue
+            self.store(symbol, asset_class, timeframe, gap_start, gap_end, bars)
+
+        return self.read(symbol, asset_class, timeframe, start_date, end_date)
+
+    def fill_missing(self, symbols, asset_class, timeframe, start_date, end_date, fetch_batch):
+        """
+        Fetch whatever the store lacks for [start_date, end_date] for several symbols.
+        Symbols missing the same range share one fetch_batch(symbols, start, end) call,
+        which returns {symbol: Bars} for the symbols upstream answered for (empty Bars
+        if the range has none) or raises MarketDataUnavailable. Answered ranges are
+        stored as covered; symbols left out are recorded with fetch_failed().
+        """
+        gaps = {}
+        for symbol in symbols:
+            for gap in self.missing_ranges(symbol, asset_class, timeframe, start_date, end_date):
+                gaps.setdefault(gap, []).append(symbol)
+
+        for (gap_start, gap_end), gap_symbols in gaps.items():
+            print(f"Bar store: fetching {len(gap_symbols)} {asset_class} symbols ({timeframe}) from {gap_start} to {gap_end}")
+            try:
+                fetched = fetch_batch(gap_symbols, gap_start, gap_end)
+            except MarketDataUnavailable as e:
+                print(f"Bar store: gap fetch failed: {e}, serving stored bars")
+                fetched = {}
+            for symbol in gap_symbols:
+                if symbol in fetched:
+                    self.store(symbol, asset_class, timeframe, gap_start, gap_end, fetched[symbol])
+                else:
+                    self.fetch_failed(symbol, asset_class, timeframe, gap_start, gap_end)
+
+
+BAR_STORE_DIR = os.getenv(
+    "BAR_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bar_store")
+)
+
+bar_store = BarStore(BAR_STORE_DIR)
@@ -0,0 +1,227 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+FIELDS = PRICE_FIELDS + ('volume',)
+
+# Alternative key names used by the different upstream bar formats
+_FIELD_KEYS = {
+    'open': ('o', 'open'),
+    'high': ('h', 'high'),
+    'low': ('l', 'low'),
+    'close': ('c', 'close'),
+    'volume': ('v', 'volume')
+}
+
+
+def _parse_timestamps(values):
+    """Parse ISO/RFC 3339 strings or datetimes into naive UTC datetime64[ms]."""
+    if len(values) == 0:
+        return np.array([], dtype='datetime64[ms]')
+    parsed = pd.to_datetime(pd.Index(values), utc=True, format='mixed')
+    return parsed.tz_localize(None).to_numpy().astype('datetime64[ms]')
+
+
+def _column(values):
+    column = np.ascontiguousarray(values, dtype=np.float64)
+    column.flags.writeable = False
+    return column
+
+
+# Columnar OHLCV bars: one contiguous numpy array per field, sorted by timestamp.
+#
+# This is what the fetchers, the bar store, filters and indicator code pass
+# around. Arrays are read-only so one Bars object can be shared between
+# requests without copying. Per-bar dicts are only built by to_records() for
+# JSON consumers that still expect the old list-of-records format.
+class Bars:
+    __slots__ = ('timestamp',) + FIELDS
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        timestamp = np.ascontiguousarray(timestamp, dtype='datetime64[ms]')
+        timestamp.flags.writeable = False
+        self.timestamp = timestamp
+        self.open = _column(open)
+        self.high = _column(high)
+        self.low = _column(low)
+        self.close = _column(close)
+        self.volume = _column(volume)
+
+    @classmethod
+    def empty(cls):
+        return cls(*([[]] * 6))
+
+    @classmethod
+    def from_alpaca(cls, raw_bars):
+        """Build from raw Alpaca bars ({'t', 'o', 'h', 'l', 'c', 'v'} or long key names)."""
+        if not raw_bars:
+            return cls.empty()
+
+        first = raw_bars[0]
+        time_key = 't' if 't' in first else 'timestamp'
+        columns = {}
+        for field, keys in _FIELD_KEYS.items():
+            key = next((k for k in keys if k in first), None)
+            if key is not None:
+                columns[field] = np.fromiter((bar[key] for bar in raw_bars), dtype=np.float64, count=len(raw_bars))
+
+        # Fill in anything the endpoint did not send
+        if 'volume' not in columns:
+            columns['volume'] = np.zeros(len(raw_bars))
+        available = [columns[f] for f in PRICE_FIELDS if f in columns]
+        for field in PRICE_FIELDS:
+            if field not in columns:
+                columns[field] = available[0] if available else np.full(len(raw_bars), 100.0)
+
+        timestamp = _parse_timestamps([bar[time_key] for bar in raw_bars])
+        return cls(timestamp, **columns).sorted()
+
+    @classmethod
+    def from_sdk(cls, sdk_bars):
+        """Build from alpaca-py Bar objects (attributes timestamp, open, high, low, close, volume)."""
+        if not sdk_bars:
+            return cls.empty()
+        timestamp = _parse_timestamps([bar.timestamp for bar in sdk_bars])
+        return cls(timestamp, **{
+            field: np.fromiter((getattr(bar, field) for bar in sdk_bars), dtype=np.float64, count=len(sdk_bars))
+            for field in FIELDS
+        }).sorted()
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from legacy records with a 'date' (or 'timestamp') key."""
+        if not records:
+            return cls.empty()
+        time_key = 'timestamp' if records[0].get('timestamp') is not None else 'date'
+        timestamp = _parse_timestamps([record[time_key] for record in records])
+        return cls(timestamp, **{
+            field: np.fromiter((record[field] for record in records), dtype=np.float64, count=len(records))
+            for field in FIELDS
+        }).sorted()
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        return cls(
+            np.concatenate([part.timestamp for part in parts]),
+            **{field: np.concatenate([getattr(part, field) for part in parts]) for field in FIELDS}
+        )
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def take(self, index):
+        """Select bars by slice, integer index array or boolean mask."""
+        return Bars(self.timestamp[index], **{field: getattr(self, field)[index] for field in FIELDS})
+
+    def sorted(self):
+        """Return bars in timestamp order with duplicate timestamps removed (last one wins)."""
+        if len(self) < 2:
+            return self
+        order = np.argsort(self.timestamp, kind='stable')
+        timestamp = self.timestamp[order]
+        keep = np.append(timestamp[1:] != timestamp[:-1], True)
+        if keep.all() and (order == np.arange(len(order))).all():
+            return self
+        return self.take(order[keep])
+
+    def merge(self, newer):
+        """Union of both sets of bars; bars in `newer` replace ones with the same timestamp."""
+        return Bars.concat([self, newer]).sorted()
+
+    def between(self, start, end):
+        """Bars with start <= timestamp < end (numpy datetime64 bounds)."""
+        lo = np.searchsorted(self.timestamp, np.datetime64(start, 'ms'), side='left')
+        hi = np.searchsorted(self.timestamp, np.datetime64(end, 'ms'), side='left')
+        return self.take(slice(lo, hi))
+
+    def between_days(self, start_day, end_day):
+        """Bars whose date falls in [start_day, end_day] ('YYYY-MM-DD' strings)."""
+        return self.between(np.datetime64(start_day, 'D'), np.datetime64(end_day, 'D') + 1)
+
+    def since(self, cutoff):
+        """Bars at or after cutoff."""
+        return self.take(slice(np.searchsorted(self.timestamp, np.datetime64(cutoff, 'ms'), side='left'), None))
+
+    def resample(self, count, unit):
+        """
+        Aggregate into bars of `count` x `unit` (a numpy datetime unit: 'm', 'h', 'D',
+        'W' or 'M' for calendar months). Buckets are aligned to the epoch, weeks to
+        Mondays and months to the calendar, so 1h bars start on the hour like Alpaca's.
+        Empty buckets are skipped.
+        """
+        if not len(self):
+            return self
+        if unit in ('M', 'Y'):
+            # Calendar units have no fixed length, bucket on the calendar field itself
+            bucket = self.timestamp.astype(f'datetime64[{unit}]').astype(np.int64) // count
+            starts = (bucket * count).astype(f'datetime64[{unit}]').astype('datetime64[ms]')
+        else:
+            size = np.timedelta64(count, unit).astype('timedelta64[ms]').astype(np.int64)
+            # The epoch is a Thursday; start weeks on the following Monday
+            offset = np.timedelta64(4, 'D').astype('timedelta64[ms]').astype(np.int64) if unit == 'W' else 0
+            bucket = (self.timestamp.astype(np.int64) - offset) // size
+            starts = (bucket * size + offset).astype('datetime64[ms]')
+
+        edges = np.flatnonzero(np.diff(bucket, prepend=bucket[0] - 1))
+        last = np.append(edges[1:], len(self)) - 1
+        return Bars(
+            starts[edges],
+            self.open[edges],
+            np.maximum.reduceat(self.high, edges),
+            np.minimum.reduceat(self.low, edges),
+            self.close[last],
+            np.add.reduceat(self.volume, edges)
+        )
+
+    def digest(self):
+        """
+        Digest of every timestamp and value, so two Bars compare equal only if
+        all their bars do, including one revised in the middle of the range.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.timestamp.astype(np.int64).tobytes())
+        for field in FIELDS:
+            digest.update(getattr(self, field).tobytes())
+        return digest.digest()
+
+    @property
+    def dates(self):
+        """Bar dates as 'YYYY-MM-DD' strings, the format the JSON API has always used."""
+        return np.datetime_as_string(self.timestamp, unit='D')
+
+    def columns(self):
+        """The bar arrays keyed by field name, timestamp first."""
+        return {'timestamp': self.timestamp, **{field: getattr(self, field) for field in FIELDS}}
+
+    def to_records(self):
+        """Materialise legacy list-of-dicts records for JSON consumers."""
+        columns = [self.dates.tolist()] + [getattr(self, field).tolist() for field in FIELDS]
+        keys = ('date',) + FIELDS
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+    def to_frame(self, index=False):
+        """
+        DataFrame with the same columns as the legacy records, for pandas-based code.
+        With index=True the frame is indexed by timestamp instead of having a 'date' column.
+        """
+        columns = {field: getattr(self, field) for field in FIELDS}
+        if index:
+            return pd.DataFrame(columns, index=pd.DatetimeIndex(self.timestamp, name='timestamp'))
+        return pd.DataFrame({'date': self.dates, **columns})
+
+
+def aligned_matrix(bars_list, field):
+    """
+    One field of several Bars as a (bars x series) matrix, aligned on the last
+    bar; shorter histories are NaN-padded at the top.
+    """
+    length = max((len(bars) for bars in bars_list), default=0)
+    matrix = np.full((length, len(bars_list)), np.nan)
+    for column, bars in enumerate(bars_list):
+        matrix[length - len(bars):, column] = getattr(bars, field)
+    return matrix
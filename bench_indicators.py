@@ -0,0 +1,90 @@
+"""
+Micro-benchmarks for the vectorized indicator kernels in indicator_kernels.
+
+Times each indicator on a synthetic random walk of 1k, 100k and 1M bars
+(best of --repeat runs) and, for reference, the per-row pandas OBV loop the
+Streamlit app used before, on the smallest size only:
+
+    python bench_indicators.py
+    python bench_indicators.py --sizes 1000,10000 --repeat 10
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicator_kernels as kernels
+
+
+def random_walk(n, seed=0):
+    """Synthetic OHLCV with a positive close and high >= close >= low."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = close * np.abs(rng.normal(0, 0.005, n))
+    volume = rng.integers(1_000, 1_000_000, n).astype(float)
+    return close + spread, close - spread, close, volume
+
+
+def legacy_obv(close, volume):
+    """The row-by-row OBV the Streamlit app computed before the kernels."""
+    df = pd.DataFrame({"close": close, "volume": volume, "OBV": 0.0})
+    obv = df["OBV"].to_numpy().copy()
+    for i in range(1, len(df)):
+        if df["close"].iloc[i] > df["close"].iloc[i - 1]:
+            obv[i] = obv[i - 1] + df["volume"].iloc[i]
+        elif df["close"].iloc[i] < df["close"].iloc[i - 1]:
+            obv[i] = obv[i - 1] - df["volume"].iloc[i]
+        else:
+            obv[i] = obv[i - 1]
+    return obv
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized indicator kernels")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma-separated bar counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best is reported")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    benchmarks = {
+        "sma(20)": lambda h, l, c, v: kernels.sma(c, 20),
+        "sma(200)": lambda h, l, c, v: kernels.sma(c, 200),
+        "ema(26)": lambda h, l, c, v: kernels.ema(c, 26),
+        "bollinger(20)": lambda h, l, c, v: kernels.bollinger(c, 20),
+        "rsi(14)": lambda h, l, c, v: kernels.rsi(c, 14),
+        "macd(12,26,9)": lambda h, l, c, v: kernels.macd(c),
+        "obv": lambda h, l, c, v: kernels.obv(c, v),
+        "true_range": lambda h, l, c, v: kernels.true_range(h, l, c),
+        "atr(14)": lambda h, l, c, v: kernels.atr(h, l, c, 14),
+        "adx(14)": lambda h, l, c, v: kernels.adx(h, l, c, 14),
+    }
+
+    print(f"{'indicator':<16}" + "".join(f"{size:>13,} bars" for size in sizes))
+    data = {size: random_walk(size) for size in sizes}
+    for name, fn in benchmarks.items():
+        row = f"{name:<16}"
+        for size in sizes:
+            seconds = best_of(lambda: fn(*data[size]), args.repeat)
+            row += f"{seconds * 1000:>15.3f} ms"
+        print(row)
+
+    # The legacy loop is far too slow for the larger sizes
+    size = sizes[0]
+    _, _, close, volume = data[size]
+    seconds = best_of(lambda: legacy_obv(close, volume), 1)
+    assert np.allclose(legacy_obv(close, volume), kernels.obv(close, volume))
+    print(f"\nlegacy per-row OBV loop, {size:,} bars: {seconds * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Offline load test of the live price push: a replay feed of synthetic 1-minute
+bars fanned out by one PriceHub to thousands of simulated clients.
+
+Each client subscribes to a few random symbols; a small pool of threads drains
+them round-robin the way the SSE handlers would, so the run measures the hub
+rather than thousands of sockets:
+
+    python bench_price_stream.py
+    python bench_price_stream.py --clients 10000 --symbols 100 --speed 6000 --seconds 20
+"""
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from price_stream import PriceHub, ReplayFeed
+from synthetic_market import synthetic_market
+
+
+def synthetic_recording(days):
+    """load(symbols) for a ReplayFeed: the last `days` of synthetic 1-minute crypto bars."""
+    end = datetime.now()
+    start = end - timedelta(days=days)
+    return lambda symbols: {symbol: synthetic_market.bars(symbol, start, end, '1Min', crypto=True) for symbol in symbols}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the price stream fan-out with a replay feed")
+    parser.add_argument("--clients", type=int, default=5000, help="Simulated clients")
+    parser.add_argument("--symbols", type=int, default=30, help="Symbols in the recording")
+    parser.add_argument("--per-client", type=int, default=5, help="Symbols each client subscribes to")
+    parser.add_argument("--speed", type=float, default=3000, help="Replay speed, times real time")
+    parser.add_argument("--seconds", type=float, default=10, help="Length of the run")
+    parser.add_argument("--drainers", type=int, default=16, help="Threads draining the clients")
+    parser.add_argument("--days", type=int, default=2, help="Days of recorded bars")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    universe = [f"SYM{i}/USD" for i in range(args.symbols)]
+    hub = PriceHub(ReplayFeed(synthetic_recording(args.days), speed=args.speed))
+
+    started = time.perf_counter()
+    clients = [
+        hub.subscribe(rng.choice(universe, size=min(args.per_client, len(universe)), replace=False).tolist())
+        for _ in range(args.clients)
+    ]
+    print(f"subscribed {len(clients):,} clients to {len(universe)} symbols in {time.perf_counter() - started:.2f}s")
+
+    stop = threading.Event()
+    received = [0] * args.drainers
+
+    def drain(worker):
+        mine = clients[worker::args.drainers]
+        while not stop.is_set():
+            idle = True
+            for client in mine:
+                chunk = client.drain(0)
+                if chunk is not None:
+                    received[worker] += chunk.count("event: ")
+                    idle = False
+            if idle:
+                time.sleep(0.001)
+
+    workers = [threading.Thread(target=drain, args=(worker,), daemon=True) for worker in range(args.drainers)]
+    for worker in workers:
+        worker.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    stats = hub.stats()
+    events = sum(received)
+    print(f"feed events published:   {stats['published']:,} ({stats['published'] / args.seconds:,.0f}/s)")
+    print(f"client events queued:    {stats['fanned_out']:,} ({stats['fanned_out'] / args.seconds:,.0f}/s)")
+    print(f"client events delivered: {events:,} ({events / args.seconds:,.0f}/s)")
+    print(f"coalesced (superseded):  {stats['coalesced']:,}")
+    print(f"upstream symbols:        {stats['upstream_symbols']} for {stats['clients']:,} clients")
+    print(f"max publish-to-drain:    {stats['max_lag_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
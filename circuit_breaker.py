@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+# Consecutive failures (after retries) before a breaker opens
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds an open breaker waits before letting a probe request through
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+# Circuit breaker for one upstream provider.
+#
+# Closed: calls go through and consecutive failures are counted.
+# Open: calls fail immediately with CircuitOpenError so callers reach their
+# fallback path without waiting on a degraded upstream.
+# Half-open: after the recovery timeout a single probe call is let through;
+# success closes the breaker, failure opens it again.
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, recovery_timeout=CIRCUIT_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._counters = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream right now."""
+        with self._lock:
+            if self._state == OPEN and time.time() - self._opened_at >= self.recovery_timeout:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                # Let exactly one probe through to test recovery
+                self._probe_in_flight = True
+                return
+
+            self._counters["rejected"] += 1
+            raise CircuitOpenError(f"Circuit breaker '{self.name}' is {self._state}, failing fast")
+
+    def record_success(self):
+        with self._lock:
+            self._counters["successes"] += 1
+            self._consecutive_failures = 0
+            if self._state != CLOSED:
+                print(f"Circuit breaker '{self.name}' closed after successful probe")
+            self._state = CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._counters["failures"] += 1
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"Circuit breaker '{self.name}' opened after {self._consecutive_failures} consecutive failures")
+                    self._counters["opened"] += 1
+                self._state = OPEN
+                self._opened_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            state = self._state
+            retry_in = None
+            if state == OPEN:
+                retry_in = round(max(0.0, self.recovery_timeout - (time.time() - self._opened_at)), 1)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self.recovery_timeout,
+                "probe_in": retry_in,
+                **self._counters
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+# Return the breaker for an upstream, creating it on first use
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_states():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,55 @@
+import hashlib
+from datetime import datetime, timezone
+
+import numpy as np
+from flask import Response
+
+
+def strong_etag(*parts):
+    """
+    Strong entity tag (without quotes) for a representation: the digest of its
+    encoded body, or of a watermark that changes whenever the body would.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def is_fresh(request, etag):
+    """Whether the client's If-None-Match already names etag (weak comparison, as RFC 9110 asks)."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag):
+    """An empty 304 carrying the current validator."""
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag):
+    """Attach etag and ask caches to revalidate before every reuse, so polls become 304s."""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def parse_bar_cursor(value):
+    """
+    A `since` cursor for bar data: epoch milliseconds (the `version` of an earlier
+    response) or an ISO-8601 time. Returns datetime64[ms]; raises ValueError.
+    """
+    value = value.strip()
+    try:
+        return np.datetime64(int(value), 'ms')
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid since cursor '{value}', expected epoch milliseconds or an ISO-8601 time")
+    # Aware times are converted to UTC, the time base of every bar
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(moment, 'ms')
@@ -0,0 +1,180 @@
+"""
+Correlation matrices over aligned daily return panels.
+
+Closes are kept on the union of every symbol's dates. Returns are taken on a
+common calendar: the days any equity traded when the set includes equities
+(so a crypto Friday-to-Monday move lines up with the equities' Monday return),
+otherwise every calendar day. Each pair is correlated over the returns both
+symbols have, using matrix products rather than a loop over pairs.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# How long a cached price panel is served before its symbols are fetched again
+CORRELATION_PANEL_TTL = float(os.getenv("CORRELATION_PANEL_TTL", "300"))
+# How many panels (one per period) are kept
+CORRELATION_PANEL_MAX = int(os.getenv("CORRELATION_PANEL_MAX", "8"))
+
+# Window ends per block when computing rolling matrices, to bound memory
+_ROLLING_BLOCK = 64
+
+
+class PricePanel:
+    """Daily closes of several symbols on the union of their dates, NaN where a symbol has no bar."""
+
+    def __init__(self, dates, symbols, close, continuous):
+        self.dates = dates                 # Sorted datetime64[D]
+        self.symbols = list(symbols)
+        self.close = close                 # (dates, symbols)
+        self.continuous = continuous       # Per symbol: trades every calendar day (crypto)
+
+    @classmethod
+    def from_bars(cls, bars_by_symbol, continuous):
+        """Panel from {symbol: Bars} and {symbol: trades around the clock}."""
+        symbols = list(bars_by_symbol)
+        days = {symbol: bars.timestamp.astype('datetime64[D]') for symbol, bars in bars_by_symbol.items()}
+        dates = np.unique(np.concatenate([days[symbol] for symbol in symbols])) if symbols else np.array([], 'datetime64[D]')
+        close = np.full((len(dates), len(symbols)), np.nan)
+        for column, symbol in enumerate(symbols):
+            close[np.searchsorted(dates, days[symbol]), column] = bars_by_symbol[symbol].close
+        return cls(dates, symbols, close, np.array([continuous[symbol] for symbol in symbols], dtype=bool))
+
+    def merge(self, other):
+        """A panel with the symbols of both; other's columns win for symbols in both."""
+        replaced = set(other.symbols)
+        columns = [column for column, symbol in enumerate(self.symbols) if symbol not in replaced]
+        keep = [self.symbols[column] for column in columns]
+        dates = np.union1d(self.dates, other.dates)
+        close = np.full((len(dates), len(keep) + len(other.symbols)), np.nan)
+        close[np.searchsorted(dates, self.dates), :len(keep)] = self.close[:, columns]
+        close[np.searchsorted(dates, other.dates), len(keep):] = other.close
+        continuous = np.concatenate((self.continuous[columns], other.continuous))
+        return PricePanel(dates, keep + other.symbols, close, continuous)
+
+    def select(self, symbols):
+        """The panel of just these symbols, without dates none of them traded on."""
+        position = {symbol: column for column, symbol in enumerate(self.symbols)}
+        columns = [position[symbol] for symbol in symbols]
+        close = self.close[:, columns]
+        rows = ~np.isnan(close).all(axis=1)
+        return PricePanel(self.dates[rows], symbols, close[rows], self.continuous[columns])
+
+    def returns(self):
+        """
+        (dates, log returns) on the common calendar. A symbol's price is carried
+        forward over calendar days it did not trade, and its returns are NaN
+        before its first bar.
+        """
+        close = self.close
+        if (~self.continuous).any():
+            rows = ~np.isnan(close[:, ~self.continuous]).all(axis=1)
+            close = close[rows]
+            dates = self.dates[rows]
+        else:
+            dates = self.dates
+        if len(close) < 2:
+            return dates[:0], np.empty((0, close.shape[1]))
+
+        # Forward-fill each column with the index of its last valid row
+        valid = ~np.isnan(close)
+        last_valid = np.maximum.accumulate(np.where(valid, np.arange(len(close))[:, None], 0), axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            prices = np.log(close[last_valid, np.arange(close.shape[1])])
+        return dates[1:], np.diff(prices, axis=0)
+
+
+def correlation(returns, min_periods=2):
+    """
+    Pearson correlation between the columns of returns (..., rows, symbols),
+    each pair over the rows where both are defined. Pairs with fewer than
+    min_periods common rows, or no variance, are NaN.
+    """
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    mask = valid.astype(np.float64)
+    xt = np.swapaxes(x, -1, -2)
+
+    n = np.swapaxes(mask, -1, -2) @ mask
+    sums = xt @ mask                      # sums[i, j]: sum of x_i over the rows shared with j
+    squares = (xt * xt) @ mask
+    products = xt @ x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = products - sums * np.swapaxes(sums, -1, -2) / n
+        variance = squares - sums * sums / n
+        result = covariance / np.sqrt(variance * np.swapaxes(variance, -1, -2))
+    result[n < min_periods] = np.nan
+    return np.clip(result, -1.0, 1.0)
+
+
+def rolling_correlation(returns, window, min_periods=None):
+    """
+    Correlation matrices over every `window` consecutive rows, yielded in
+    blocks as (row index of the first window's last row, matrices).
+    """
+    min_periods = min_periods or max(2, window // 2)
+    if len(returns) < window:
+        return
+    windows = sliding_window_view(returns, window, axis=0)  # (ends, symbols, window)
+    for start in range(0, len(windows), _ROLLING_BLOCK):
+        block = np.swapaxes(windows[start:start + _ROLLING_BLOCK], -1, -2)
+        yield start + window - 1, correlation(block, min_periods)
+
+
+# Price panels per period, so a correlation request for the same or a smaller
+# symbol set, or with another window, is served without fetching bars.
+# Requests that add symbols only fetch the new ones and merge them in, as
+# long as the cached panel is younger than CORRELATION_PANEL_TTL.
+class PanelCache:
+    def __init__(self, max_panels=CORRELATION_PANEL_MAX, ttl=CORRELATION_PANEL_TTL):
+        self.max_panels = max_panels
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._panels = OrderedDict()  # key -> (panel, stored_at)
+        self._counters = {"hits": 0, "partial_hits": 0, "misses": 0, "symbols_fetched": 0}
+
+    def lookup(self, key, symbols):
+        """(cached panel or None, symbols that still have to be fetched)."""
+        with self._lock:
+            entry = self._panels.get(key)
+            if entry is None or time.time() - entry[1] >= self.ttl:
+                self._counters["misses"] += 1
+                return None, list(symbols)
+            self._panels.move_to_end(key)
+            cached = set(entry[0].symbols)
+            missing = [symbol for symbol in symbols if symbol not in cached]
+            self._counters["partial_hits" if missing else "hits"] += 1
+            return entry[0], missing
+
+    def add(self, key, panel, fetched):
+        """Merge freshly fetched columns into the panel for key and return the result."""
+        with self._lock:
+            entry = self._panels.get(key)
+            if entry is not None and time.time() - entry[1] < self.ttl:
+                # Keep the original timestamp so merged-in symbols don't extend its life
+                merged, stored_at = entry[0].merge(panel), entry[1]
+            else:
+                merged, stored_at = panel, time.time()
+            self._panels[key] = (merged, stored_at)
+            self._panels.move_to_end(key)
+            while len(self._panels) > self.max_panels:
+                self._panels.popitem(last=False)
+            self._counters["symbols_fetched"] += fetched
+            return merged
+
+    def stats(self):
+        with self._lock:
+            return {
+                "panels": len(self._panels),
+                "symbols": sum(len(panel.symbols) for panel, _ in self._panels.values()),
+                "max_panels": self.max_panels,
+                "ttl": self.ttl,
+                **self._counters
+            }
+
+
+panel_cache = PanelCache()
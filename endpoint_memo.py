@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+# How long an endpoint layout that rejected a request is skipped before being retried
+ENDPOINT_NEGATIVE_TTL = float(os.getenv("ENDPOINT_NEGATIVE_TTL", "900"))
+
+
+# Remembers which endpoint layout works for each asset class.
+#
+# The crypto, forex and futures fetchers each know several URL layouts and
+# used to walk all of them on every call. The memo puts the layout that last
+# succeeded first and negatively caches layouts that rejected a request, so
+# known-bad endpoints are skipped until their TTL expires. A rejection can be
+# recorded for one symbol only (an unknown symbol on a working route), which
+# then skips the layout for that symbol and leaves it usable for the rest.
+class EndpointMemo:
+    def __init__(self, negative_ttl=ENDPOINT_NEGATIVE_TTL):
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._preferred = {}  # asset_class -> layout name
+        self._failed = {}     # (asset_class, layout, symbol or None for all) -> (expires_at, reason)
+
+    def _rejected(self, asset_class, layout, symbol, now):
+        # Caller must hold self._lock
+        for scope in {None, symbol}:
+            failure = self._failed.get((asset_class, layout, scope))
+            if failure and failure[0] > now:
+                return True
+        return False
+
+    def usable(self, asset_class, layout, symbol=None):
+        """Whether layout is not known to reject requests (for symbol, if given)."""
+        with self._lock:
+            return not self._rejected(asset_class, layout, symbol, time.time())
+
+    def order(self, asset_class, layouts, key=lambda layout: layout, symbol=None):
+        """Return the layouts worth trying (for symbol, if given), last known-good first, known-bad dropped."""
+        now = time.time()
+        with self._lock:
+            preferred = self._preferred.get(asset_class)
+            usable = [layout for layout in layouts if not self._rejected(asset_class, key(layout), symbol, now)]
+
+        # Stable sort keeps the caller's order for everything but the preferred layout
+        return sorted(usable, key=lambda layout: key(layout) != preferred)
+
+    def record_success(self, asset_class, layout, symbol=None):
+        with self._lock:
+            self._preferred[asset_class] = layout
+            self._failed.pop((asset_class, layout, None), None)
+            if symbol is not None:
+                self._failed.pop((asset_class, layout, symbol), None)
+
+    def record_failure(self, asset_class, layout, reason, symbol=None):
+        """Skip layout for the TTL: for every symbol, or only for symbol if given."""
+        scope = f" for {symbol}" if symbol is not None else ""
+        print(f"Endpoint memo: skipping {asset_class} layout '{layout}'{scope} for {self.negative_ttl:.0f}s ({reason})")
+        with self._lock:
+            self._failed[(asset_class, layout, symbol)] = (time.time() + self.negative_ttl, str(reason))
+            if symbol is None and self._preferred.get(asset_class) == layout:
+                del self._preferred[asset_class]
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                "negative_ttl": self.negative_ttl,
+                "preferred": dict(self._preferred),
+                "negatively_cached": [
+                    {
+                        "asset_class": asset_class,
+                        "layout": layout,
+                        "symbol": symbol,
+                        "reason": reason,
+                        "expires_in": round(expires_at - now, 1)
+                    }
+                    for (asset_class, layout, symbol), (expires_at, reason) in self._failed.items()
+                    if expires_at > now
+                ]
+            }
+
+
+endpoint_memo = EndpointMemo()
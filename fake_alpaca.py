@@ -0,0 +1,209 @@
+"""
+Local stand-in for the Alpaca market data API, for offline development and load testing.
+
+Serves the stock and crypto bar endpoints the backend calls, with synthetic
+OHLCV from synthetic_market. Start it and point the backend at it:
+
+    python fake_alpaca.py --port 5005 --latency-ms 80 --error-rate 0.02
+    ALPACA_DATA_URL=http://127.0.0.1:5005 python api.py
+
+Like the real service, unknown endpoint layouts (e.g. /v2/crypto/bars) answer 404.
+"""
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from synthetic_market import SyntheticMarket, SYNTHETIC_SEED, SYNTHETIC_CORRELATION
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+# Bar endpoint path -> whether it serves crypto
+BAR_ENDPOINTS = {
+    "/v2/stocks/bars": False,
+    "/v1beta3/crypto/us/bars": True
+}
+
+
+def parse_time(value, default):
+    """Parse an RFC 3339 timestamp or date into a naive UTC datetime."""
+    if not value:
+        return default
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def encode_token(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_token(token):
+    return int(base64.urlsafe_b64decode(token.encode()).decode()) if token else 0
+
+
+def bars_to_json(bars):
+    """Alpaca's bar layout: t/o/h/l/c/v plus trade count and VWAP."""
+    timestamps = [t + 'Z' for t in np.datetime_as_string(bars.timestamp, unit='s')]
+    vwap = ((bars.high + bars.low + bars.close) / 3).round(4).tolist()
+    trades = np.maximum(bars.volume // 100, 1).astype(int).tolist()
+    return [
+        {"t": t, "o": o, "h": h, "l": l, "c": c, "v": v, "n": n, "vw": vw}
+        for t, o, h, l, c, v, n, vw in zip(
+            timestamps,
+            bars.open.round(4).tolist(),
+            bars.high.round(4).tolist(),
+            bars.low.round(4).tolist(),
+            bars.close.round(4).tolist(),
+            bars.volume.tolist(),
+            trades,
+            vwap
+        )
+    ]
+
+
+class FakeAlpacaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, market, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+        super().__init__(address, FakeAlpacaHandler)
+        self.market = market
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "injected_errors": 0, "bars_served": 0, "not_found": 0}
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+class FakeAlpacaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+
+        if url.path == "/stats":
+            self.send_json(200, server.stats())
+            return
+
+        server.count("requests")
+        delay = server.latency_ms + random.uniform(0, server.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        # Injected failures: half rate limits, half server errors
+        if server.error_rate and random.random() < server.error_rate:
+            server.count("injected_errors")
+            if random.random() < 0.5:
+                self.send_json(429, {"message": "too many requests"}, {"Retry-After": "1"})
+            else:
+                self.send_json(500, {"message": "internal server error"})
+            return
+
+        if url.path not in BAR_ENDPOINTS:
+            server.count("not_found")
+            self.send_json(404, {"message": "Not Found"})
+            return
+
+        try:
+            payload = self.bars_page(BAR_ENDPOINTS[url.path], params)
+        except ValueError as e:
+            self.send_json(422, {"message": str(e)})
+            return
+        self.send_json(200, payload)
+
+    def bars_page(self, crypto, params):
+        symbols = [s for s in params.get("symbols", "").split(",") if s]
+        if not symbols:
+            raise ValueError("symbols is required")
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        start = parse_time(params.get("start"), now.replace(hour=0, minute=0, second=0))
+        end = parse_time(params.get("end"), now)
+        limit = min(int(params.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        offset = decode_token(params.get("page_token"))
+        timeframe = params.get("timeframe", "1Day")
+
+        # Like Alpaca, the limit applies to the bars of all symbols together, in symbol order
+        page = {}
+        position = 0
+        next_offset = offset + limit
+        more = False
+        symbols = sorted(symbols)
+        for i, symbol in enumerate(symbols):
+            bars = self.server.market.bars(symbol, start, end, timeframe, crypto=crypto)
+            lo = max(offset - position, 0)
+            hi = min(next_offset - position, len(bars))
+            if lo < hi:
+                page[symbol] = bars_to_json(bars.take(slice(lo, hi)))
+                self.server.count("bars_served", hi - lo)
+            position += len(bars)
+            if position >= next_offset:
+                more = position > next_offset or i < len(symbols) - 1
+                break
+
+        return {
+            "bars": page,
+            "next_page_token": encode_token(next_offset) if more else None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Alpaca market data server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay, uniform in [0, jitter]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429/500")
+    parser.add_argument("--correlation", type=float, default=SYNTHETIC_CORRELATION,
+                        help="Correlation of daily returns between tickers (0-1)")
+    parser.add_argument("--seed", type=int, default=SYNTHETIC_SEED)
+    args = parser.parse_args()
+
+    market = SyntheticMarket(seed=args.seed, correlation=args.correlation)
+    server = FakeAlpacaServer(
+        (args.host, args.port), market,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate
+    )
+    print(f"Fake Alpaca data API on http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms}+{args.jitter_ms}ms, error rate {args.error_rate}, "
+          f"correlation {market.correlation}, seed {args.seed})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from circuit_breaker import get_breaker
+
+# Transport configuration, overridable from the environment
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.25"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "4"))
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+
+# Status codes worth retrying: rate limits and transient upstream failures
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _never_sent(error):
+    """Whether a failed request died while connecting, before any of it reached the server."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+# Shared keep-alive HTTP transport for every upstream call.
+#
+# One requests.Session holds a connection pool per host, so repeat calls to
+# data.alpaca.markets or the chat completions host reuse open TLS connections
+# instead of paying a fresh handshake. Every request gets a connect/read
+# timeout and a bounded number of retries with jittered exponential backoff.
+class HttpTransport:
+    def __init__(self, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 max_retries=HTTP_MAX_RETRIES, pool_hosts=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.pool_maxsize = pool_maxsize
+
+        # Retries are handled here rather than by urllib3 so they can be counted and jittered
+        self._adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+
+        self._lock = threading.Lock()
+        self._host_stats = {}
+
+    def _host(self, host):
+        # Caller must hold self._lock
+        if host not in self._host_stats:
+            self._host_stats[host] = {
+                "requests": 0,
+                "retries": 0,
+                "errors": 0,
+                "in_flight": 0,
+                "peak_in_flight": 0
+            }
+        return self._host_stats[host]
+
+    def _backoff(self, attempt, response=None):
+        # Honour a numeric Retry-After header on 429/503, capped at the backoff ceiling
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), HTTP_BACKOFF_MAX)
+
+        # Exponential backoff with "equal jitter" so concurrent retries spread out
+        delay = min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def request(self, method, url, timeout=None, retries=None, breaker=None, idempotent=True, **kwargs):
+        """
+        Send a request through the pooled session, retrying transient failures.
+        A request that is not idempotent is only retried when it failed to connect,
+        never after a read timeout or an error status, as it may have run upstream.
+        If a breaker name is given, the call fails fast with CircuitOpenError while
+        that upstream's breaker is open, and its final outcome is reported to it.
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+        retries = self.max_retries if retries is None else retries
+
+        if breaker is None:
+            return self._request_with_retries(method, url, host, timeout, retries, idempotent, **kwargs)
+
+        circuit = get_breaker(breaker)
+        circuit.before_call()
+        recorded = False
+        try:
+            response = self._request_with_retries(method, url, host, timeout, retries, idempotent, **kwargs)
+
+            # Rate limits and 5xx count against the upstream; any other answer means it is up
+            if response.status_code in RETRY_STATUS_CODES:
+                circuit.record_failure()
+            else:
+                circuit.record_success()
+            recorded = True
+            return response
+        finally:
+            # Any exception, not only a RequestException, must settle the call;
+            # otherwise a half-open breaker's probe would stay in flight for good
+            if not recorded:
+                circuit.record_failure()
+
+    def _request_with_retries(self, method, url, host, timeout, retries, idempotent, **kwargs):
+        attempt = 0
+        while True:
+            with self._lock:
+                stats = self._host(host)
+                stats["requests"] += 1
+                stats["in_flight"] += 1
+                stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+
+            response = None
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                with self._lock:
+                    self._host(host)["errors"] += 1
+                if attempt >= retries or not (idempotent or _never_sent(e)):
+                    raise
+                print(f"HTTP {method} {host} failed ({e.__class__.__name__}), retrying")
+            finally:
+                with self._lock:
+                    self._host(host)["in_flight"] -= 1
+
+            if response is not None:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= retries or not idempotent:
+                    return response
+                print(f"HTTP {method} {host} returned {response.status_code}, retrying")
+                response.close()
+
+            with self._lock:
+                self._host(host)["retries"] += 1
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        # A POST may be billed or have side effects upstream, so it is not retried once sent
+        kwargs.setdefault('idempotent', False)
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        """Per-host request counters and connection pool utilisation."""
+        with self._lock:
+            hosts = {host: dict(stats) for host, stats in self._host_stats.items()}
+
+        # Pull connection counts from urllib3's per-host pools
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+            stats = hosts.setdefault(host, {"requests": 0})
+            stats["connections_opened"] = pool.num_connections
+            stats["idle_connections"] = idle
+            stats["pool_maxsize"] = self.pool_maxsize
+            # Share of requests that rode on an already-open connection
+            if stats["requests"]:
+                stats["connection_reuse_pct"] = round(
+                    max(0.0, 1 - pool.num_connections / stats["requests"]) * 100, 1
+                )
+
+        return {
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "max_retries": self.max_retries,
+            "hosts": hosts
+        }
+
+
+transport = HttpTransport()
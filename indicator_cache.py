@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Memory budget for cached indicator results
+INDICATOR_CACHE_MAX_BYTES = int(os.getenv("INDICATOR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# How long a source watermark is trusted before bars are fetched again to check for new data
+INDICATOR_CACHE_WATERMARK_TTL = float(os.getenv("INDICATOR_CACHE_WATERMARK_TTL", "15"))
+
+
+def source_watermark(series):
+    """
+    Identify the data behind a set of bar series: the first and last bar of each,
+    plus the last close, which keeps moving while the current bar is still forming.
+    """
+    return tuple(
+        (name, int(bars.timestamp[0].astype('int64')), int(bars.timestamp[-1].astype('int64')), float(bars.close[-1]))
+        if len(bars) else (name,)
+        for name, bars in sorted(series.items())
+    )
+
+
+# Memory-bounded LRU of computed technical indicator results.
+#
+# Results are keyed on (ticker, period, indicator set, source watermark), so
+# an entry stops matching as soon as new bars land. To let repeat views skip
+# the bar fetch as well, the cache remembers the last watermark seen for each
+# source and trusts it for INDICATOR_CACHE_WATERMARK_TTL seconds; after that
+# the bars are fetched again and only the computation can be skipped.
+class IndicatorCache:
+    def __init__(self, max_bytes=INDICATOR_CACHE_MAX_BYTES, watermark_ttl=INDICATOR_CACHE_WATERMARK_TTL):
+        self.max_bytes = max_bytes
+        self.watermark_ttl = watermark_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._watermarks = {}          # source -> (watermark, observed_at)
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "fetches_skipped": 0}
+
+    def get_fresh(self, source, make_key):
+        """
+        The result for the last watermark observed for source, without fetching bars,
+        or None if that watermark is older than the TTL or its result is gone.
+        """
+        with self._lock:
+            observed = self._watermarks.get(source)
+            if not observed or time.time() - observed[1] >= self.watermark_ttl:
+                return None
+            key = make_key(observed[0])
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            self._counters["fetches_skipped"] += 1
+            return entry[0]
+
+    def observe(self, source, watermark):
+        with self._lock:
+            self._watermarks[source] = (watermark, time.time())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters["evictions"] += 1
+
+            # Forget watermarks nobody has looked at for a while
+            if len(self._watermarks) > 4 * len(self._entries) + 64:
+                cutoff = time.time() - self.watermark_ttl
+                self._watermarks = {s: w for s, w in self._watermarks.items() if w[1] >= cutoff}
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "watermark_ttl": self.watermark_ttl,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else None,
+                **self._counters
+            }
+
+
+indicator_cache = IndicatorCache()
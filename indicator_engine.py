@@ -0,0 +1,357 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import indicator_kernels as kernels
+
+# How many (symbol, asset class, bar size) series keep streaming state
+INDICATOR_ENGINE_MAX_SERIES = int(os.getenv("INDICATOR_ENGINE_MAX_SERIES", "256"))
+
+# Output columns, in the order the technical indicators endpoint has always used
+COLUMNS = (
+    "sma20", "sma50", "sma200", "upper_band", "lower_band", "rsi",
+    "ema12", "ema26", "macd", "signal", "histogram"
+)
+
+# Columns each group of computations produces
+GROUPS = {
+    "sma": ("sma20", "sma50", "sma200"),
+    "bollinger": ("upper_band", "lower_band"),
+    "rsi": ("rsi",),
+    "macd": ("ema12", "ema26", "macd", "signal", "histogram")
+}
+
+SMA_WINDOWS = (20, 50, 200)
+BOLLINGER_WINDOW = 20
+RSI_WINDOW = 14
+EMA_FAST, EMA_SLOW, EMA_SIGNAL = 12, 26, 9
+
+# EMAs never drop their seed entirely; after this many spans its weight is below 0.05%
+EMA_WARMUP_SPANS = 4
+
+# Bars of history each column needs before the first bar it is shown for, so
+# that every shown value is defined and matches a longer history
+WARMUP = {
+    "sma20": 19,
+    "sma50": 49,
+    "sma200": 199,
+    "upper_band": BOLLINGER_WINDOW - 1,
+    "lower_band": BOLLINGER_WINDOW - 1,
+    "rsi": RSI_WINDOW,  # A series' first bar has no change to measure
+    "ema12": EMA_WARMUP_SPANS * EMA_FAST,
+    "ema26": EMA_WARMUP_SPANS * EMA_SLOW,
+    "macd": EMA_WARMUP_SPANS * EMA_SLOW,
+    "signal": EMA_WARMUP_SPANS * (EMA_SLOW + EMA_SIGNAL),
+    "histogram": EMA_WARMUP_SPANS * (EMA_SLOW + EMA_SIGNAL)
+}
+
+
+def warmup_bars(columns):
+    """Bars of history needed before the first shown bar for all of columns."""
+    return max((WARMUP[name] for name in columns), default=0)
+
+
+def _alpha(span):
+    return 2.0 / (span + 1)
+
+
+def compute_indicators(close, columns=COLUMNS):
+    """
+    Indicator columns for a whole close series, computed with the vectorized kernels.
+
+    close is 1-D, or 2-D with one series per column. Columns of different
+    lengths are aligned on their last bar and NaN-padded at the top; each
+    column then comes out exactly as if it had been computed on its own.
+    Only the groups behind the requested columns are computed.
+    Returns {column: array shaped like close}.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    groups = {group for group, produced in GROUPS.items() if set(produced) & set(columns)}
+
+    out = {}
+    if "sma" in groups:
+        for window in SMA_WINDOWS:
+            out[f"sma{window}"] = kernels.sma(close, window)
+    if "bollinger" in groups:
+        mean = out["sma20"] if "sma" in groups else kernels.sma(close, BOLLINGER_WINDOW)
+        band = 2 * kernels.rolling_std(close, BOLLINGER_WINDOW)
+        out["upper_band"] = mean + band
+        out["lower_band"] = mean - band
+    if "rsi" in groups:
+        out["rsi"] = kernels.rsi(close, RSI_WINDOW)
+    if "macd" in groups:
+        out["ema12"], out["ema26"], out["macd"], out["signal"], out["histogram"] = kernels.macd(
+            close, EMA_FAST, EMA_SLOW, EMA_SIGNAL
+        )
+    return {name: out[name] for name in columns}
+
+
+class _Series:
+    """Streaming indicator state for one series of bars."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.first_timestamp = None
+        self.length = 0           # Bars with outputs, including the provisional last bar
+        self.committed = 0        # Bars folded into self.state; the last bar stays provisional
+        self.state = self._initial_state()
+        self._capacity = 0
+        self.timestamp = self.close = self.gain = self.loss = None
+        self.out = {}
+
+    @staticmethod
+    def _initial_state():
+        return {
+            "sum": {w: 0.0 for w in SMA_WINDOWS},
+            "sumsq": 0.0,
+            "gain": 0.0,
+            "loss": 0.0,
+            "ema_fast": 0.0,
+            "ema_slow": 0.0,
+            "signal": 0.0
+        }
+
+    def _reserve(self, n):
+        if n <= self._capacity:
+            return
+        capacity = max(n, 2 * self._capacity, 256)
+
+        def grow(array, dtype):
+            grown = np.full(capacity, np.nan) if dtype is None else np.empty(capacity, dtype=dtype)
+            if array is not None:
+                grown[:self.length] = array[:self.length]
+            return grown
+
+        self.timestamp = grow(self.timestamp, 'datetime64[ms]')
+        self.close = grow(self.close, np.float64)
+        self.gain = grow(self.gain, np.float64)
+        self.loss = grow(self.loss, np.float64)
+        self.out = {name: grow(self.out.get(name), None) for name in COLUMNS}
+        self._capacity = capacity
+
+    def rebuild(self, bars):
+        """Recompute the whole series with vectorized passes and seed the streaming state from it."""
+        n = len(bars)
+        self.length = 0
+        self._reserve(n)
+        self.first_timestamp = bars.timestamp[0] if n else None
+        self.timestamp[:n] = bars.timestamp
+        close = self.close[:n]
+        close[:] = bars.close
+        self.gain[:n], self.loss[:n] = kernels.gains_losses(close)
+        out = compute_indicators(close)
+        for name in COLUMNS:
+            self.out[name][:n] = out[name]
+
+        # Streaming state as of the last committed bar; the last bar stays provisional
+        committed = max(n - 1, 0)
+        state = self._initial_state()
+        for window in SMA_WINDOWS:
+            state["sum"][window] = float(close[max(committed - window, 0):committed].sum())
+        state["sumsq"] = float(np.square(close[max(committed - BOLLINGER_WINDOW, 0):committed]).sum())
+        state["gain"] = float(self.gain[max(committed - RSI_WINDOW, 0):committed].sum())
+        state["loss"] = float(self.loss[max(committed - RSI_WINDOW, 0):committed].sum())
+        if committed:
+            state["ema_fast"] = float(out["ema12"][committed - 1])
+            state["ema_slow"] = float(out["ema26"][committed - 1])
+            state["signal"] = float(out["signal"][committed - 1])
+        self.state = state
+        self.committed = committed
+        self.length = n
+
+    def locate(self, bars):
+        """
+        Where bars start in the committed history if they extend it without revising
+        it, or None. A rolling window that moved forward starts past index 0.
+        """
+        n = self.committed
+        if self.first_timestamp is None or not len(bars):
+            return None
+        if n == 0:
+            return 0 if bars.timestamp[0] == self.first_timestamp else None
+        offset = int(np.searchsorted(self.timestamp[:n], bars.timestamp[0]))
+        overlap = n - offset
+        if (
+            offset == n
+            or self.timestamp[offset] != bars.timestamp[0]
+            or len(bars) < overlap
+            or not np.array_equal(bars.timestamp[:overlap], self.timestamp[offset:n])
+            or not np.array_equal(bars.close[:overlap], self.close[offset:n])
+        ):
+            return None
+        return offset
+
+    def _push(self, i, close, state):
+        """Fold bar i into state (mutated in place) and write its outputs."""
+        closes, out = self.close, self.out
+        closes[i] = close
+
+        # Gains and losses; the first bar counts as no change, like diff().where(...)
+        delta = close - closes[i - 1] if i > 0 else 0.0
+        self.gain[i] = delta if delta > 0 else 0.0
+        self.loss[i] = -delta if delta < 0 else 0.0
+
+        sums = state["sum"]
+        for window in SMA_WINDOWS:
+            sums[window] += close
+            if i >= window:
+                sums[window] -= closes[i - window]
+        out["sma20"][i] = sums[20] / 20 if i >= 19 else np.nan
+        out["sma50"][i] = sums[50] / 50 if i >= 49 else np.nan
+        out["sma200"][i] = sums[200] / 200 if i >= 199 else np.nan
+
+        # Bollinger bands: sample standard deviation over the SMA20 window
+        state["sumsq"] += close * close
+        if i >= BOLLINGER_WINDOW:
+            state["sumsq"] -= closes[i - BOLLINGER_WINDOW] ** 2
+        if i >= BOLLINGER_WINDOW - 1:
+            mean = sums[BOLLINGER_WINDOW] / BOLLINGER_WINDOW
+            variance = (state["sumsq"] - BOLLINGER_WINDOW * mean * mean) / (BOLLINGER_WINDOW - 1)
+            band = 2 * math.sqrt(max(variance, 0.0))
+            out["upper_band"][i] = mean + band
+            out["lower_band"][i] = mean - band
+        else:
+            out["upper_band"][i] = out["lower_band"][i] = np.nan
+
+        # RSI over simple 14-bar averages of gains and losses
+        state["gain"] += self.gain[i]
+        state["loss"] += self.loss[i]
+        if i >= RSI_WINDOW:
+            state["gain"] -= self.gain[i - RSI_WINDOW]
+            state["loss"] -= self.loss[i - RSI_WINDOW]
+        if i >= RSI_WINDOW - 1:
+            gain, loss = max(state["gain"], 0.0), max(state["loss"], 0.0)
+            if loss > 0:
+                out["rsi"][i] = 100 - 100 / (1 + gain / loss)
+            else:
+                out["rsi"][i] = 100.0 if gain > 0 else np.nan
+        else:
+            out["rsi"][i] = np.nan
+
+        # EMAs and MACD, seeded with the first value like ewm(adjust=False)
+        if i == 0:
+            state["ema_fast"] = state["ema_slow"] = close
+        else:
+            state["ema_fast"] += _alpha(EMA_FAST) * (close - state["ema_fast"])
+            state["ema_slow"] += _alpha(EMA_SLOW) * (close - state["ema_slow"])
+        macd = state["ema_fast"] - state["ema_slow"]
+        if i == 0:
+            state["signal"] = macd
+        else:
+            state["signal"] += _alpha(EMA_SIGNAL) * (macd - state["signal"])
+        out["ema12"][i] = state["ema_fast"]
+        out["ema26"][i] = state["ema_slow"]
+        out["macd"][i] = macd
+        out["signal"][i] = state["signal"]
+        out["histogram"][i] = macd - state["signal"]
+
+    def advance(self, bars, offset=0):
+        """
+        Fold every bar of bars (starting at history index offset) after the committed
+        ones; the last bar is applied provisionally.
+        """
+        n = offset + len(bars)
+        self._reserve(n)
+        self.timestamp[self.committed:n] = bars.timestamp[self.committed - offset:]
+        close = bars.close
+
+        for i in range(self.committed, n - 1):
+            self._push(i, float(close[i - offset]), self.state)
+        self.committed = max(n - 1, 0)
+
+        # The last bar may still change (today's bar), so fold it into a copy
+        if n:
+            provisional = dict(self.state, sum=dict(self.state["sum"]))
+            self._push(n - 1, float(close[n - 1 - offset]), provisional)
+        self.length = n
+
+    def trim(self, offset):
+        """
+        Drop the history before offset once it is as long as the part still in use,
+        keeping enough committed bars that every rolling window stays full.
+        Returns where the bars now start.
+        """
+        drop = min(offset, self.committed - max(SMA_WINDOWS))
+        if drop <= 0 or drop < self.length - offset:
+            return offset
+        kept = self.length - drop
+        for array in (self.timestamp, self.close, self.gain, self.loss, *self.out.values()):
+            array[:kept] = array[drop:self.length]
+        self.first_timestamp = self.timestamp[0]
+        self.committed -= drop
+        self.length = kept
+        return offset - drop
+
+    def outputs(self, columns, tail=None, offset=0):
+        start = max(self.length - tail, offset) if tail is not None else offset
+        return {name: self.out[name][start:self.length].copy() for name in columns}
+
+
+# Stateful SMA/EMA/RSI/MACD/Bollinger engine, one streaming series per key.
+#
+# Each series keeps running window sums and EMA state, so bars appended
+# since the previous call cost O(1) each. A last bar that is still forming is
+# applied provisionally on top of the committed state and re-applied when it
+# changes. The state stays anchored at the series' first bar: a window that
+# rolled forward starts inside the kept history and only its new bars are
+# folded, and the head is trimmed once it outgrows the window. If the bars
+# start before the kept history or earlier bars were revised, the series is
+# rebuilt from scratch. Outputs match the pandas rolling/ewm(adjust=False)
+# definitions the endpoint used before; EMAs carry a little more history
+# than the window itself, which the warm-up already allows for.
+class IndicatorEngine:
+    def __init__(self, max_series=INDICATOR_ENGINE_MAX_SERIES):
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._series = OrderedDict()
+        self._counters = {"calls": 0, "rebuilds": 0, "incremental": 0, "bars_folded": 0, "evicted": 0}
+
+    def _get(self, key):
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = _Series()
+                self._series[key] = series
+                while len(self._series) > self.max_series:
+                    self._series.popitem(last=False)
+                    self._counters["evicted"] += 1
+            else:
+                self._series.move_to_end(key)
+            return series
+
+    def compute(self, key, bars, columns=COLUMNS, tail=None):
+        """
+        Return {column: numpy array} of indicator values aligned with bars, for the
+        requested columns and, with tail, only the last `tail` bars. The state
+        always covers every column, since folding a bar into all of them is O(1).
+        """
+        series = self._get(key)
+        with series.lock:
+            offset = series.locate(bars)
+            if offset is not None:
+                outcome = "incremental"
+                folded = offset + len(bars) - series.committed
+                series.advance(bars, offset)
+                offset = series.trim(offset)
+            else:
+                outcome = "rebuilds"
+                folded = len(bars)
+                offset = 0
+                series.rebuild(bars)
+            result = series.outputs(columns, tail, offset)
+
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters[outcome] += 1
+            self._counters["bars_folded"] += folded
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"series": len(self._series), "max_series": self.max_series, **self._counters}
+
+
+indicator_engine = IndicatorEngine()
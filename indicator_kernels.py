@@ -0,0 +1,213 @@
+"""
+Vectorized technical indicator kernels shared by the Flask API and the Streamlit app.
+
+Every kernel takes numpy arrays with time along axis 0: a 1-D series, or a 2-D
+array holding one series per column. Series may start with NaN padding (e.g.
+histories of different lengths aligned on their last bar); each column then
+comes out as if it had been computed on its own. Definitions match the pandas
+code they replace: rolling windows over the last `window` bars and
+ewm(span, adjust=False) EMAs seeded with the first value. ATR and ADX/DI use
+Wilder's smoothing.
+
+No kernel loops over bars in Python, so 5y of daily bars or a day of
+1-minute bars costs microseconds to a few milliseconds; see bench_indicators.py.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Bars per block in the blocked solution of first-order recurrences (EMA, Wilder)
+_BLOCK = 64
+
+
+def _as_columns(values):
+    """View values as (bars, columns) float64, plus a function restoring the original shape."""
+    values = np.asarray(values, dtype=np.float64)
+    shape = values.shape
+    return values.reshape(len(values), int(np.prod(shape[1:]))), lambda result: result.reshape(shape)
+
+
+def _first_valid(values):
+    """Row index of the first non-NaN value in each column (0 for all-NaN columns)."""
+    return np.argmax(~np.isnan(values), axis=0)
+
+
+def _recurrence(u, decay, initial):
+    """
+    y[t] = decay * y[t-1] + u[t] down axis 0 of a (bars, columns) array, with y[-1] = initial.
+
+    The series is cut into blocks of _BLOCK bars. Each block's response to its
+    own inputs is one small matrix product. The states carried from block to
+    block follow the same recurrence with decay ** _BLOCK, solved recursively.
+    """
+    n, columns = u.shape
+    if n == 0:
+        return np.empty_like(u)
+
+    lags = np.arange(min(n, _BLOCK))
+    lag = lags[:, None] - lags[None, :]
+    weights = np.where(lag >= 0, decay ** np.maximum(lag, 0), 0.0)
+    carry_weights = decay ** (lags + 1)
+
+    if n <= _BLOCK:
+        return weights @ u + carry_weights[:, None] * initial
+
+    blocks = -(-n // _BLOCK)
+    padded = np.zeros((blocks * _BLOCK, columns))
+    padded[:n] = u
+    within = weights @ padded.reshape(blocks, _BLOCK, columns)  # Zero-state response of each block
+
+    # State entering each block: the initial state, then the state leaving the previous block
+    leaving = _recurrence(within[:, -1], decay ** _BLOCK, initial)
+    entering = np.concatenate((np.broadcast_to(initial, (1, columns)), leaving[:-1]))
+    result = within + carry_weights[None, :, None] * entering[:, None, :]
+    return result.reshape(blocks * _BLOCK, columns)[:n]
+
+
+def _smooth(values, alpha, seed_offset=0, seed_from_mean=False):
+    """
+    Exponential smoothing y[t] = y[t-1] + alpha * (x[t] - y[t-1]) per column.
+
+    Each column starts seed_offset bars after its first valid value, seeded with
+    that value (EMA) or with the mean of the bars up to it (Wilder). Earlier rows are NaN.
+    """
+    x, restore = _as_columns(values)
+    n = len(x)
+    if n == 0:
+        return restore(x.copy())
+    rows = np.arange(n)[:, None]
+    seed_row = _first_valid(x) + seed_offset
+
+    take_row = np.minimum(seed_row, n - 1)
+    if seed_from_mean:
+        window = (rows >= seed_row - seed_offset) & (rows <= seed_row)
+        seed = np.where(window, x, 0.0).sum(axis=0) / (seed_offset + 1)
+    else:
+        seed = x[take_row, np.arange(x.shape[1])]
+
+    # Hold the seed until the seed row so the recurrence passes through it unchanged
+    x = np.where(rows <= seed_row, seed, x)
+    result = _recurrence(alpha * x, 1 - alpha, seed)
+    result[rows < seed_row] = np.nan
+    return restore(result)
+
+
+def rolling_sum(values, window):
+    """Sum of the last `window` values; NaN until a column has `window` valid values."""
+    x, restore = _as_columns(values)
+    result = np.full(x.shape, np.nan)
+    n = len(x)
+    if n >= window:
+        # Centre each column on its first value so long cumulative sums keep their precision
+        valid = ~np.isnan(x)
+        reference = x[_first_valid(x), np.arange(x.shape[1])]
+        centred = np.where(valid, x - reference, 0.0)
+        sums = np.cumsum(np.concatenate((np.zeros((1, x.shape[1])), centred)), axis=0)
+        counts = np.cumsum(np.concatenate((np.zeros((1, x.shape[1])), valid)), axis=0)
+        window_sums = sums[window:] - sums[:-window]
+        full = (counts[window:] - counts[:-window]) == window
+        result[window - 1:] = np.where(full, window_sums + window * reference, np.nan)
+    return restore(result)
+
+
+def sma(values, window):
+    """Simple moving average, like rolling(window).mean()."""
+    return rolling_sum(values, window) / window
+
+
+def rolling_std(values, window, ddof=1):
+    """Rolling standard deviation, like rolling(window).std()."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        # Exact per-window deviations; windows here are short, so this stays cheap
+        result[window - 1:] = sliding_window_view(values, window, axis=0).std(axis=-1, ddof=ddof)
+    return result
+
+
+def ema(values, span):
+    """Exponential moving average, like ewm(span=span, adjust=False).mean()."""
+    return _smooth(values, 2.0 / (span + 1))
+
+
+def wilder(values, window):
+    """Wilder's smoothing (RMA): seeded with the mean of the first `window` values, then alpha = 1/window."""
+    return _smooth(values, 1.0 / window, seed_offset=window - 1, seed_from_mean=True)
+
+
+def bollinger(close, window=20, width=2):
+    """(middle, upper, lower) bands: SMA plus/minus `width` sample standard deviations."""
+    middle = sma(close, window)
+    band = width * rolling_std(close, window)
+    return middle, middle + band, middle - band
+
+
+def gains_losses(close):
+    """Per-bar gains and losses; a series' first bar counts as no change."""
+    close = np.asarray(close, dtype=np.float64)
+    previous = np.concatenate((np.full((1,) + close.shape[1:], np.nan), close[:-1]))
+    delta = close - previous
+    padding = np.isnan(close)
+    gain = np.where(padding, np.nan, np.where(delta > 0, delta, 0.0))
+    loss = np.where(padding, np.nan, np.where(delta < 0, -delta, 0.0))
+    return gain, loss
+
+
+def rsi(close, window=14):
+    """RSI over simple `window`-bar averages of gains and losses, as the app has always shown it."""
+    gain, loss = gains_losses(close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + rolling_sum(gain, window) / rolling_sum(loss, window))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """(ema_fast, ema_slow, macd, signal, histogram)."""
+    ema_fast = ema(close, fast)
+    ema_slow = ema(close, slow)
+    line = ema_fast - ema_slow
+    signal_line = ema(line, signal)
+    return ema_fast, ema_slow, line, signal_line, line - signal_line
+
+
+def obv(close, volume):
+    """On-balance volume: volume added on up bars, subtracted on down bars, starting at 0."""
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    direction = np.sign(np.diff(close, axis=0))
+    flows = np.concatenate((np.zeros((1,) + close.shape[1:]), direction * volume[1:]))
+    return np.cumsum(flows, axis=0)
+
+
+def _previous(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values, np.concatenate((np.full((1,) + values.shape[1:], np.nan), values[:-1]))
+
+
+def true_range(high, low, close):
+    """Largest of high-low and the gaps from the previous close; the first bar is high-low."""
+    high, low = np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64)
+    _, previous_close = _previous(close)
+    return np.fmax(np.fmax(high - low, np.abs(high - previous_close)), np.abs(low - previous_close))
+
+
+def atr(high, low, close, window=14):
+    """Average true range with Wilder's smoothing."""
+    return wilder(true_range(high, low, close), window)
+
+
+def adx(high, low, close, window=14):
+    """(plus_di, minus_di, adx): Wilder's directional movement system."""
+    high, previous_high = _previous(high)
+    low, previous_low = _previous(low)
+    up = high - previous_high
+    down = previous_low - low
+    plus_dm = np.where(np.isnan(up), np.nan, np.where((up > down) & (up > 0), up, 0.0))
+    minus_dm = np.where(np.isnan(down), np.nan, np.where((down > up) & (down > 0), down, 0.0))
+
+    # Directional movement needs a previous bar, so the true range starts there too
+    tr = np.where(np.isnan(up), np.nan, true_range(high, low, close))
+    smoothed_tr = wilder(tr, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * wilder(plus_dm, window) / smoothed_tr
+        minus_di = 100 * wilder(minus_dm, window) / smoothed_tr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return plus_di, minus_di, wilder(dx, window)
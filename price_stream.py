@@ -0,0 +1,325 @@
+"""
+Live price push: one upstream feed subscription per symbol, fanned out to any
+number of Server-Sent Events clients.
+
+Feeds publish "price" (last trade) and "bar" (completed bar) events. Each event
+is encoded once and handed to every client subscribed to its symbol. A client
+that falls behind is not queued up without bound: it receives only the latest
+event of each kind per symbol once it catches up.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Seconds between keep-alive comments on an idle stream
+PRICE_STREAM_HEARTBEAT = float(os.getenv("PRICE_STREAM_HEARTBEAT", "15"))
+# Symbols one client may subscribe to
+PRICE_STREAM_MAX_SYMBOLS = int(os.getenv("PRICE_STREAM_MAX_SYMBOLS", "50"))
+# Replay feed: playback speed (1 = real time) and days of recorded 1-minute bars behind it
+PRICE_REPLAY_SPEED = float(os.getenv("PRICE_REPLAY_SPEED", "60"))
+PRICE_REPLAY_DAYS = int(os.getenv("PRICE_REPLAY_DAYS", "5"))
+
+# Longest the replay thread sleeps, so new subscriptions join without waiting for the next bar
+_REPLAY_MAX_SLEEP = 0.25
+
+
+def price_event(symbol, price, timestamp_ms, size=None):
+    return {"symbol": symbol, "price": price, "size": size, "t": timestamp_ms}
+
+
+def bar_event(symbol, timestamp_ms, open_, high, low, close, volume):
+    return {"symbol": symbol, "t": timestamp_ms, "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+
+
+class Subscriber:
+    """One client's stream: the encoded events waiting for it, latest per (kind, symbol)."""
+
+    def __init__(self, symbols):
+        self.symbols = tuple(symbols)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._pending = {}        # (kind, symbol) -> encoded event
+        self._pending_since = None
+        self.delivered = 0
+        self.coalesced = 0
+        self.max_lag = 0.0        # Longest wait of an event between publish and drain, in seconds
+
+    def push(self, key, encoded):
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            elif not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending[key] = encoded
+        self._ready.set()
+
+    def drain(self, timeout=None):
+        """Every waiting event as one string, waiting up to timeout for one; None if there is none."""
+        if not self._ready.wait(timeout):
+            return None
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._ready.clear()
+            if self._pending_since is not None:
+                self.max_lag = max(self.max_lag, time.monotonic() - self._pending_since)
+                self._pending_since = None
+            self.delivered += len(events)
+        return "".join(events) or None
+
+
+# Fan-out of one feed to many subscribers.
+#
+# The hub asks the feed for a symbol when its first subscriber arrives and
+# drops it when the last one leaves, so the upstream carries each symbol once
+# however many clients watch it. The latest event of each kind per watched
+# symbol is kept and sent to new subscribers straight away.
+#
+# Feed calls are never made under self._lock: a live feed may block in
+# subscribe() until its own thread has run, and that thread calls publish(),
+# which takes self._lock. They are ordered by self._feed_lock instead, which
+# publish() never takes.
+class PriceHub:
+    def __init__(self, feed):
+        self.feed = feed
+        self._lock = threading.Lock()
+        self._feed_lock = threading.Lock()
+        self._by_symbol = {}  # symbol -> set of Subscriber
+        self._latest = {}     # (kind, symbol) -> encoded event
+        self._started = False
+        self._counters = {"published": 0, "fanned_out": 0, "subscribes": 0, "unsubscribes": 0}
+        self._retired = {"delivered": 0, "coalesced": 0}
+
+    def subscribe(self, symbols):
+        subscriber = Subscriber(dict.fromkeys(symbols))
+        # Held across the feed call so subscribes and unsubscribes reach the feed in order
+        with self._feed_lock:
+            with self._lock:
+                added = [symbol for symbol in subscriber.symbols if not self._by_symbol.get(symbol)]
+                for symbol in subscriber.symbols:
+                    self._by_symbol.setdefault(symbol, set()).add(subscriber)
+                latest = [(key, encoded) for key, encoded in self._latest.items() if key[1] in subscriber.symbols]
+                self._counters["subscribes"] += 1
+            if not self._started:
+                self.feed.start(self.publish)
+                self._started = True
+            if added:
+                self.feed.subscribe(added)
+        for key, encoded in latest:
+            subscriber.push(key, encoded)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._feed_lock:
+            with self._lock:
+                removed = []
+                for symbol in subscriber.symbols:
+                    subscribers = self._by_symbol.get(symbol)
+                    if subscribers is None:
+                        continue
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._by_symbol[symbol]
+                        removed.append(symbol)
+                        # Nobody watches it any more, so its last events would only go stale
+                        for key in [key for key in self._latest if key[1] == symbol]:
+                            del self._latest[key]
+                self._counters["unsubscribes"] += 1
+                self._retired["delivered"] += subscriber.delivered
+                self._retired["coalesced"] += subscriber.coalesced
+            if removed:
+                self.feed.unsubscribe(removed)
+
+    def publish(self, kind, symbol, payload):
+        """Send an event to every subscriber of symbol; called from the feed's threads."""
+        key = (kind, symbol)
+        encoded = f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+        with self._lock:
+            subscribers = list(self._by_symbol.get(symbol, ()))
+            if subscribers:
+                self._latest[key] = encoded
+            self._counters["published"] += 1
+            self._counters["fanned_out"] += len(subscribers)
+        for subscriber in subscribers:
+            subscriber.push(key, encoded)
+
+    def stats(self):
+        with self._lock:
+            subscribers = {subscriber for subscribers in self._by_symbol.values() for subscriber in subscribers}
+            return {
+                "feed": self.feed.name,
+                "clients": len(subscribers),
+                "upstream_symbols": len(self._by_symbol),
+                "delivered": self._retired["delivered"] + sum(subscriber.delivered for subscriber in subscribers),
+                "coalesced": self._retired["coalesced"] + sum(subscriber.coalesced for subscriber in subscribers),
+                "max_lag_ms": round(max((subscriber.max_lag for subscriber in subscribers), default=0.0) * 1000, 3),
+                **self._counters
+            }
+
+
+# Offline stand-in for the live feed: replays recorded bars at `speed` times
+# real time, publishing each bar's close as a price and the bar itself. All
+# symbols share one playback clock, and playback starts over at the end of the
+# recording. load(symbols) returns {symbol: Bars} of recorded bars.
+class ReplayFeed:
+    name = "replay"
+
+    def __init__(self, load, speed=PRICE_REPLAY_SPEED, loop=True):
+        self.load = load
+        self.speed = speed
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._requested = set()
+        self._recordings = {}  # symbol -> [Bars, next bar index]
+        self._publish = None
+        self._thread = None
+
+    def start(self, publish):
+        self._publish = publish
+        self._thread = threading.Thread(target=self._run, name="price-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def subscribe(self, symbols):
+        with self._lock:
+            self._requested.update(symbols)
+        self._wake.set()
+
+    def unsubscribe(self, symbols):
+        with self._lock:
+            self._requested.difference_update(symbols)
+            for symbol in symbols:
+                self._recordings.pop(symbol, None)
+
+    def _load_new(self, clock):
+        """Load recordings of newly requested symbols and start them at the playback clock."""
+        with self._lock:
+            new = [symbol for symbol in self._requested if symbol not in self._recordings]
+        if not new:
+            return
+        try:
+            loaded = self.load(new)
+        except Exception as e:
+            print(f"Price replay: loading {', '.join(new)} failed: {e}")
+            loaded = {}
+        with self._lock:
+            for symbol in new:
+                bars = loaded.get(symbol)
+                if symbol not in self._requested:
+                    continue
+                if bars is None or not len(bars):
+                    print(f"Price replay: no recorded bars for {symbol}")
+                    self._requested.discard(symbol)
+                    continue
+                start = 0 if clock is None else int(np.searchsorted(bars.timestamp.astype(np.int64), clock))
+                self._recordings[symbol] = [bars, start]
+
+    def _run(self):
+        clock = None    # Playback time in epoch ms
+        origin = None   # (playback ms, monotonic seconds) the clock is measured from
+        while not self._stop.is_set():
+            self._load_new(clock)
+            with self._lock:
+                recordings = list(self._recordings.items())
+
+            if not recordings:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            upcoming = [int(bars.timestamp[index].astype(np.int64)) for _, (bars, index) in recordings if index < len(bars)]
+            if not upcoming:
+                if not self.loop:
+                    return
+                # End of the recording: start over from its beginning
+                with self._lock:
+                    for recording in self._recordings.values():
+                        recording[1] = 0
+                clock, origin = None, None
+                continue
+
+            if origin is None:
+                origin = (min(upcoming), time.monotonic())
+            clock = origin[0] + (time.monotonic() - origin[1]) * self.speed * 1000
+            due = min(upcoming)
+            if due > clock:
+                self._wake.wait(min((due - clock) / (self.speed * 1000), _REPLAY_MAX_SLEEP))
+                self._wake.clear()
+                continue
+
+            for symbol, recording in recordings:
+                bars, index = recording
+                end = int(np.searchsorted(bars.timestamp.astype(np.int64), clock, side='right'))
+                for row in range(index, end):
+                    timestamp_ms = int(bars.timestamp[row].astype(np.int64))
+                    close = float(bars.close[row])
+                    self._publish("bar", symbol, bar_event(
+                        symbol, timestamp_ms, float(bars.open[row]), float(bars.high[row]),
+                        float(bars.low[row]), close, float(bars.volume[row])
+                    ))
+                    self._publish("price", symbol, price_event(symbol, close, timestamp_ms))
+                recording[1] = max(index, end)
+
+
+# Live trades and 1-minute bars from Alpaca's market data websockets, one
+# stream for equities and one for crypto, each running its own event loop in a
+# daemon thread. is_crypto(symbol) picks the stream for a symbol.
+class AlpacaFeed:
+    name = "alpaca"
+
+    def __init__(self, api_key, secret_key, is_crypto):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.is_crypto = is_crypto
+        self._streams = {}
+        self._publish = None
+
+    def start(self, publish):
+        self._publish = publish
+
+    def _stream(self, crypto):
+        """The stream for one asset class, started on first use."""
+        if crypto not in self._streams:
+            from alpaca.data.live import CryptoDataStream, StockDataStream
+
+            stream = (CryptoDataStream if crypto else StockDataStream)(self.api_key, self.secret_key)
+            threading.Thread(target=stream.run, name=f"price-{'crypto' if crypto else 'stock'}-stream", daemon=True).start()
+            self._streams[crypto] = stream
+        return self._streams[crypto]
+
+    def _by_stream(self, symbols):
+        groups = {}
+        for symbol in symbols:
+            groups.setdefault(bool(self.is_crypto(symbol)), []).append(symbol)
+        return groups
+
+    def subscribe(self, symbols):
+        for crypto, group in self._by_stream(symbols).items():
+            stream = self._stream(crypto)
+            stream.subscribe_trades(self._on_trade, *group)
+            stream.subscribe_bars(self._on_bar, *group)
+
+    def unsubscribe(self, symbols):
+        for crypto, group in self._by_stream(symbols).items():
+            stream = self._streams.get(crypto)
+            if stream is not None:
+                stream.unsubscribe_trades(*group)
+                stream.unsubscribe_bars(*group)
+
+    async def _on_trade(self, trade):
+        timestamp_ms = int(trade.timestamp.timestamp() * 1000)
+        self._publish("price", trade.symbol, price_event(trade.symbol, float(trade.price), timestamp_ms, float(trade.size)))
+
+    async def _on_bar(self, bar):
+        timestamp_ms = int(bar.timestamp.timestamp() * 1000)
+        self._publish("bar", bar.symbol, bar_event(
+            bar.symbol, timestamp_ms, float(bar.open), float(bar.high), float(bar.low), float(bar.close), float(bar.volume)
+        ))
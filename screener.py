@@ -0,0 +1,118 @@
+"""
+Vectorized stock screener: filters such as "rsi < 30", "close < lower_band",
+"sma20 crosses_above sma50" or "volume_ratio > 2" are evaluated for a whole
+universe at once on (bars x symbols) matrices, one column per symbol.
+"""
+import re
+
+import numpy as np
+
+import indicator_kernels as kernels
+from indicator_engine import compute_indicators, COLUMNS
+
+# Per-symbol values filters and sorting can refer to, besides the indicator columns
+BASE_FIELDS = ("close", "volume", "change_pct", "volume_ratio")
+FIELDS = BASE_FIELDS + COLUMNS
+
+OPERATORS = ("<", "<=", ">", ">=", "crosses_above", "crosses_below")
+
+# Bars the average volume behind volume_ratio is taken over, excluding the latest bar
+VOLUME_AVERAGE_WINDOW = 20
+
+_FILTER = re.compile(r'\s*([a-z0-9_]+)\s*(<=|>=|<|>|crosses_above|crosses_below)\s*([a-z0-9_]+|-?\d+(?:\.\d+)?)\s*')
+
+
+def parse_filter(text):
+    """
+    Parse "rsi < 30", "close > upper_band" or "sma20 crosses_above sma50" into
+    (field, operator, operand); operand is a field name or a float. Raises ValueError.
+    """
+    match = _FILTER.fullmatch(text.lower())
+    if not match:
+        raise ValueError(f"Cannot parse filter '{text}', expected '<field> <operator> <field or number>'")
+    field, operator, operand = match.groups()
+    try:
+        operand = float(operand)
+    except ValueError:
+        pass
+    for name in (field, operand):
+        if isinstance(name, str) and name not in FIELDS:
+            raise ValueError(f"Unknown field '{name}' in filter '{text}'. Choose from: {', '.join(FIELDS)}")
+    return field, operator, operand
+
+
+def referenced_fields(filters, sort=None):
+    """Every field the filters and the sort key read."""
+    names = {sort} if sort else set()
+    for field, _, operand in filters:
+        names.add(field)
+        if isinstance(operand, str):
+            names.add(operand)
+    return names
+
+
+def snapshot(close, volume, first_rows, columns):
+    """
+    The last two rows of every screenable field for a (bars x symbols) matrix of
+    closes and volumes, aligned on the last bar with NaN padding at the top.
+    first_rows holds each symbol's first row inside the screened period, the
+    base of change_pct. Only the indicator groups behind columns are computed.
+    Returns {field: array of shape (2, symbols)}: previous bar, latest bar.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    symbols = np.arange(close.shape[1])
+
+    # Average volume over the bars before the latest one, so a spike does not dilute itself
+    average_volume = kernels.sma(volume, VOLUME_AVERAGE_WINDOW)
+    average_volume = np.concatenate((np.full((1, len(symbols)), np.nan), average_volume[:-1]))
+    base_close = close[np.minimum(first_rows, len(close) - 1), symbols]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = {
+            "close": close[-2:],
+            "volume": volume[-2:],
+            "change_pct": (close[-2:] / base_close - 1) * 100,
+            "volume_ratio": volume[-2:] / average_volume[-2:]
+        }
+    for name, series in compute_indicators(close, columns).items():
+        values[name] = series[-2:]
+
+    # A matrix of one bar has no previous row
+    if len(close) < 2:
+        values = {name: np.concatenate((np.full((2 - len(rows), len(symbols)), np.nan), rows))
+                  for name, rows in values.items()}
+    return values
+
+
+def evaluate(values, filters):
+    """Boolean mask of the symbols matching every filter; NaN never matches."""
+    def side(operand, row):
+        return values[operand][row] if isinstance(operand, str) else operand
+
+    matches = np.ones(values["close"].shape[1], dtype=bool)
+    for field, operator, operand in filters:
+        latest, previous = values[field][1], values[field][0]
+        with np.errstate(invalid='ignore'):
+            if operator == "<":
+                matches &= latest < side(operand, 1)
+            elif operator == "<=":
+                matches &= latest <= side(operand, 1)
+            elif operator == ">":
+                matches &= latest > side(operand, 1)
+            elif operator == ">=":
+                matches &= latest >= side(operand, 1)
+            elif operator == "crosses_above":
+                matches &= (latest > side(operand, 1)) & (previous <= side(operand, 0))
+            else:
+                matches &= (latest < side(operand, 1)) & (previous >= side(operand, 0))
+    return matches
+
+
+def rank(values, matches, sort, descending=True, limit=None):
+    """Column indices of the matching symbols ordered by the latest value of sort; NaN last."""
+    indices = np.flatnonzero(matches)
+    keys = values[sort][1][indices]
+    keys = np.where(np.isnan(keys), -np.inf if descending else np.inf, keys)
+    order = np.argsort(-keys if descending else keys, kind='stable')
+    return indices[order][:limit]
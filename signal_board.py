@@ -0,0 +1,209 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+import indicator_kernels as kernels
+from bars import aligned_matrix
+from indicator_engine import compute_indicators
+
+# Daily bars of history behind each refresh; enough for SMA50 and a settled ADX
+SIGNAL_BOARD_LOOKBACK_DAYS = int(os.getenv("SIGNAL_BOARD_LOOKBACK_DAYS", "180"))
+# Seconds after a bar closes before the board is recomputed, so the bar has landed upstream
+SIGNAL_BOARD_SETTLE = float(os.getenv("SIGNAL_BOARD_SETTLE", "120"))
+
+# When each asset class's daily bar closes: (time zone, hour, trading days only)
+BAR_CLOSES = {
+    "stock": (ZoneInfo("America/New_York"), 16, True),
+    "crypto": (timezone.utc, 0, False)
+}
+
+_COLUMNS = ("sma20", "sma50", "upper_band", "lower_band", "rsi", "macd", "signal")
+
+
+def next_bar_close(asset_class, now):
+    """The first daily bar close of asset_class after now (an aware datetime)."""
+    zone, hour, trading_days = BAR_CLOSES.get(asset_class, BAR_CLOSES["stock"])
+    local = now.astimezone(zone)
+    close = local.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if close <= local:
+        close += timedelta(days=1)
+    while trading_days and close.weekday() >= 5:
+        close += timedelta(days=1)
+    return close
+
+
+def board_signals(close, high, low):
+    """
+    The Streamlit app's trading signals for every column of (bars x symbols)
+    close/high/low matrices at once. Returns ({signal: array of labels},
+    overall labels, {value: latest close/RSI/ADX per symbol}).
+    """
+    values = compute_indicators(close, _COLUMNS)
+    _, _, adx = kernels.adx(high, low, close, 14)
+    sma20, sma50 = values["sma20"], values["sma50"]
+    macd, signal = values["macd"], values["signal"]
+
+    def crossing(fast, slow):
+        """BUY where fast crossed above slow on the last bar, SELL where it crossed below."""
+        up = (fast[-1] > slow[-1]) & (fast[-2] <= slow[-2])
+        down = (fast[-1] < slow[-1]) & (fast[-2] >= slow[-2])
+        return np.where(up, "BUY", np.where(down, "SELL", "NEUTRAL"))
+
+    def bands(value, low_level, high_level):
+        return np.where(value < low_level, "BUY", np.where(value > high_level, "SELL", "NEUTRAL"))
+
+    with np.errstate(invalid='ignore'):
+        signals = {
+            "MA Crossover": crossing(sma20, sma50),
+            "RSI": bands(values["rsi"][-1], 30, 70),
+            "MACD": crossing(macd, signal),
+            "Bollinger Bands": bands(close[-1], values["lower_band"][-1], values["upper_band"][-1]),
+            "ADX": np.where(adx[-1] > 25, "STRONG TREND", "WEAK TREND")
+        }
+
+    buys = sum((labels == "BUY").astype(int) for labels in signals.values())
+    sells = sum((labels == "SELL").astype(int) for labels in signals.values())
+    overall = np.select(
+        [buys >= 3, buys > sells, sells >= 3, sells > buys],
+        ["STRONG BUY", "BUY", "STRONG SELL", "SELL"],
+        "NEUTRAL"
+    )
+    latest = {"close": close[-1], "rsi": values["rsi"][-1], "adx": adx[-1]}
+    return signals, overall, latest
+
+
+# Trading-signal board for the whole markets universe, kept in memory.
+#
+# A background thread recomputes each asset class shortly after its daily
+# bar closes (16:00 New York on weekdays for stocks, midnight UTC for
+# crypto), in one vectorized pass over all of its symbols. The latest board
+# is kept already JSON-encoded, so serving it costs the same for any number
+# of symbols and never computes an indicator.
+class SignalBoard:
+    def __init__(self, universe, fetch, lookback_days=SIGNAL_BOARD_LOOKBACK_DAYS, settle=SIGNAL_BOARD_SETTLE):
+        """
+        universe() returns {symbol: (category, name, asset_class)};
+        fetch(symbols, asset_class, start, end) returns {symbol: Bars} of daily bars.
+        """
+        self.universe = universe
+        self.fetch = fetch
+        self.lookback_days = lookback_days
+        self.settle = settle
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._entries = {}     # symbol -> signal entry
+        self._updated = {}     # asset class -> ISO time of the last refresh
+        self._encoded = None
+        self._counters = {"refreshes": 0, "failures": 0, "symbols": 0}
+        self._next = {}
+
+    def refresh(self, asset_classes=None):
+        """Recompute the signals of every symbol in asset_classes (default: all)."""
+        universe = self.universe()
+        by_class = {}
+        for symbol, (_, _, asset_class) in universe.items():
+            if asset_classes is None or asset_class in asset_classes:
+                by_class.setdefault(asset_class, []).append(symbol)
+
+        end = datetime.now()
+        start = end - timedelta(days=self.lookback_days)
+        entries = {}
+        for asset_class, symbols in by_class.items():
+            try:
+                bars_by_symbol = self.fetch(symbols, asset_class, start, end)
+                symbols = [symbol for symbol in symbols if len(bars_by_symbol.get(symbol, ())) >= 2]
+                if not symbols:
+                    continue
+                bars_list = [bars_by_symbol[symbol] for symbol in symbols]
+                signals, overall, latest = board_signals(
+                    aligned_matrix(bars_list, "close"),
+                    aligned_matrix(bars_list, "high"),
+                    aligned_matrix(bars_list, "low")
+                )
+            except Exception as e:
+                print(f"Signal board: refresh of {asset_class} failed: {e}, keeping previous signals")
+                with self._lock:
+                    self._counters["failures"] += 1
+                continue
+
+            for column, symbol in enumerate(symbols):
+                category, name, _ = universe[symbol]
+                entries[symbol] = {
+                    "symbol": symbol,
+                    "name": name,
+                    "category": category,
+                    "asOf": str(bars_by_symbol[symbol].timestamp[-1].astype('datetime64[D]')),
+                    "signals": {label: str(values[column]) for label, values in signals.items()},
+                    "overall": str(overall[column]),
+                    **{field: None if values[column] != values[column] else round(float(values[column]), 4)
+                       for field, values in latest.items()}
+                }
+            with self._lock:
+                self._updated[asset_class] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+        with self._lock:
+            self._entries = {**self._entries, **entries}
+            self._counters["refreshes"] += 1
+            self._counters["symbols"] = len(self._entries)
+            self._encoded = json.dumps(self._board(), sort_keys=True)
+
+    def _board(self):
+        return {
+            "updated": dict(self._updated),
+            "nextRefresh": {asset_class: when.isoformat(timespec='seconds') for asset_class, when in self._next.items()},
+            "signals": self._entries
+        }
+
+    def encoded(self):
+        """The whole board as a JSON string, or None before the first refresh."""
+        with self._lock:
+            return self._encoded
+
+    def get(self, symbol):
+        with self._lock:
+            return self._entries.get(symbol)
+
+    def by_category(self, category):
+        with self._lock:
+            return {symbol: entry for symbol, entry in self._entries.items() if entry["category"] == category}
+
+    def start(self):
+        """Start the refresh thread once; the first refresh runs right away."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="signal-board", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self.refresh()
+        while not self._stop.is_set():
+            now = datetime.now(timezone.utc)
+            asset_classes = {asset_class for _, _, asset_class in self.universe().values()}
+            with self._lock:
+                self._next = {
+                    asset_class: next_bar_close(asset_class, now) + timedelta(seconds=self.settle)
+                    for asset_class in asset_classes
+                }
+                self._encoded = json.dumps(self._board(), sort_keys=True)
+                due = min(self._next.values())
+            if self._stop.wait(max((due - now).total_seconds(), 0)):
+                break
+            self.refresh({asset_class for asset_class, when in self._next.items() if when <= due})
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "updated": dict(self._updated),
+                "next_refresh": {asset_class: when.isoformat(timespec='seconds') for asset_class, when in self._next.items()},
+                **self._counters
+            }
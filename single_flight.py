@@ -0,0 +1,67 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+# Request coalescing ("single-flight") for identical concurrent calls.
+#
+# The first caller for a key runs the function; callers that arrive with the
+# same key while it is still running wait for it and receive the same result
+# (or exception) instead of issuing their own upstream call.
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {"calls": 0, "executions": 0, "deduplicated": 0, "errors": 0}
+
+    def do(self, key, fn):
+        """
+        Run fn() once per in-flight key and return (result, shared).
+        shared is True when the result was handed to more than one caller, in
+        which case callers must copy it before mutating it.
+        """
+        with self._lock:
+            self._counters["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self._counters["deduplicated"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._counters["executions"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._counters["errors"] += 1
+            raise
+        finally:
+            # Once the key is removed no new follower can join, so followers is final
+            with self._lock:
+                del self._calls[key]
+                shared = call.followers > 0
+            call.done.set()
+
+        return call.result, shared
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), **self._counters}
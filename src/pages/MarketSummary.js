@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Typography, 
   Grid, 
@@ -79,8 +79,11 @@ const MarketSummary = () => {
     ]
   };
   
-  // Function to fetch market data
-  const fetchData = async () => {
+  // Open stream of the current fetch, closed when a new one starts or the page unmounts
+  const streamRef = useRef(null);
+  
+  // Fetch the whole summary in one response (fallback when streaming is unavailable)
+  const fetchSnapshot = async () => {
     try {
       setLoading(true);
       // Use the API_BASE_URL for consistent API calls
@@ -97,6 +100,41 @@ const MarketSummary = () => {
     }
   };
   
+  // Function to fetch market data, rendering each category as soon as the server sends it
+  const fetchData = () => {
+    if (streamRef.current) {
+      streamRef.current.close();
+    }
+    if (typeof EventSource === 'undefined') {
+      fetchSnapshot();
+      return;
+    }
+    
+    setLoading(true);
+    setMarketData({});
+    const received = {};
+    const source = new EventSource(`${API_BASE_URL}/market-summary/stream?period=${period}&format=sse`);
+    streamRef.current = source;
+    
+    source.addEventListener('category', (event) => {
+      const { category, data } = JSON.parse(event.data);
+      received[category] = data;
+      setMarketData({ ...received });
+    });
+    source.addEventListener('done', () => {
+      source.close();
+      // Save to global state
+      globalMarketData = received;
+      lastFetchedPeriod = period;
+      setLoading(false);
+    });
+    source.addEventListener('error', (event) => {
+      console.error('Market summary stream failed, fetching it in one request:', event.data || event);
+      source.close();
+      fetchSnapshot();
+    });
+  };
+  
   useEffect(() => {
     // Only fetch data if it's not available or if period changed
     if (globalMarketData === null || period !== lastFetchedPeriod) {
@@ -104,6 +142,13 @@ const MarketSummary = () => {
     }
   }, [period]); // Only re-fetch when period changes
   
+  // Stop streaming when leaving the page
+  useEffect(() => () => {
+    if (streamRef.current) {
+      streamRef.current.close();
+    }
+  }, []);
+  
   // Handle manual refresh
   const handleRefresh = () => {
     fetchData();
@@ -116,6 +161,8 @@ const MarketSummary = () => {
 
   const renderMarketTable = (category, title) => {
     const hasData = marketData && marketData[category];
+    // A category is loading until its data has streamed in
+    const categoryLoading = loading && !hasData;
     
     return (
       <TableContainer component={Paper}>
@@ -132,7 +179,7 @@ const MarketSummary = () => {
             {marketStructure[category]
               .filter(item => {
                 // Only include the item if it's still loading or has valid data
-                if (loading) return true;
+                if (categoryLoading) return true;
                 if (!hasData) return false;
                 
                 // Check if data exists for this ticker
@@ -152,21 +199,21 @@ const MarketSummary = () => {
                       {item.name}
                     </TableCell>
                     <TableCell align="right">
-                      {loading ? (
+                      {categoryLoading ? (
                         <CircularProgress size={16} />
                       ) : (
                         formatNumber(fetchedItem.price, 'price')
                       )}
                     </TableCell>
-                    <TableCell align="right" className={!loading ? getValueClass(fetchedItem.change) : ''}>
-                      {loading ? (
+                    <TableCell align="right" className={!categoryLoading ? getValueClass(fetchedItem.change) : ''}>
+                      {categoryLoading ? (
                         <CircularProgress size={16} />
                       ) : (
                         formatNumber(fetchedItem.change, 'change')
                       )}
                     </TableCell>
-                    <TableCell align="right" className={!loading ? getValueClass(fetchedItem.changePct) : ''}>
-                      {loading ? (
+                    <TableCell align="right" className={!categoryLoading ? getValueClass(fetchedItem.changePct) : ''}>
+                      {categoryLoading ? (
                         <CircularProgress size={16} />
                       ) : (
                         formatNumber(fetchedItem.changePct, 'percent')
@@ -175,7 +222,7 @@ const MarketSummary = () => {
                   </TableRow>
                 );
               })}
-            {!loading && marketStructure[category].filter(item => {
+            {!categoryLoading && marketStructure[category].filter(item => {
                 if (!hasData) return false;
                 const fetchedItem = marketData[category].find(
                   marketItem => marketItem.ticker === item.ticker
@@ -32,7 +32,7 @@ import {
   Legend,
   ReferenceLine
 } from 'recharts';
-import { formatNumber, generateAIAnalysis, API_BASE_URL } from '../utils/helpers';
+import { formatNumber, generateAIAnalysis, columnsToRows, API_BASE_URL } from '../utils/helpers';
 
 const TechnicalAnalysis = () => {
   const [ticker, setTicker] = useState('SPY');
@@ -77,14 +77,19 @@ const TechnicalAnalysis = () => {
       // Check if ticker has a slash (cryptocurrency)
       const hasCryptoFormat = symbolToUse.includes('/');
       
-      // Use query parameter format for all symbols to avoid URL issues
+      // Use query parameter format for all symbols to avoid URL issues.
+      // The columnar layout is much smaller than records for long periods.
       const apiResponse = await axios.get(`${API_BASE_URL}/technical-indicators`, {
         params: {
           symbol: symbolToUse,
-          period: period
+          period: period,
+          format: 'columnar'
         }
       });
       
+      // Expand the columns back into rows for the charts and analysis
+      apiResponse.data.data.indicators = columnsToRows(apiResponse.data.data.indicators);
+      
       setResponse(apiResponse); // Store the full response
       setTechnicalData(apiResponse.data.data.indicators);
       setLoading(false);
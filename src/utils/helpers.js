@@ -94,6 +94,26 @@ export const formatDate = (date, format = 'full') => {
   }
 };
 
+/**
+ * Expand a columnar API table ({ timestamp: [...], close: [...], ... }) into rows
+ * shaped like the records format: a YYYY-MM-DD date and "null" for missing values
+ * @param {Object} columns - Column arrays with epoch-millisecond timestamps
+ * @returns {Array} - One object per row
+ */
+export const columnsToRows = (columns) => {
+  if (!columns || !columns.timestamp) return [];
+  
+  const names = Object.keys(columns).filter(name => name !== 'timestamp');
+  return columns.timestamp.map((timestamp, i) => {
+    const row = { date: new Date(timestamp).toISOString().slice(0, 10) };
+    names.forEach(name => {
+      const value = columns[name][i];
+      row[name] = value === null ? "null" : value;
+    });
+    return row;
+  });
+};
+
 /**
  * Generate technical analysis using OpenAI API
  * @param {Object} technicalData - The technical indicator data
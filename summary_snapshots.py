@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from conditional import strong_etag
+from single_flight import SingleFlight
+
+# Periods the refresher keeps a market summary for
+SUMMARY_PERIODS = tuple(
+    period.strip() for period in os.getenv("SUMMARY_PERIODS", "1d,5d,1mo,3mo,6mo,ytd,1y,5y").split(",") if period.strip()
+)
+# Seconds between rebuilds while US equities trade, and while they don't (crypto still moves)
+SUMMARY_REFRESH_OPEN = float(os.getenv("SUMMARY_REFRESH_OPEN", "60"))
+SUMMARY_REFRESH_CLOSED = float(os.getenv("SUMMARY_REFRESH_CLOSED", "600"))
+
+# Regular US equity session
+MARKET_ZONE = ZoneInfo("America/New_York")
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+
+# One published market summary. version (epoch ms) grows whenever the summary
+# changes and changed holds the version each entry last changed at;
+# body is the complete encoded response and etag its strong validator.
+Snapshot = namedtuple("Snapshot", ["period", "as_of", "version", "result", "changed", "body", "etag"])
+
+
+def _entry_key(entry):
+    return entry["ticker"], entry["name"]
+
+
+def market_open(now):
+    """Whether the regular US equity session is on at now (an aware datetime); holidays are not known."""
+    local = now.astimezone(MARKET_ZONE)
+    return local.weekday() < 5 and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+
+def next_session_change(now):
+    """The next regular-session open or close after now."""
+    local = now.astimezone(MARKET_ZONE)
+    day = local.date()
+    while True:
+        if day.weekday() < 5:
+            for boundary in (MARKET_OPEN, MARKET_CLOSE):
+                when = datetime.combine(day, boundary, MARKET_ZONE)
+                if when > local:
+                    return when
+        day += timedelta(days=1)
+
+
+# Market summaries for every period, rebuilt in the background and served from memory.
+#
+# A daemon thread rebuilds all periods every SUMMARY_REFRESH_OPEN seconds while
+# the equity session is on and every SUMMARY_REFRESH_CLOSED seconds otherwise,
+# plus once right at each open and close. Each rebuild publishes new Snapshot
+# objects by swapping the whole dict, so readers take no lock and a snapshot
+# never changes once handed out. Responses are encoded when published, and a
+# rebuild that changes nothing keeps the old snapshot, version and ETag.
+class SummarySnapshots:
+    def __init__(self, build, periods=SUMMARY_PERIODS, open_interval=SUMMARY_REFRESH_OPEN,
+                 closed_interval=SUMMARY_REFRESH_CLOSED):
+        """
+        build(periods, previous) returns {period: {"data": {category: [...]}, ...}};
+        previous(period) is the data of the period's current snapshot, or None.
+        """
+        self.build = build
+        self.periods = periods
+        self.open_interval = open_interval
+        self.closed_interval = closed_interval
+        self._snapshots = {}  # period -> Snapshot, replaced wholesale
+        self._flight = SingleFlight("market_summary")
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._next = None
+        self._refreshed = {}  # period -> ISO time of the last rebuild, changed or not
+        self._counters = {"refreshes": 0, "changes": 0, "failures": 0, "on_demand": 0}
+
+    def refresh(self, periods=None):
+        """Rebuild and publish the summaries of periods (default: all); keeps the old ones on failure."""
+        periods = list(periods or self.periods)
+        try:
+            summaries = self.build(periods, self._previous)
+        except Exception as e:
+            print(f"Market summary: refresh of {', '.join(periods)} failed: {e}, keeping previous snapshots")
+            with self._lock:
+                self._counters["failures"] += 1
+            return
+
+        now = datetime.now(timezone.utc)
+        published = {}
+        for period, result in summaries.items():
+            snapshot = self._snapshots.get(period)
+            if snapshot is not None and snapshot.result == result:
+                continue
+            published[period] = self._publish(period, result, snapshot, now)
+        with self._lock:
+            self._snapshots = {**self._snapshots, **published}
+            self._refreshed.update(dict.fromkeys(summaries, now.isoformat(timespec='seconds')))
+            self._counters["refreshes"] += 1
+            self._counters["changes"] += len(published)
+
+    def _publish(self, period, result, previous, now):
+        """The snapshot replacing previous (or None) with result."""
+        version = int(now.timestamp() * 1000)
+        if previous is not None:
+            version = max(version, previous.version + 1)
+        # Entries are keyed by ticker and name, as a ticker can be listed under two names
+        earlier = {} if previous is None else {
+            _entry_key(entry): entry for entries in previous.result["data"].values() for entry in entries
+        }
+        changed = {
+            _entry_key(entry): previous.changed[_entry_key(entry)] if earlier.get(_entry_key(entry)) == entry else version
+            for entries in result["data"].values() for entry in entries
+        }
+        as_of = now.isoformat(timespec='seconds')
+        body = json.dumps({"status": "success", "period": period, "asOf": as_of, "version": version, **result})
+        return Snapshot(period, as_of, version, result, changed, body, strong_etag(body.encode()))
+
+    def delta(self, snapshot, since):
+        """
+        The encoded response holding only the entries of snapshot that changed
+        after version since, in their usual order, plus the current stale and
+        missing lists.
+        """
+        data = {}
+        for category, entries in snapshot.result["data"].items():
+            entries = [entry for entry in entries if snapshot.changed[_entry_key(entry)] > since]
+            if entries:
+                data[category] = entries
+        return json.dumps({
+            "status": "success",
+            "period": snapshot.period,
+            "asOf": snapshot.as_of,
+            "version": snapshot.version,
+            "since": since,
+            **snapshot.result,
+            "data": data
+        })
+
+    def _previous(self, period):
+        snapshot = self._snapshots.get(period)
+        return snapshot.result["data"] if snapshot is not None else None
+
+    def get(self, period):
+        """The latest snapshot of period, or None if it has never been built."""
+        return self._snapshots.get(period)
+
+    def ensure(self, period):
+        """The latest snapshot of period, building it now if there is none yet."""
+        snapshot = self._snapshots.get(period)
+        if snapshot is None:
+            def build_once():
+                with self._lock:
+                    self._counters["on_demand"] += 1
+                self.refresh([period])
+                return self._snapshots.get(period)
+            snapshot, _ = self._flight.do(period, build_once)
+        return snapshot
+
+    def interval(self, now):
+        return self.open_interval if market_open(now) else self.closed_interval
+
+    def start(self):
+        """Start the refresh thread once; the first refresh runs right away."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="market-summary", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            now = datetime.now(timezone.utc)
+            due = min(now + timedelta(seconds=self.interval(now)), next_session_change(now))
+            with self._lock:
+                self._next = due
+            if self._stop.wait(max((due - now).total_seconds(), 0)):
+                break
+
+    def stats(self):
+        snapshots = self._snapshots
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "market_open": market_open(datetime.now(timezone.utc)),
+                "next_refresh": self._next.isoformat(timespec='seconds') if self._next else None,
+                "snapshots": {
+                    period: {"as_of": snapshot.as_of, "version": snapshot.version, "refreshed": self._refreshed.get(period)}
+                    for period, snapshot in snapshots.items()
+                },
+                **self._counters
+            }
@@ -0,0 +1,179 @@
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from bars import Bars
+
+# Seed and cross-ticker return correlation for generated data, overridable from the environment
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+SYNTHETIC_CORRELATION = float(os.getenv("SYNTHETIC_CORRELATION", "0.5"))
+# Tickers whose daily paths (about 400 KB each) are kept in memory, least recently used evicted
+SYNTHETIC_PATH_CACHE = int(os.getenv("SYNTHETIC_PATH_CACHE", "256"))
+
+# Day 0 of every generated price path (a Monday)
+ORIGIN = np.datetime64('2000-01-03', 'D')
+# Day on which each ticker trades at its base price, keeping recent prices realistic
+ANCHOR = np.datetime64('2025-01-02', 'D')
+
+# Intraday sessions in UTC minutes: US equities 13:30-20:00, crypto around the clock
+STOCK_SESSION = (13 * 60 + 30, 390)
+CRYPTO_SESSION = (0, 24 * 60)
+
+_MARKET_STREAM = 0x6D6B74  # Random stream id of the shared market factor
+_PATH_STREAM = 0x706174    # Random stream id of a ticker's daily path components
+
+
+# Deterministic synthetic OHLCV for any ticker, used for mock data and the fake Alpaca server.
+#
+# Every ticker draws from its own numpy Generator (seeded from the market seed
+# and a hash of the ticker), so no global random state is touched and
+# concurrent requests cannot disturb each other. Daily log returns mix a
+# shared market factor with the ticker's own noise, so `correlation` sets how
+# closely tickers move together. Paths are anchored at ORIGIN, so a bar at a
+# given time is the same whatever range is requested. Each path component has
+# its own random stream, so a path regrown past a later horizon keeps every
+# earlier day. Intraday bars are a Brownian bridge from each day's open to its
+# close. Only the `max_paths` most recently used paths are kept in memory.
+class SyntheticMarket:
+    def __init__(self, seed=SYNTHETIC_SEED, correlation=SYNTHETIC_CORRELATION, max_paths=SYNTHETIC_PATH_CACHE):
+        self.seed = seed
+        self.correlation = min(max(correlation, 0.0), 1.0)
+        self.max_paths = max_paths
+        self._lock = threading.Lock()
+        self._market = None
+        self._paths = OrderedDict()  # ticker -> daily arrays, least recently used first
+
+    def _rng(self, *stream):
+        return np.random.default_rng([self.seed, *stream])
+
+    @staticmethod
+    def _ticker_hash(ticker):
+        return zlib.crc32(ticker.upper().encode())
+
+    def _horizon(self):
+        # Generate a year past today so the path never has to grow mid-request
+        return int((np.datetime64(datetime.now().date(), 'D') - ORIGIN).astype(int)) + 366
+
+    def _daily(self, ticker):
+        """Daily open/high/low/close/volume arrays for a ticker, indexed by days since ORIGIN."""
+        n = self._horizon()
+        with self._lock:
+            path = self._paths.get(ticker)
+            # A path generated before the horizon moved on is regrown; its earlier days stay the same
+            if path is not None and len(path["close"]) >= n:
+                self._paths.move_to_end(ticker)
+                return path
+
+            if self._market is None or len(self._market) < n:
+                self._market = self._rng(_MARKET_STREAM).standard_normal(n)
+
+            ticker_hash = self._ticker_hash(ticker)
+            rng = self._rng(ticker_hash)
+            base_price = np.exp(rng.uniform(np.log(20), np.log(1000)))
+            volatility = rng.uniform(0.01, 0.03)
+            drift = rng.uniform(-0.0002, 0.0004)
+            base_volume = np.exp(rng.uniform(np.log(1e5), np.log(1e7)))
+            noise = [self._rng(ticker_hash, _PATH_STREAM, component).standard_normal(n) for component in range(5)]
+
+            rho = self.correlation
+            shocks = rho * self._market[:n] + np.sqrt(1 - rho ** 2) * noise[0]
+            log_path = np.cumsum(drift + volatility * shocks)
+            close = base_price * np.exp(log_path - log_path[int((ANCHOR - ORIGIN).astype(int))])
+            previous_close = np.concatenate(([close[0]], close[:-1]))
+            open_ = previous_close * np.exp(0.2 * volatility * noise[1])
+            high = np.maximum(open_, close) * np.exp(0.5 * volatility * np.abs(noise[2]))
+            low = np.minimum(open_, close) * np.exp(-0.5 * volatility * np.abs(noise[3]))
+            volume = np.round(base_volume * np.exp(0.3 * noise[4]))
+
+            path = {
+                "open": open_, "high": high, "low": low, "close": close, "volume": volume,
+                "volatility": volatility, "hash": ticker_hash
+            }
+            self._paths[ticker] = path
+            self._paths.move_to_end(ticker)
+            while len(self._paths) > self.max_paths:
+                self._paths.popitem(last=False)
+            return path
+
+    def _day_range(self, start, end, crypto):
+        """Day indexes since ORIGIN between start and end, skipping weekends for non-crypto."""
+        first = max(int((np.datetime64(start, 'D') - ORIGIN).astype(int)), 0)
+        last = min(int((np.datetime64(end, 'D') - ORIGIN).astype(int)), self._horizon() - 1)
+        days = np.arange(first, last + 1)
+        if not crypto:
+            days = days[days % 7 < 5]  # ORIGIN is a Monday
+        return days
+
+    def daily_bars(self, ticker, start, end, crypto=False):
+        path = self._daily(ticker)
+        days = self._day_range(start, end, crypto)
+        timestamp = ORIGIN + days.astype('timedelta64[D]')
+        if not crypto:
+            # Alpaca stamps daily equity bars at the New York midnight
+            timestamp = timestamp.astype('datetime64[ms]') + np.timedelta64(5, 'h')
+        bars = Bars(timestamp, *(path[field][days] for field in ("open", "high", "low", "close", "volume")))
+        return bars.between(np.datetime64(start, 'ms'), np.datetime64(end, 'ms') + 1)
+
+    def minute_bars(self, ticker, start, end, crypto=False, minutes=1):
+        """Intraday bars of `minutes` length inside each session between start and end."""
+        path = self._daily(ticker)
+        session_start, session_length = CRYPTO_SESSION if crypto else STOCK_SESSION
+        step_volatility = 0.5 * path["volatility"] / np.sqrt(session_length)
+
+        parts = []
+        for day in self._day_range(start, end, crypto):
+            rng = self._rng(path["hash"], int(day))
+            open_, close = np.log(path["open"][day]), np.log(path["close"][day])
+
+            # Brownian bridge in log space from the day's open to its close
+            k = np.arange(session_length + 1) / session_length
+            walk = np.concatenate(([0.0], np.cumsum(rng.standard_normal(session_length))))
+            log_price = open_ + k * (close - open_) + step_volatility * (walk - k * walk[-1])
+            price = np.exp(log_price)
+
+            bar_open = price[:-1]
+            bar_close = price[1:]
+            wick = np.exp(step_volatility * np.abs(rng.standard_normal((2, session_length))))
+            bar_high = np.maximum(bar_open, bar_close) * wick[0]
+            bar_low = np.minimum(bar_open, bar_close) / wick[1]
+            bar_volume = np.round(path["volume"][day] / session_length * np.exp(0.5 * rng.standard_normal(session_length)))
+
+            # Aggregate 1-minute bars into the requested bar size
+            edges = np.arange(0, session_length, minutes)
+            day_start = (ORIGIN + np.timedelta64(int(day), 'D')).astype('datetime64[ms]')
+            parts.append(Bars(
+                day_start + (session_start + edges).astype('timedelta64[m]'),
+                bar_open[edges],
+                np.maximum.reduceat(bar_high, edges),
+                np.minimum.reduceat(bar_low, edges),
+                bar_close[np.append(edges[1:], session_length) - 1],
+                np.add.reduceat(bar_volume, edges)
+            ))
+
+        return Bars.concat(parts).between(np.datetime64(start, 'ms'), np.datetime64(end, 'ms') + 1)
+
+    def bars(self, ticker, start, end, timeframe='1Day', crypto=False):
+        """Bars for an Alpaca-style timeframe string such as 1Min, 15Min, 1Hour, 1Day, 1Week or 1Month."""
+        match = re.fullmatch(r'(\d+)(Min|T|Hour|H|Day|D|Week|W|Month)', str(timeframe))
+        if not match:
+            raise ValueError(f"Unsupported timeframe: {timeframe}")
+        amount, unit = int(match.group(1)), match.group(2)[0]
+        if match.group(2) == 'Month':
+            return self.daily_bars(ticker, start, end, crypto).resample(amount, 'M')
+
+        if unit in ('M', 'T'):
+            return self.minute_bars(ticker, start, end, crypto, amount)
+        if unit == 'H':
+            return self.minute_bars(ticker, start, end, crypto, amount * 60)
+
+        daily = self.daily_bars(ticker, start, end, crypto)
+        if unit == 'D' and amount == 1:
+            return daily
+        return daily.resample(amount, unit)
+
+synthetic_market = SyntheticMarket()
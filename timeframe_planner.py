@@ -0,0 +1,197 @@
+import math
+import re
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from bars import Bars
+
+# Base resolutions that are actually fetched; everything else is resampled from them
+MINUTE_BASE = "1Min"
+DAILY_BASE = "1Day"
+
+# Bar size suffix -> (numpy unit, base resolution it is derived from)
+_UNITS = {
+    "Min": ("m", MINUTE_BASE),
+    "Hour": ("h", MINUTE_BASE),
+    "Day": ("D", DAILY_BASE),
+    "Week": ("W", DAILY_BASE),
+    "Month": ("M", DAILY_BASE)
+}
+
+# Calendar time one bar of each unit spans
+_UNIT_SPANS = {
+    "m": timedelta(minutes=1),
+    "h": timedelta(hours=1),
+    "D": timedelta(days=1),
+    "W": timedelta(weeks=1),
+    "M": timedelta(days=31)
+}
+
+# Stock sessions: regular trading hours per day and calendar days per trading day
+# (weekends and exchange holidays), plus slack for a long weekend at either end
+STOCK_SESSION = timedelta(hours=6.5)
+STOCK_CALENDAR_RATIO = 365 / 252
+LOOKBACK_SLACK = timedelta(days=5)
+
+
+def parse_bar_size(bar_size):
+    """Split a bar size such as '15Min' or '1Month' into (count, numpy unit, base resolution)."""
+    match = re.fullmatch(r'(\d+)(Min|Hour|Day|Week|Month)', bar_size)
+    if not match:
+        raise ValueError(f"Unsupported bar size: {bar_size}")
+    unit, base = _UNITS[match.group(2)]
+    return int(match.group(1)), unit, base
+
+
+def lookback_start(start, bar_size, bars, continuous=False):
+    """
+    Start of a window that also holds `bars` bars of bar_size before start, e.g.
+    the warm-up history an indicator needs. Markets that trade around the clock
+    (continuous) only need the bars' own duration; stock bars are spread over
+    sessions, weekends and holidays.
+    """
+    if bars <= 0:
+        return start
+    count, unit, _ = parse_bar_size(bar_size)
+    span = bars * count * _UNIT_SPANS[unit]
+    if continuous:
+        return start - span - count * _UNIT_SPANS[unit]
+    if unit in ("m", "h"):
+        span = timedelta(days=math.ceil(span / STOCK_SESSION))
+    if unit in ("m", "h", "D"):
+        span = span * STOCK_CALENDAR_RATIO
+    return start - span - LOOKBACK_SLACK
+
+
+def bars_since(bars, start, bar_size):
+    """How many of the trailing bars fall at or after start, selecting daily bars by date like resolve()."""
+    cutoff = np.datetime64(start, 'D') if parse_bar_size(bar_size)[2] == DAILY_BASE else start
+    return len(bars) - int(np.searchsorted(bars.timestamp, np.datetime64(cutoff, 'ms'), side='left'))
+
+
+def bar_floor(moment, bar_size):
+    """Start of the intraday bar of bar_size that moment falls in (buckets aligned like Bars.resample)."""
+    count, unit, _ = parse_bar_size(bar_size)
+    size = np.timedelta64(count, unit).astype('timedelta64[ms]').astype(np.int64)
+    floored = np.datetime64(moment, 'ms').astype(np.int64) // size * size
+    return datetime(1970, 1, 1) + timedelta(milliseconds=int(floored))
+
+
+def _run_now(fn, *args):
+    """Run fn(*args) right away and return its outcome as a completed Future."""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+# Plans the upstream fetches behind a set of bar series.
+#
+# Callers declare every series they need (window and bar size). Series are
+# grouped by base resolution (1-minute for intraday sizes, daily for the
+# rest), overlapping windows of the same base are merged, and each merged
+# window is fetched once. Every series is then sliced out of its base bars and
+# resampled in-process, instead of issuing one upstream call per series.
+#
+# A series may also ask for history before its window (an indicator warm-up).
+# For intraday sizes above one minute that history is fetched at the bar size
+# itself, with the bar size as the "base", so a long warm-up of hourly bars
+# does not pull in weeks of 1-minute bars; only the window itself is built
+# from minutes, starting at the bar boundary so its first bar is complete.
+# That is one more fetch than the two bases alone would need: a request that
+# also wants daily series (the 5-day indicators with trends) makes three
+# upstream calls instead of two. The trade-off is deliberate, since building
+# the warm-up from minutes would pull about sixty times as many bars.
+#
+# Given an executor, the windows are fetched concurrently. A series declared
+# with a deadline only waits that many seconds for its window; if the window
+# is late or fails, the series comes back empty and is listed in self.late,
+# so optional series never hold up the required ones.
+class TimeframePlanner:
+    def __init__(self):
+        self._needs = {}  # name -> (start, end, bar_size, deadline, history_start)
+        self.late = []
+
+    def need(self, name, start, end, bar_size, deadline=None, history_start=None):
+        parse_bar_size(bar_size)  # Fail early on sizes we can't derive
+        self._needs[name] = (start, end, bar_size, deadline, history_start)
+
+    def _parts(self, start, end, bar_size, history_start):
+        """The (base, start, end) windows one series is built from, oldest first."""
+        count, unit, base = parse_bar_size(bar_size)
+        if history_start is None or history_start >= start:
+            return [(base, start, end)]
+        if base != MINUTE_BASE or (count, unit) == (1, 'm'):
+            return [(base, history_start, end)]
+        boundary = bar_floor(start, bar_size)
+        return [(bar_size, history_start, boundary), (base, boundary, end)]
+
+    def fetches(self):
+        """The (base, start, end) windows to fetch, with overlapping windows merged."""
+        windows = {}
+        for start, end, bar_size, _, history_start in self._needs.values():
+            for base, part_start, part_end in self._parts(start, end, bar_size, history_start):
+                windows.setdefault(base, []).append((part_start, part_end))
+
+        fetches = []
+        for base, spans in windows.items():
+            spans.sort()
+            merged = [list(spans[0])]
+            for start, end in spans[1:]:
+                if start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            fetches.extend((base, start, end) for start, end in merged)
+        return fetches
+
+    def resolve(self, fetch, executor=None):
+        """
+        Call fetch(base, start, end) -> Bars once per planned window, on executor
+        if given, and return {name: Bars} for every declared series.
+        """
+        started = time.monotonic()
+        submit = executor.submit if executor is not None else _run_now
+        fetched = [(base, start, end, submit(fetch, base, start, end)) for base, start, end in self.fetches()]
+
+        series = {}
+        self.late = []
+        for name, (start, end, bar_size, deadline, history_start) in self._needs.items():
+            count, unit, _ = parse_bar_size(bar_size)
+            parts = self._parts(start, end, bar_size, history_start)
+            windows = []
+            for index, (base, part_start, part_end) in enumerate(parts):
+                future = next(
+                    future for fetch_base, fetch_start, fetch_end, future in fetched
+                    if fetch_base == base and fetch_start <= part_start and part_end <= fetch_end
+                )
+                if deadline is None:
+                    source = future.result()
+                else:
+                    try:
+                        source = future.result(timeout=max(deadline - (time.monotonic() - started), 0))
+                    except Exception as e:
+                        print(f"Timeframe planner: {name} bars unavailable within {deadline}s: {e!r}")
+                        self.late.append(name)
+                        windows = None
+                        break
+                if base == DAILY_BASE:
+                    # Daily bars are stamped at the exchange's midnight, select them by date
+                    window = source.between_days(np.datetime64(part_start, 'D'), np.datetime64(part_end, 'D'))
+                elif index < len(parts) - 1:
+                    # History fetched at the bar size ends where the window's first bar begins
+                    window = source.between(np.datetime64(part_start, 'ms'), np.datetime64(part_end, 'ms'))
+                else:
+                    window = source.between(np.datetime64(part_start, 'ms'), np.datetime64(part_end, 'ms') + 1)
+                # Bars fetched at their own size are used as fetched, everything else is resampled
+                if base == bar_size or (count, unit) in ((1, 'm'), (1, 'D')):
+                    windows.append(window)
+                else:
+                    windows.append(window.resample(count, unit))
+            series[name] = Bars.empty() if windows is None else Bars.concat(windows)
+        return series
@@ -0,0 +1,128 @@
+import json
+
+import numpy as np
+from flask import Response, jsonify
+
+# Optional binary encoders; the formats they provide are only offered when installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+RECORDS = "records"
+COLUMNAR = "columnar"
+MSGPACK = "msgpack"
+ARROW = "arrow"
+
+# Accept header media types that select a binary format
+MEDIA_TYPES = {
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW
+}
+
+
+class UnsupportedFormat(ValueError):
+    """Raised when a client asks for a wire format this server cannot produce."""
+
+
+def available_formats():
+    formats = [RECORDS, COLUMNAR]
+    if msgpack is not None:
+        formats.append(MSGPACK)
+    if pa is not None:
+        formats.append(ARROW)
+    return formats
+
+
+def negotiate(request):
+    """
+    Pick the response format from ?format= or, failing that, the Accept header.
+    Defaults to the legacy records layout.
+    """
+    fmt = request.args.get('format')
+    if fmt is None:
+        for media_type in MEDIA_TYPES:
+            if media_type in request.headers.get('Accept', ''):
+                fmt = MEDIA_TYPES[media_type]
+                break
+        else:
+            fmt = RECORDS
+
+    if fmt not in available_formats():
+        raise UnsupportedFormat(
+            f"Format '{fmt}' is not available, choose one of: {', '.join(available_formats())}"
+        )
+    return fmt
+
+
+def _column(values):
+    # Timestamps go over the wire as integer milliseconds since the epoch
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ms]').astype(np.int64)
+    return values
+
+
+def _json_column(values):
+    # NaN is not valid JSON, send null instead
+    values = _column(values)
+    if values.dtype.kind == 'f':
+        mask = np.isnan(values)
+        if mask.any():
+            column = values.tolist()
+            for i in np.flatnonzero(mask):
+                column[i] = None
+            return column
+    return values.tolist()
+
+
+def _msgpack_default(value):
+    # numpy scalars that msgpack does not know about (int64, bool_, ...)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def table_response(fmt, meta, table_key, columns):
+    """
+    Build a success response holding a table of equal-length numpy columns.
+    datetime64 columns are sent as epoch milliseconds.
+
+    meta is the rest of the "data" object (ticker, period...). For the JSON and
+    MessagePack formats the table goes under data[table_key] as {column: values};
+    for Arrow the table is the IPC stream itself and meta travels as schema metadata.
+    The records format is rendered by the endpoints themselves.
+    """
+    if fmt == COLUMNAR:
+        return jsonify({
+            "status": "success",
+            "data": {**meta, table_key: {name: _json_column(values) for name, values in columns.items()}}
+        })
+
+    if fmt == MSGPACK:
+        # Float columns keep NaN, which MessagePack encodes natively
+        body = msgpack.packb({
+            "status": "success",
+            "data": {**meta, table_key: {name: _column(values).tolist() for name, values in columns.items()}}
+        }, default=_msgpack_default)
+        return Response(body, mimetype="application/msgpack")
+
+    if fmt == ARROW:
+        table = pa.table({name: _column(values) for name, values in columns.items()})
+        table = table.replace_schema_metadata({
+            "status": "success",
+            "table": table_key,
+            "data": json.dumps(meta, default=_msgpack_default)
+        })
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), mimetype="application/vnd.apache.arrow.stream")
+
+    raise UnsupportedFormat(f"Format '{fmt}' has no table encoding")